@@ -1,125 +1,311 @@
 # VocalLab — map generic YOLO COCO class names to lab equipment names
 # Enhanced for proxy mode with robust fallback matching and logging
+#
+# The mapping data lives in config/label_maps/*.json and is compiled into a
+# LabelMapper (class-id tables + memoised fuzzy matcher). The active mapper is
+# swapped atomically on reload, and experiment.json may override entries via
+# its "label_map" block. Every compiled mapper carries a content hash
+# (`version`) so label-keyed caches can invalidate cleanly.
 
-PROXY_MODE = True  # Enable strict proxy mapping
-
-YOLO_TO_LAB = {
-    # Primary household items → lab equipment
-    "glass": "beaker",
-    "bottle": "conical_flask",
-    "cup": "measuring_cylinder",
-    "spoon": "spatula",
-    "mouse": "dropper",
-    "phone": "ph_meter",
-    "book": "lab_manual",
-    "bowl": "petri_dish",
-    "vase": "volumetric_flask",
-    "banana": "test_tube",
-    "clock": "stopwatch",
-    "pen": "pipette",
-    "toothbrush": "brush",
-    "carrot": "stirring_rod",
-    "apple": "rubber_stopper",
-    "orange": "watch_glass",
-
-    # Additional mappings for better detection
-    "wine glass": "conical_flask",
-    "plastic bottle": "conical_flask",
-    "mug": "measuring_cylinder",
-    "fork": "spatula",
-    "keyboard": "hotplate",
-    "laptop": "analytical_balance",
-    "cell phone": "ph_meter",
-    "remote": "thermometer",
-    "scissors": "tongs",
-    "knife": "conical_flask",
-    "eraser": "rubber_stopper",
-    "ruler": "stirring_rod",
-    "calculator": "analytical_balance",
-    "notebook": "lab_manual",
-    "paper": "lab_manual",
-    "pencil": "stirring_rod",
-    "marker": "stirring_rod",
-    "highlighter": "stirring_rod",
-    "stapler": "analytical_balance",
-    "tape": "lab_manual",
-    "glue": "lab_manual",
-}
-
-# Enhanced mapping with fuzzy matching
-FUZZY_MAPPINGS = {
-    "glass": ["beaker", "conical_flask", "measuring_cylinder"],
-    "bottle": ["conical_flask", "beaker", "volumetric_flask"],
-    "cup": ["measuring_cylinder", "beaker", "petri_dish"],
-    "spoon": ["spatula", "stirring_rod", "dropper"],
-    "mouse": ["dropper", "pipette", "stirring_rod"],
-    "phone": ["ph_meter", "analytical_balance", "stopwatch"],
-    "book": ["lab_manual", "petri_dish", "watch_glass"],
-}
-
+import os
+import sys
+import json
+import hashlib
 import logging
-import re
-from typing import List, Tuple
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
-def map_label(yolo_label: str) -> str:
+_HERE = os.path.dirname(os.path.abspath(__file__))
+LABEL_MAP_DIR = os.path.join(_HERE, "label_maps")
+DEFAULT_LABEL_MAP = os.path.join(LABEL_MAP_DIR, "default.json")
+
+MAP_CACHE_SIZE = 4096   # distinct raw label strings remembered per mapper
+
+
+def load_label_map(path: str = DEFAULT_LABEL_MAP) -> dict:
+    """Read a label-map data file → spec dict {proxy_mode, exact, fuzzy, fuzzy_priority}."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {
+        "proxy_mode": bool(raw.get("proxy_mode", True)),
+        "exact": {str(k).strip().lower(): str(v) for k, v in raw.get("exact", {}).items()},
+        "fuzzy": {str(k).strip().lower(): list(v) for k, v in raw.get("fuzzy", {}).items()},
+        "fuzzy_priority": [(str(k), str(v)) for k, v in raw.get("fuzzy_priority", [])],
+    }
+
+
+def merge_label_map(base: dict, override: Optional[dict]) -> dict:
     """
-    Map a YOLO class name to lab equipment name with enhanced proxy mode.
-    Returns the mapped lab label string.
+    Apply an experiment's "label_map" block on top of a base spec.
+    Dict sections are merged key-by-key unless "replace": true; lists replace.
     """
-    if not yolo_label:
-        return "unknown"
+    if not override:
+        return base
+    replace = bool(override.get("replace", False))
+    merged = {
+        "proxy_mode": bool(override.get("proxy_mode", base["proxy_mode"])),
+        "exact": {} if replace else dict(base["exact"]),
+        "fuzzy": {} if replace else dict(base["fuzzy"]),
+        "fuzzy_priority": list(base["fuzzy_priority"]),
+    }
+    merged["exact"].update({str(k).strip().lower(): str(v) for k, v in override.get("exact", {}).items()})
+    merged["fuzzy"].update({str(k).strip().lower(): list(v) for k, v in override.get("fuzzy", {}).items()})
+    if "fuzzy_priority" in override:
+        merged["fuzzy_priority"] = [(str(k), str(v)) for k, v in override["fuzzy_priority"]]
+    return merged
 
-    original_label = yolo_label.strip().lower()
-    key = original_label
-
-    # Try exact match first
-    if key in YOLO_TO_LAB:
-        mapped = YOLO_TO_LAB[key]
-        if PROXY_MODE:
-            logger.debug(f"Proxy mapping: {original_label} → {mapped}")
-        return mapped
-
-    # Try fuzzy matching for common household items
-    for fuzzy_key, lab_options in FUZZY_MAPPINGS.items():
-        if fuzzy_key in original_label:
-            # Choose most appropriate lab equipment
-            if "glass" in original_label:
-                mapped = "beaker"
-            elif "bottle" in original_label:
-                mapped = "conical_flask"
-            elif "cup" in original_label:
-                mapped = "measuring_cylinder"
-            elif "spoon" in original_label:
-                mapped = "spatula"
-            elif "mouse" in original_label:
-                mapped = "dropper"
-            elif "phone" in original_label:
-                mapped = "ph_meter"
-            elif "book" in original_label:
-                mapped = "lab_manual"
-            else:
-                mapped = lab_options[0]  # Default to first option
-
-            if PROXY_MODE:
-                logger.debug(f"Fuzzy mapping: {original_label} → {mapped}")
+
+def spec_hash(spec: dict) -> str:
+    """Stable content hash of a spec (key order of dict sections matters for fuzzy ties)."""
+    canon = json.dumps([spec["proxy_mode"], list(spec["exact"].items()),
+                        list(spec["fuzzy"].items()), [list(p) for p in spec["fuzzy_priority"]]],
+                       ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()[:12]
+
+
+class _AhoCorasick:
+    """Multi-pattern substring matcher: one pass over the text finds every pattern."""
+
+    def __init__(self, patterns: List[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        outs = [set()]
+        for idx, pat in enumerate(patterns):
+            node = 0
+            for ch in pat:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    outs.append(set())
+                node = nxt
+            outs[node].add(idx)
+
+        # breadth-first fail links
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                if node:
+                    f = self.fail[node]
+                    while f and ch not in self.goto[f]:
+                        f = self.fail[f]
+                    self.fail[nxt] = self.goto[f].get(ch, 0)
+                outs[nxt] |= outs[self.fail[nxt]]
+        self.out = [frozenset(o) for o in outs]
+
+    def find(self, text: str) -> set:
+        """Indices of all patterns occurring in `text`."""
+        found = set()
+        node = 0
+        goto, fail, out = self.goto, self.fail, self.out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
+
+class LabelMapper:
+    """
+    Compiled form of YOLO_TO_LAB + FUZZY_MAPPINGS.
+
+    • compile_names(model.names) → list indexed by YOLO class id, so the
+      detector maps a box with one list lookup and no string work.
+    • map(label) for arbitrary strings: bounded memo cache in front of a
+      single Aho-Corasick pass over the fuzzy keys.
+    Results are identical to the original map_label() rules.
+    """
+
+    def __init__(self, exact: Dict[str, str], fuzzy: Dict[str, List[str]],
+                 priority: List[tuple], proxy_mode: bool = True,
+                 cache_size: int = MAP_CACHE_SIZE, version: str = ""):
+        self.version = version
+        self.proxy_mode = proxy_mode
+        self.exact = {sys.intern(k): sys.intern(v) for k, v in exact.items()}
+
+        # pattern table: fuzzy keys (dict order) + priority keys, deduplicated
+        patterns: List[str] = []
+        for key in list(fuzzy) + [k for k, _ in priority]:
+            if key not in patterns:
+                patterns.append(key)
+        self._patterns = patterns
+        self._fuzzy_rank = {patterns.index(k): rank for rank, k in enumerate(fuzzy)}
+        self._fuzzy_default = {patterns.index(k): sys.intern(opts[0]) for k, opts in fuzzy.items() if opts}
+        self._priority = [(patterns.index(k), sys.intern(v)) for k, v in priority]
+        self._matcher = _AhoCorasick(patterns)
+        self._names_cache: Dict[int, List[str]] = {}
+        self.map = lru_cache(maxsize=cache_size)(self._map_uncached)
+
+    @classmethod
+    def from_spec(cls, spec: dict, cache_size: int = MAP_CACHE_SIZE) -> "LabelMapper":
+        return cls(spec["exact"], spec["fuzzy"], spec["fuzzy_priority"],
+                   proxy_mode=spec["proxy_mode"], cache_size=cache_size, version=spec_hash(spec))
+
+    def compile_names(self, names) -> List[str]:
+        """YOLO `names` (dict or list) → list of interned lab labels indexed by class id."""
+        key = id(names)
+        cached = self._names_cache.get(key)
+        if cached is not None and cached[0] is names:
+            return cached[1]
+        items = names.items() if isinstance(names, dict) else enumerate(names)
+        items = [(int(k), v) for k, v in items]
+        size = max((k for k, _ in items), default=-1) + 1
+        unknown = self.map("unknown")
+        table = [unknown] * size
+        for cls_id, name in items:
+            if cls_id >= 0:
+                table[cls_id] = self.map(str(name))
+        if len(self._names_cache) >= 8:   # names dicts are per model; a handful at most
+            self._names_cache.clear()
+        self._names_cache[key] = (names, table)
+        return table
+
+    def lookup(self, table: List[str], cls_id: int) -> str:
+        """Label for a class id from a compiled table (unknown ids behave like names.get → 'unknown')."""
+        if 0 <= cls_id < len(table):
+            return table[cls_id]
+        return self.map("unknown")
+
+    def _map_uncached(self, yolo_label: str) -> str:
+        if not yolo_label:
+            return "unknown"
+
+        key = yolo_label.strip().lower()
+        mapped = self.exact.get(key)
+        if mapped is not None:
+            if self.proxy_mode:
+                logger.debug(f"Proxy mapping: {key} → {mapped}")
             return mapped
 
-    # Fallback: return original label if no mapping found
-    if PROXY_MODE:
-        logger.debug(f"No mapping found for: {original_label}")
-    return original_label
+        hits = self._matcher.find(key)
+        fuzzy_hits = [i for i in hits if i in self._fuzzy_rank]
+        if fuzzy_hits:
+            mapped = None
+            for idx, lab in self._priority:
+                if idx in hits:
+                    mapped = lab
+                    break
+            if mapped is None:
+                first = min(fuzzy_hits, key=self._fuzzy_rank.__getitem__)
+                mapped = self._fuzzy_default.get(first, key)
+            if self.proxy_mode:
+                logger.debug(f"Fuzzy mapping: {key} → {mapped}")
+            return mapped
+
+        if self.proxy_mode:
+            logger.debug(f"No mapping found for: {key}")
+        return sys.intern(key)
+
+
+class LabelMapRegistry:
+    """
+    Holds the active LabelMapper. Readers grab `current` once per frame, so a
+    reload just rebinds the attribute — inference never waits on it.
+    """
+
+    def __init__(self, path: str = DEFAULT_LABEL_MAP):
+        self.path = path
+        self.override: Optional[dict] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._mtime = 0.0
+        self._lock = threading.Lock()        # serialises compiles, not readers
+        self.base = load_label_map(path)
+        self._mtime = self._stat()
+        self.current = LabelMapper.from_spec(self.base)
+
+    def set_override(self, override: Optional[dict]) -> LabelMapper:
+        """Apply (or clear) an experiment-level override on top of the base file."""
+        with self._lock:
+            self.override = override or None
+            return self._swap(self.base)
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the data file if it changed (or force). Returns True if a new mapper was installed."""
+        with self._lock:
+            mtime = self._stat()
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                base = load_label_map(self.path)
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                print(f"   [LabelMap] Reload failed, keeping v{self.current.version}: {e}")
+                return False
+            self._mtime = mtime
+            old = self.current.version
+            self.base = base
+            self._swap(base)
+            self.last_error = None
+            if self.current.version != old:
+                self.reloads += 1
+                print(f"   [LabelMap] Reloaded {os.path.basename(self.path)}: v{old} → v{self.current.version}")
+                return True
+            return False
+
+    def get_stats(self) -> dict:
+        mapper = self.current
+        return {
+            "version": mapper.version,
+            "source": self.path,
+            "proxy_mode": mapper.proxy_mode,
+            "exact_mappings": len(mapper.exact),
+            "experiment_override": self.override is not None,
+            "reloads": self.reloads,
+            "cache": mapper.map.cache_info()._asdict(),
+            "last_error": self.last_error,
+        }
+
+    def _swap(self, base: dict) -> LabelMapper:
+        spec = merge_label_map(base, self.override)
+        if spec_hash(spec) != self.current.version:
+            self.current = LabelMapper.from_spec(spec)
+        return self.current
+
+    def _stat(self) -> float:
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return 0.0
+
+
+label_maps = LabelMapRegistry()
+
+# Module-level views of the base file, kept for existing imports
+_BASE = label_maps.base
+PROXY_MODE = _BASE["proxy_mode"]
+YOLO_TO_LAB = _BASE["exact"]
+FUZZY_MAPPINGS = _BASE["fuzzy"]
+FUZZY_PRIORITY = _BASE["fuzzy_priority"]
+
+
+def map_label(yolo_label: str) -> str:
+    """
+    Map a YOLO class name to lab equipment name with enhanced proxy mode.
+    Returns the mapped lab label string.
+    """
+    return label_maps.current.map(yolo_label)
 
 
 def get_all_lab_labels():
     """Return set of all lab equipment labels (mapped names)."""
-    return list(set(YOLO_TO_LAB.values()))
+    return list(set(label_maps.current.exact.values()))
 
 
 def get_mapping_count():
     """Return total number of label mappings."""
-    return len(YOLO_TO_LAB)
+    return len(label_maps.current.exact)
 
 
 def get_fallback_mapping(yolo_label: str) -> str:
@@ -0,0 +1,148 @@
+"""
+VocalLab admission control — decides whether a new student connection
+fits in the inference capacity the server has actually measured, instead
+of accepting everyone and letting a class larger than the box degrade
+every session at once.
+
+Capacity comes from the frame pacer. It measures inference latency, and
+the server sustains about `target_utilization / latency` frames per
+second. A student needs at least `min_fps` to be guided usefully, so:
+
+    capacity (students) = (target_utilization / latency) / min_fps
+
+Until a latency has been measured (cold start) everyone is admitted.
+Resumed sessions are always admitted; they were already counted.
+
+Overload policies (what happens to the student who would exceed capacity):
+    accept    admit anyway (old behaviour); the decision is still recorded
+    degrade   admit with a slower capture interval (× degrade_factor)
+    queue     hold the socket, send queue positions, admit when a slot frees
+    reject    send `server_at_capacity` with retry_after and close (1013)
+"""
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Optional, Tuple
+
+POLICY_ACCEPT = "accept"
+POLICY_DEGRADE = "degrade"
+POLICY_QUEUE = "queue"
+POLICY_REJECT = "reject"
+POLICIES = (POLICY_ACCEPT, POLICY_DEGRADE, POLICY_QUEUE, POLICY_REJECT)
+
+ADMIT = "admit"
+DEGRADE = "degrade"
+QUEUE = "queue"
+REJECT = "reject"
+
+QUEUE_POLL_SECONDS = 1.0           # capacity also changes as latency moves, not only on disconnects
+
+
+class AdmissionController:
+    """Capacity check + overload policy for new student connections."""
+
+    def __init__(self, pacer, policy: str = POLICY_QUEUE, min_fps: float = 0.5, max_students: int = 0,
+                 queue_max: int = 50, degrade_factor: float = 2.0):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown overload policy '{policy}' (expected one of {', '.join(POLICIES)})")
+        self.pacer = pacer
+        self.policy = policy
+        self.min_fps = min_fps
+        self.max_students = max_students    # hard cap regardless of measurements (0 = none)
+        self.queue_max = queue_max
+        self.degrade_factor = degrade_factor
+        self._queue: deque = deque()        # waiting tickets, oldest first
+        self._changed = asyncio.Event()
+        self.decisions = {ADMIT: 0, DEGRADE: 0, QUEUE: 0, REJECT: 0}
+        self.admitted_over_capacity = 0
+        self.recent = deque(maxlen=20)      # last decisions, for /stats
+
+    # ── capacity ──────────────────────────────────────────────────────
+    def capacity_fps(self) -> Optional[float]:
+        if not self.pacer.latency:
+            return None
+        return self.pacer.target_utilization / self.pacer.latency
+
+    def capacity(self) -> Optional[int]:
+        """Students the server can serve at min_fps (None until latency is measured)."""
+        fps = self.capacity_fps()
+        cap = None if fps is None else max(1, int(fps / self.min_fps))
+        if self.max_students:
+            cap = self.max_students if cap is None else min(cap, self.max_students)
+        return cap
+
+    def has_room(self, students: int) -> bool:
+        cap = self.capacity()
+        return cap is None or students < cap
+
+    # ── decisions ─────────────────────────────────────────────────────
+    def decide(self, students: int, resuming: bool = False) -> Tuple[str, str]:
+        """(decision, reason) for one new connection, given the students already connected."""
+        if resuming:
+            decision, reason = ADMIT, "resume"
+        elif self.has_room(students) and not self._queue:
+            decision, reason = ADMIT, "within capacity"
+        elif self.policy == POLICY_ACCEPT:
+            decision, reason = ADMIT, "over capacity (accept policy)"
+            self.admitted_over_capacity += 1
+        elif self.policy == POLICY_DEGRADE:
+            decision, reason = DEGRADE, "over capacity"
+        elif self.policy == POLICY_QUEUE and len(self._queue) < self.queue_max:
+            decision, reason = QUEUE, "over capacity"
+        else:
+            decision, reason = REJECT, "over capacity" if self.policy == POLICY_REJECT else "admission queue full"
+        self._record(decision, reason, students)
+        return decision, reason
+
+    def release(self):
+        """A student left (or capacity may have changed): wake queued connections."""
+        self._changed.set()
+        self._changed.clear()
+
+    async def wait_for_slot(self, students: Callable[[], int],
+                            on_position: Callable[[int], Awaitable[None]]) -> None:
+        """Wait in FIFO order until there is room; on_position(n) is awaited whenever n changes."""
+        ticket = object()
+        self._queue.append(ticket)
+        last_position = None
+        try:
+            while True:
+                position = self._queue.index(ticket) + 1
+                if position == 1 and self.has_room(students()):
+                    self._record(ADMIT, "from queue", students())
+                    return
+                if position != last_position:
+                    last_position = position
+                    await on_position(position)
+                try:
+                    await asyncio.wait_for(self._changed.wait(), QUEUE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._queue.remove(ticket)
+            self.release()                  # the next ticket moves up
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._queue)
+
+    def _record(self, decision: str, reason: str, students: int):
+        self.decisions[decision] += 1
+        self.recent.append({"time": round(time.time(), 1), "decision": decision, "reason": reason,
+                            "students": students, "capacity": self.capacity()})
+
+    def get_stats(self, students: int) -> dict:
+        fps = self.capacity_fps()
+        return {
+            "policy": self.policy,
+            "students": students,
+            "capacity": self.capacity(),
+            "capacity_fps": round(fps, 2) if fps else None,
+            "requested_fps": round(self.pacer.requested_fps(), 2),
+            "min_fps_per_student": self.min_fps,
+            "max_students": self.max_students or None,
+            "queue_length": len(self._queue),
+            "decisions": dict(self.decisions),
+            "admitted_over_capacity": self.admitted_over_capacity,
+            "recent": list(self.recent),
+        }
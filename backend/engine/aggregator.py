@@ -0,0 +1,161 @@
+"""
+VocalLab dashboard aggregator — collects per-student changes between ticks
+and turns them into one `dashboard_batch` message per tick instead of one
+`student_update` per processed frame.
+
+Batch format:
+    {
+      "type": "dashboard_batch",
+      "seq": 1042,              # +1 per batch; a gap means the client missed one
+      "keyframe": false,        # true → `students` holds full state, replace everything
+      "students": {
+        "STU-…": {"detections": [...], "student_stats": {"frames_processed": 88}},
+        "STU-…": {"step_info": {"step": 3}, "unset": {"step_info": ["hint"]}},
+      },
+      "removed": ["STU-…"],
+      "worker": "host-1234",    # batching worker; seq and keyframes are per worker
+      "timestamp": "…"
+    }
+
+Dict fields (step_info, student_stats) are diffed one level deep, so only the
+keys that changed are sent; keys that disappeared are listed under `unset`
+(field -> removed keys) so dashboards drop them without waiting for a keyframe. Event fields (safety_alert, step_advance) are not
+state: they are latched for the tick they happened in and never repeated.
+"""
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+DEFAULT_TICK_HZ = 4
+DEFAULT_KEYFRAME_SECONDS = 10
+
+EVENT_FIELDS = ("safety_alert", "step_advance")
+
+
+class DashboardAggregator:
+    """Per-tick delta encoder for student updates."""
+
+    def __init__(self, keyframe_every: int = DEFAULT_TICK_HZ * DEFAULT_KEYFRAME_SECONDS,
+                 snapshot: Callable[[str], dict] = None, worker: str = None):
+        self.keyframe_every = max(1, keyframe_every)
+        self.snapshot = snapshot              # student_id -> student_stats, evaluated once per tick
+        self.worker = worker                  # origin id stamped on batches (sharded mode: seq is per worker)
+        self.seq = 0
+        self._state: Dict[str, dict] = {}     # last state sent to dashboards
+        self._pending: Dict[str, dict] = {}   # fields changed since the last tick
+        self._removed: set = set()
+        self._ticks = 0
+        self.updates_in = 0
+        self.batches_out = 0
+        self.keyframes_out = 0
+
+    # ── producer side ──────────────────────────────────────────────────
+    def update(self, student_id: str, **fields):
+        """Record the latest values for a student; cheap, called once per frame."""
+        self.updates_in += 1
+        pending = self._pending.setdefault(student_id, {})
+        for key, value in fields.items():
+            if key in EVENT_FIELDS:
+                if value:                     # keep the first alert / advance of the tick
+                    pending.setdefault(key, value)
+            else:
+                pending[key] = value
+        self._removed.discard(student_id)
+
+    def remove(self, student_id: str):
+        self._pending.pop(student_id, None)
+        if self._state.pop(student_id, None) is not None:
+            self._removed.add(student_id)
+
+    def clear(self):
+        """Forget all students (experiment reset); the next tick is a keyframe."""
+        self._state.clear()
+        self._pending.clear()
+        self._removed.clear()
+        self._ticks = 0
+
+    # ── tick ──────────────────────────────────────────────────────────
+    def flush(self) -> Optional[dict]:
+        """Build this tick's batch. Returns None when nothing changed and no keyframe is due."""
+        keyframe = self._ticks % self.keyframe_every == 0
+        self._ticks += 1
+
+        students: Dict[str, dict] = {}
+        for sid, pending in self._pending.items():
+            if self.snapshot:
+                pending["student_stats"] = self.snapshot(sid)
+            state = self._state.setdefault(sid, {})
+            delta = {}
+            for key, value in pending.items():
+                if key in EVENT_FIELDS:
+                    delta[key] = value
+                    continue
+                old = state.get(key)
+                if isinstance(value, dict) and isinstance(old, dict):
+                    changed = {k: v for k, v in value.items() if old.get(k, _MISSING) != v}
+                    if changed:
+                        delta[key] = changed
+                        old.update(changed)
+                    gone = [k for k in old if k not in value]
+                    if gone:
+                        delta.setdefault("unset", {})[key] = gone
+                        for k in gone:
+                            del old[k]
+                elif old != value or key not in state:
+                    delta[key] = value
+                    state[key] = dict(value) if isinstance(value, dict) else value
+            if delta:
+                students[sid] = delta
+        self._pending.clear()
+
+        if keyframe:
+            for sid, state in self._state.items():
+                full = {k: (dict(v) if isinstance(v, dict) else v) for k, v in state.items()}
+                for key in EVENT_FIELDS:
+                    if key in students.get(sid, {}):
+                        full[key] = students[sid][key]
+                students[sid] = full
+            self._removed.clear()
+        elif not students and not self._removed:
+            return None
+
+        self.seq += 1
+        self.batches_out += 1
+        if keyframe:
+            self.keyframes_out += 1
+        msg = {
+            "type": "dashboard_batch",
+            "seq": self.seq,
+            "keyframe": keyframe,
+            "students": students,
+            "removed": sorted(self._removed),
+            "worker": self.worker,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        self._removed.clear()
+        return msg
+
+    def keyframe(self) -> dict:
+        """Full state at the current seq, for a dashboard that just joined or lost sync."""
+        return {
+            "type": "dashboard_batch",
+            "seq": self.seq,
+            "keyframe": True,
+            "students": {sid: {k: (dict(v) if isinstance(v, dict) else v) for k, v in state.items()}
+                         for sid, state in self._state.items()},
+            "removed": [],
+            "worker": self.worker,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            "seq": self.seq,
+            "students": len(self._state),
+            "updates_in": self.updates_in,
+            "batches_out": self.batches_out,
+            "keyframes_out": self.keyframes_out,
+            "keyframe_every_ticks": self.keyframe_every,
+        }
+
+
+_MISSING = object()
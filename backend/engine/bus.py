@@ -0,0 +1,154 @@
+"""
+VocalLab event bus — pub/sub between backend workers in sharded mode.
+
+    memory://            InMemoryBus: process-local; several cluster nodes in one
+                         process share it (tests, simulations, single-box dev)
+    redis://host:6379/0  RedisBus: any Redis-protocol server (Redis, KeyDB, Valkey,
+                         Dragonfly); needs the optional `redis` package
+
+Payloads are plain dicts. Every subscriber — including the publisher's own
+node — receives every message on a channel, so delivery order is the same
+everywhere.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List
+
+from engine import codec
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:           # optional — only needed for redis:// bus URLs
+    aioredis = None
+
+Handler = Callable[[str, dict], Awaitable[None]]
+
+
+class InMemoryBus:
+    """Process-local pub/sub with per-subscriber asyncio queues (no cross-process delivery)."""
+
+    def __init__(self, max_pending: int = 10_000):
+        self.max_pending = max_pending
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._queue: asyncio.Queue = None
+        self._task: asyncio.Task = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers[channel].append(handler)
+
+    def unsubscribe(self, channel: str, handler: Handler):
+        if handler in self._handlers.get(channel, []):
+            self._handlers[channel].remove(handler)
+
+    async def publish(self, channel: str, payload: dict):
+        self.published += 1
+        try:
+            self._queue.put_nowait((channel, payload))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self):
+        while True:
+            channel, payload = await self._queue.get()
+            for handler in list(self._handlers.get(channel, ())):
+                try:
+                    await handler(channel, payload)
+                    self.delivered += 1
+                except Exception as e:
+                    print(f"   [Bus] Handler error on {channel}: {e}")
+
+    def get_stats(self) -> dict:
+        return {"type": "memory", "published": self.published, "delivered": self.delivered, "dropped": self.dropped,
+                "pending": self._queue.qsize() if self._queue else 0}
+
+
+class RedisBus:
+    """Redis PUBLISH/SUBSCRIBE transport; payloads travel as JSON."""
+
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("redis:// bus needs the 'redis' package (pip install redis)")
+        self.url = url
+        self._redis = aioredis.from_url(url)
+        self._pubsub = None
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._task: asyncio.Task = None
+        self.published = 0
+        self.delivered = 0
+
+    async def start(self):
+        self._pubsub = self._redis.pubsub()
+        if self._handlers:
+            await self._pubsub.subscribe(*self._handlers)
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        if self._pubsub:
+            await self._pubsub.close()
+        await self._redis.close()
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers[channel].append(handler)
+        if self._pubsub is not None:
+            asyncio.get_running_loop().create_task(self._pubsub.subscribe(channel))
+
+    async def publish(self, channel: str, payload: dict):
+        self.published += 1
+        await self._redis.publish(channel, codec.encode_json(payload))
+
+    async def _run(self):
+        while True:
+            try:
+                msg = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"   [Bus] Redis receive error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not msg:
+                continue
+            channel = msg["channel"].decode() if isinstance(msg["channel"], bytes) else msg["channel"]
+            try:
+                payload = codec.decode(msg["data"].decode() if isinstance(msg["data"], bytes) else msg["data"])
+            except ValueError:
+                continue
+            for handler in list(self._handlers.get(channel, ())):
+                try:
+                    await handler(channel, payload)
+                    self.delivered += 1
+                except Exception as e:
+                    print(f"   [Bus] Handler error on {channel}: {e}")
+
+    def get_stats(self) -> dict:
+        return {"type": "redis", "url": self.url.split("@")[-1], "published": self.published, "delivered": self.delivered}
+
+
+_MEMORY_BUS = None
+
+
+def create_bus(url: str):
+    """Bus for a URL. All memory:// users in one process share one InMemoryBus."""
+    global _MEMORY_BUS
+    if url.startswith("memory://"):
+        if _MEMORY_BUS is None:
+            _MEMORY_BUS = InMemoryBus()
+        return _MEMORY_BUS
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBus(url)
+    raise ValueError(f"unsupported bus URL '{url}' (use memory:// or redis://)")
@@ -0,0 +1,94 @@
+"""
+VocalLab capture profile — tells student clients what to upload so the
+server decodes exactly the pixels the model will use.
+
+YOLO letterboxes every frame to `imgsz` on its long side, so a 4000×3000
+phone photo is base64'd, uploaded and fully decoded only to be shrunk to
+640×480. The profile announces the inference size and a JPEG quality in
+`welcome`; when it is revised mid-session (e.g. the inference size
+changes) every student gets a `capture_profile` message:
+
+    {"type": "capture_profile", "long_side": 640, "width": 640, "height": 480,
+     "jpeg_quality": 0.4, "revision": 2}
+
+Clients that still send larger frames are decoded at a reduced scale
+(cv2.IMREAD_REDUCED_COLOR_*) chosen from the JPEG header, so the server
+never pays for pixels the model throws away.
+"""
+from typing import Optional, Tuple
+
+YOLO_STRIDE = 32
+DEFAULT_JPEG_QUALITY = 0.4
+
+# SOFn markers carry the frame size (C4 = DHT, C8 = JPG, CC = DAC are not SOF)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def clean_imgsz(imgsz: int) -> int:
+    """Round an inference size to the model stride (YOLO needs multiples of 32)."""
+    return max(YOLO_STRIDE, int(round(imgsz / YOLO_STRIDE)) * YOLO_STRIDE)
+
+
+class CaptureProfile:
+    """Target upload size / JPEG quality for student cameras."""
+
+    __slots__ = ("long_side", "width", "height", "jpeg_quality", "revision")
+
+    def __init__(self, imgsz: int, jpeg_quality: float = DEFAULT_JPEG_QUALITY, revision: int = 1):
+        self.long_side = clean_imgsz(imgsz)
+        self.width = self.long_side                       # 4:3 landscape; clients rotate as needed
+        self.height = self.long_side * 3 // 4
+        self.jpeg_quality = round(min(max(float(jpeg_quality), 0.05), 1.0), 2)
+        self.revision = revision
+
+    def revise(self, imgsz: int = None, jpeg_quality: float = None) -> "CaptureProfile":
+        """A new profile with the next revision number (unchanged fields carried over)."""
+        return CaptureProfile(imgsz if imgsz is not None else self.long_side,
+                              jpeg_quality if jpeg_quality is not None else self.jpeg_quality,
+                              self.revision + 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "long_side": self.long_side,
+            "width": self.width,
+            "height": self.height,
+            "jpeg_quality": self.jpeg_quality,
+            "revision": self.revision,
+        }
+
+
+def jpeg_size(raw: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG's SOF header without decoding it; None if not a JPEG."""
+    if len(raw) < 4 or raw[0] != 0xFF or raw[1] != 0xD8:
+        return None
+    i, n = 2, len(raw)
+    while i + 9 < n:
+        if raw[i] != 0xFF:
+            return None
+        marker = raw[i + 1]
+        if marker == 0xFF:                     # fill byte
+            i += 1
+            continue
+        if marker in _SOF_MARKERS:
+            height = (raw[i + 5] << 8) | raw[i + 6]
+            width = (raw[i + 7] << 8) | raw[i + 8]
+            return width, height
+        if marker == 0xD9 or marker == 0xDA:   # end of image / start of scan — no SOF found
+            return None
+        i += 2 + ((raw[i + 2] << 8) | raw[i + 3])
+    return None
+
+
+def reduced_scale(raw: bytes, long_side: int) -> int:
+    """
+    Largest JPEG decode reduction (1, 2, 4 or 8) that still leaves the image's
+    long side at least `long_side` pixels.
+    """
+    size = jpeg_size(raw)
+    if not size:
+        return 1
+    longest = max(size)
+    scale = 1
+    while scale < 8 and longest // (scale * 2) >= long_side:
+        scale *= 2
+    return scale
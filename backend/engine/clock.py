@@ -0,0 +1,38 @@
+"""
+VocalLab clocks — the time source injected into ExperimentFSM and the
+ConnectionManager. Production uses SystemClock; simulations and replays use
+VirtualClock so hours of classroom activity run deterministically and as
+fast as the CPU allows.
+"""
+import time
+
+
+class SystemClock:
+    """Wall-clock time (seconds since the epoch)."""
+
+    __slots__ = ()
+
+    def time(self) -> float:
+        return time.time()
+
+
+class VirtualClock:
+    """Manually advanced clock for simulations: time only moves on advance()/set()."""
+
+    __slots__ = ("_now",)
+
+    def __init__(self, start: float = 0.0):
+        self._now = float(start)
+
+    def time(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> float:
+        self._now += seconds
+        return self._now
+
+    def set(self, now: float):
+        self._now = float(now)
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,111 @@
+"""
+VocalLab cluster node — sharded mode for running several backend workers
+(processes or machines) behind a sticky load balancer.
+
+Each worker owns the student sessions connected to it, with its own
+detector, FSMs, parking and journal. Everything dashboards need crosses
+workers over the event bus:
+
+    vocallab.dashboard   room-scoped dashboard messages (updates, batches, lifecycle)
+    vocallab.control     keyframe requests and room resets
+    vocallab.stats       periodic per-worker stats, summed into cluster totals
+
+Dashboard batches carry their `worker` id; a dashboard tracks seq/keyframes
+per worker, since each worker batches its own students.
+"""
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+CH_DASHBOARD = "vocallab.dashboard"
+CH_CONTROL = "vocallab.control"
+CH_STATS = "vocallab.stats"
+
+DEFAULT_STATS_INTERVAL = 5.0
+
+# Counters summed across workers for /stats → cluster
+SUMMED_STATS = ("frames_processed", "total_detections", "step_advances", "safety_alerts",
+                "students_connected", "dashboards_connected", "parked_sessions")
+
+
+class ClusterNode:
+    """One worker's view of the cluster: publishes to and consumes from the bus."""
+
+    def __init__(self, bus, worker_id: str,
+                 deliver: Callable[[dict, Optional[str], Optional[str]], Awaitable[None]],
+                 on_control: Callable[[dict], Awaitable[None]],
+                 local_stats: Callable[[], dict],
+                 stats_interval: float = DEFAULT_STATS_INTERVAL):
+        self.bus = bus
+        self.worker_id = worker_id
+        self.deliver = deliver                # (message, room, coalesce_key) → local dashboards
+        self.on_control = on_control          # control message from any worker (incl. this one)
+        self.local_stats = local_stats
+        self.stats_interval = stats_interval
+        self.peers: Dict[str, dict] = {}      # worker_id -> {"stats": {...}, "seen": ts}
+        self._stats_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.received = 0
+
+    async def start(self):
+        self.bus.subscribe(CH_DASHBOARD, self._on_dashboard)
+        self.bus.subscribe(CH_CONTROL, self._on_control)
+        self.bus.subscribe(CH_STATS, self._on_stats)
+        await self.bus.start()
+        self._stats_task = asyncio.create_task(self._stats_loop())
+        print(f"   [Cluster] Worker {self.worker_id} joined the bus")
+
+    async def close(self):
+        if self._stats_task:
+            self._stats_task.cancel()
+        for channel, handler in ((CH_DASHBOARD, self._on_dashboard), (CH_CONTROL, self._on_control),
+                                 (CH_STATS, self._on_stats)):
+            if hasattr(self.bus, "unsubscribe"):
+                self.bus.unsubscribe(channel, handler)
+        await self.bus.close()
+
+    # ── outbound ──────────────────────────────────────────────────────
+    async def publish_dashboard(self, message: dict, room: str, coalesce_key: str = None):
+        self.published += 1
+        await self.bus.publish(CH_DASHBOARD, {"origin": self.worker_id, "room": room,
+                                              "coalesce_key": coalesce_key, "message": message})
+
+    async def publish_control(self, action: str, **data):
+        await self.bus.publish(CH_CONTROL, {"origin": self.worker_id, "action": action, **data})
+
+    # ── inbound ───────────────────────────────────────────────────────
+    async def _on_dashboard(self, channel: str, envelope: dict):
+        self.received += 1
+        await self.deliver(envelope["message"], envelope.get("room"), envelope.get("coalesce_key"))
+
+    async def _on_control(self, channel: str, message: dict):
+        await self.on_control(message)
+
+    async def _on_stats(self, channel: str, message: dict):
+        self.peers[message["worker"]] = {"stats": message.get("stats", {}), "seen": time.time()}
+
+    async def _stats_loop(self):
+        while True:
+            try:
+                await self.bus.publish(CH_STATS, {"worker": self.worker_id, "stats": self.local_stats()})
+                await asyncio.sleep(self.stats_interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"   [Cluster] Stats publish error: {e}")
+                await asyncio.sleep(self.stats_interval)
+
+    # ── stats ─────────────────────────────────────────────────────────
+    def aggregate(self) -> dict:
+        """Sum counters over workers heard from within 3 stats intervals (this one always counts)."""
+        cutoff = time.time() - 3 * self.stats_interval
+        workers = {wid: p["stats"] for wid, p in self.peers.items() if p["seen"] >= cutoff}
+        workers[self.worker_id] = self.local_stats()
+        totals = {key: sum(s.get(key, 0) or 0 for s in workers.values()) for key in SUMMED_STATS}
+        return {
+            "worker_id": self.worker_id,
+            "workers": len(workers),
+            "totals": totals,
+            "per_worker": workers,
+            "bus": self.bus.get_stats(),
+        }
@@ -0,0 +1,98 @@
+"""
+VocalLab wire codec — encode each outgoing message once and share the result
+across every recipient that speaks the same format.
+
+• JSON uses orjson when installed (several times faster than the stdlib
+  encoder, handles numpy scalars) and falls back to `json`.
+• MessagePack is opt-in: a client that offers the `vocallab.msgpack`
+  WebSocket subprotocol gets binary frames. It is only offered when the
+  `msgpack` package is installed.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:           # optional — stdlib json is the fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:           # optional — MessagePack subprotocol disabled
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+MSGPACK_SUBPROTOCOL = "vocallab.msgpack"
+
+_ORJSON_OPTS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def encode_json(message) -> str:
+    if orjson:
+        return orjson.dumps(message, option=_ORJSON_OPTS).decode()
+    return json.dumps(message)
+
+
+def encode_msgpack(message) -> bytes:
+    return msgpack.packb(message, use_bin_type=True, default=_msgpack_default)
+
+
+def _msgpack_default(obj):
+    # numpy scalars / arrays that slipped into a payload
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"cannot pack {type(obj).__name__}")
+
+
+def negotiate(ws):
+    """
+    Pick the wire format from the client's offered subprotocols.
+    Returns (format, subprotocol_to_accept_or_None).
+    """
+    offered = ws.scope.get("subprotocols") or []
+    if msgpack and MSGPACK_SUBPROTOCOL in offered:
+        return MSGPACK, MSGPACK_SUBPROTOCOL
+    return JSON, None
+
+
+class Outgoing:
+    """A message plus its lazily computed encodings — each format is encoded at most once."""
+
+    __slots__ = ("message", "_json", "_msgpack")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self._json = None
+        self._msgpack = None
+
+    def encoded(self, fmt: str = JSON):
+        if fmt == MSGPACK:
+            if self._msgpack is None:
+                self._msgpack = encode_msgpack(self.message)
+            return self._msgpack
+        if self._json is None:
+            self._json = encode_json(self.message)
+        return self._json
+
+
+def decode(raw):
+    """Parse an incoming text (JSON) or binary (MessagePack) frame. Raises ValueError on bad input."""
+    if isinstance(raw, (bytes, bytearray)):
+        if msgpack is None:
+            raise ValueError("binary frame but msgpack is not installed")
+        try:
+            return msgpack.unpackb(raw, raw=False)
+        except Exception as e:
+            raise ValueError(f"bad msgpack frame: {e}") from e
+    if orjson:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+async def send(ws, message, fmt: str = JSON):
+    """Send a dict (or an Outgoing) to one socket in its negotiated format."""
+    payload = (message if isinstance(message, Outgoing) else Outgoing(message)).encoded(fmt)
+    if isinstance(payload, bytes):
+        await ws.send_bytes(payload)
+    else:
+        await ws.send_text(payload)
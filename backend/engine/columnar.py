@@ -0,0 +1,114 @@
+"""
+VocalLab columnar detections — an opt-in compact wire form for detection lists.
+
+Default form (one dict per object, `center` derivable from `bbox`):
+    [{"label": "beaker", "confidence": 0.873, "bbox": [12, 40, 200, 310], "center": [106.0, 175.0]}, ...]
+
+Columnar form (client connects with `?detections=columnar`):
+    {"n": 2,
+     "labels": [0, 3],               # ids into the session label dictionary
+     "conf":   [87, 41],             # confidence × 100, rounded
+     "boxes":  [12, 40, 200, 310, …]} # flat x1,y1,x2,y2 ints clamped to int16
+
+The label dictionary is append-only. Whenever it grows, the message carrying
+the new ids also carries `"label_dictionary": {"offset": k, "labels": [...]}`;
+clients write those names into their table starting at `offset`. A table
+shared by several clients (dashboards) passes each client's own `since`
+offset, so a client that missed the growing message still gets the entries.
+"""
+from typing import Dict, List, Optional
+
+DICTS = "dicts"
+COLUMNAR = "columnar"
+
+_INT16_MIN, _INT16_MAX = -32768, 32767
+
+
+def _i16(v) -> int:
+    v = int(v)
+    return _INT16_MIN if v < _INT16_MIN else _INT16_MAX if v > _INT16_MAX else v
+
+
+def negotiate(ws) -> str:
+    """Detection wire form requested by the client (query param `detections`)."""
+    return COLUMNAR if ws.query_params.get("detections") == COLUMNAR else DICTS
+
+
+class LabelDictionary:
+    """Append-only label ↔ id table shared by one session (or by all dashboards)."""
+
+    __slots__ = ("labels", "_ids")
+
+    def __init__(self, labels=()):
+        self.labels: List[str] = []
+        self._ids: Dict[str, int] = {}
+        for label in labels:
+            self.id_of(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def id_of(self, label: str) -> int:
+        i = self._ids.get(label)
+        if i is None:
+            i = self._ids[label] = len(self.labels)
+            self.labels.append(label)
+        return i
+
+    def since(self, offset: int) -> Optional[dict]:
+        """Dictionary update covering ids ≥ offset, or None if nothing was added."""
+        if offset >= len(self.labels):
+            return None
+        return {"offset": offset, "labels": self.labels[offset:]}
+
+
+def pack(detections: list, labels: LabelDictionary) -> dict:
+    """Detection dicts → columnar arrays (may grow `labels`)."""
+    ids, conf, boxes = [], [], []
+    for d in detections:
+        ids.append(labels.id_of(d.get("label", "")))
+        conf.append(int(round(float(d.get("confidence", 0.0)) * 100)))
+        b = d.get("bbox") or (0, 0, 0, 0)
+        boxes.extend((_i16(b[0]), _i16(b[1]), _i16(b[2]), _i16(b[3])))
+    return {"n": len(ids), "labels": ids, "conf": conf, "boxes": boxes}
+
+
+def unpack(packed: dict, labels: List[str]) -> list:
+    """Columnar arrays → detection dicts (confidence quantised, center recomputed)."""
+    out = []
+    boxes = packed.get("boxes", [])
+    for i, (lid, c) in enumerate(zip(packed.get("labels", []), packed.get("conf", []))):
+        x1, y1, x2, y2 = boxes[4 * i: 4 * i + 4]
+        out.append({
+            "label": labels[lid] if 0 <= lid < len(labels) else "",
+            "confidence": c / 100,
+            "bbox": [x1, y1, x2, y2],
+            "center": [(x1 + x2) / 2, (y1 + y2) / 2],
+        })
+    return out
+
+
+def pack_message(message: dict, labels: LabelDictionary, since: Optional[int] = None) -> dict:
+    """
+    Shallow copy of an outgoing message with every detection list packed.
+    Understands `detections` at the top level and inside `dashboard_batch` students.
+    Adds `label_dictionary` with the entries from `since` on (default: the ones this
+    packing added; 0: the whole table).
+    """
+    start = len(labels) if since is None else since
+    out = dict(message)
+    if isinstance(out.get("detections"), list):
+        out["detections"] = pack(out["detections"], labels)
+    students = out.get("students")
+    if isinstance(students, dict):
+        packed = {}
+        for sid, fields in students.items():
+            if isinstance(fields.get("detections"), list):
+                fields = dict(fields)
+                fields["detections"] = pack(fields["detections"], labels)
+            packed[sid] = fields
+        out["students"] = packed
+    update = labels.since(start)
+    if update:
+        out["label_dictionary"] = update
+    return out
@@ -10,7 +10,7 @@ import logging
 import base64
 import traceback
 import time
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple
 
 # ── PyTorch 2.6 patch (MUST be before ultralytics import) ──────
 import torch
@@ -30,7 +30,13 @@ _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 _BACKEND_DIR = os.path.dirname(_SCRIPT_DIR)
 if _BACKEND_DIR not in sys.path:
     sys.path.insert(0, _BACKEND_DIR)
-from config.label_map import map_label
+from config.label_map import label_maps
+from .capture import clean_imgsz, reduced_scale
+from .logs import log_event
+
+# cv2 flag per JPEG decode reduction factor
+_REDUCED_READ_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                       4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
 
 logger = logging.getLogger(__name__)
 
@@ -53,13 +59,14 @@ def _resolve_model_path():
 class ObjectDetector:
     """YOLO-based detector with lab-equipment label mapping and performance optimizations."""
 
-    def __init__(self, model_path=None, confidence=0.30, batch_size=4):
+    def __init__(self, model_path=None, confidence=0.30, batch_size=4, imgsz=640):
         self.confidence = confidence
         self.batch_size = batch_size
+        self.imgsz = clean_imgsz(imgsz)  # inference size; also the capture profile's long side
+        self.reduced_decodes = 0         # oversized uploads decoded at 1/2, 1/4 or 1/8 scale
         self.total_detections = 0
         self.total_frames = 0
-        self.last_detection_time = 0.0
-        self.detection_cooldown = 0.1  # seconds between detections to avoid duplicate processing
+        self.observe_stage = None        # optional (stage, seconds) callback: "decode" / "inference" timings
 
         path = model_path or _resolve_model_path()
         print(f"   [Detector] Loading YOLO: {path} (conf={confidence}, batch={batch_size})")
@@ -85,17 +92,25 @@ class ObjectDetector:
         if not isinstance(base64_string, str) or not base64_string:
             return [], 0, 0
         try:
+            t0 = time.perf_counter()
             # Strip data URL prefix if present
             if "," in base64_string[:120]:
                 base64_string = base64_string.split(",", 1)[1]
             raw = base64.b64decode(base64_string)
             np_arr = np.frombuffer(raw, dtype=np.uint8)
-            frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+            # Oversized JPEG (client ignored the capture profile): let libjpeg
+            # downscale while decoding instead of decoding every pixel
+            scale = reduced_scale(raw, self.imgsz)
+            if scale > 1:
+                self.reduced_decodes += 1
+            frame = cv2.imdecode(np_arr, _REDUCED_READ_FLAGS[scale])
+            if self.observe_stage:
+                self.observe_stage("decode", time.perf_counter() - t0)
             if frame is None:
                 return [], 0, 0
             return self.detect_frame(frame)
         except Exception as e:
-            print(f"   [Detector] detect_base64 error: {e}")
+            log_event(logger, "detector.error", "detect_base64 error: %s", e, level=logging.ERROR)
             return [], 0, 0
 
     def detect_frame(self, frame: np.ndarray) -> Tuple[List[Dict], int, int]:
@@ -119,30 +134,29 @@ class ObjectDetector:
         if self.model is None:
             return detections, w, h
 
-        # Rate limiting to prevent duplicate processing
-        now = time.time()
-        if now - self.last_detection_time < self.detection_cooldown:
-            return detections, w, h
-        self.last_detection_time = now
-
         try:
+            t0 = time.perf_counter()
             results = self.model.predict(
                 frame,
                 conf=self.confidence,
                 verbose=False,
-                imgsz=640,
+                imgsz=self.imgsz,
             )
+            if self.observe_stage:
+                self.observe_stage("inference", time.perf_counter() - t0)
             if not results or len(results[0].boxes) == 0:
                 return detections, w, h
 
-            names = results[0].names or {}
+            # class id → lab label via a table compiled once per model names dict;
+            # grab the mapper once so a hot reload never splits a frame
+            mapper = label_maps.current
+            labels = mapper.compile_names(results[0].names or {})
             for box in results[0].boxes:
                 try:
                     x1, y1, x2, y2 = box.xyxy[0].tolist()
                     conf = float(box.conf[0].item())
                     cls_id = int(box.cls[0].item())
-                    yolo_name = names.get(cls_id, "unknown")
-                    lab_label = map_label(str(yolo_name))
+                    lab_label = mapper.lookup(labels, cls_id)
                     cx = (x1 + x2) / 2
                     cy = (y1 + y2) / 2
                     detections.append({
@@ -155,11 +169,11 @@ class ObjectDetector:
                     continue  # skip malformed box, don't crash
 
             self.total_detections += len(detections)
-            if detections:
-                labels = [d["label"] for d in detections]
-                print(f"   [Detector] Frame {self.total_frames}: {len(detections)} objects → {labels}")
+            if detections and logger.isEnabledFor(logging.INFO):
+                log_event(logger, "detector.frame", "Frame %d: %d objects → %s", self.total_frames,
+                          len(detections), [d["label"] for d in detections])
         except Exception as e:
-            print(f"   [Detector] detect_frame error: {e}")
+            log_event(logger, "detector.error", "detect_frame error: %s", e, level=logging.ERROR)
 
         return detections, w, h
 
@@ -198,10 +212,11 @@ class ObjectDetector:
                 valid_frames,
                 conf=self.confidence,
                 verbose=False,
-                imgsz=640,
+                imgsz=self.imgsz,
             )
 
             # Process results and map back to original order
+            mapper = label_maps.current
             detections_list = []
             valid_idx = 0
             for frame in frames:
@@ -213,13 +228,12 @@ class ObjectDetector:
                         valid_idx += 1
                         detections = []
                         if result and len(result.boxes) > 0:
-                            names = result.names or {}
+                            labels = mapper.compile_names(result.names or {})
                             for box in result.boxes:
                                 x1, y1, x2, y2 = box.xyxy[0].tolist()
                                 conf = float(box.conf[0].item())
                                 cls_id = int(box.cls[0].item())
-                                yolo_name = names.get(cls_id, "unknown")
-                                lab_label = map_label(str(yolo_name))
+                                lab_label = mapper.lookup(labels, cls_id)
                                 cx = (x1 + x2) / 2
                                 cy = (y1 + y2) / 2
                                 detections.append({
@@ -235,8 +249,7 @@ class ObjectDetector:
 
             return detections_list
         except Exception as e:
-            logger.exception("detect_batch_base64 failed: %s", e)
-            print(f"   [Detector] detect_batch_base64 error: {e}")
+            log_event(logger, "detector.error", "detect_batch_base64 error: %s", e, level=logging.ERROR, exc_info=True)
             return [([], 0, 0) for _ in base64_strings]
 
     @staticmethod
@@ -253,6 +266,9 @@ class ObjectDetector:
             "model_path": self.model_path if hasattr(self, "model_path") else None,
             "model_loaded": self.model is not None,
             "confidence_threshold": self.confidence,
+            "imgsz": self.imgsz,
+            "reduced_decodes": self.reduced_decodes,
             "total_frames_processed": self.total_frames,
             "total_detections": self.total_detections,
+            "label_map_version": label_maps.current.version,
         }
@@ -0,0 +1,160 @@
+"""
+VocalLab dashboard fan-out — one bounded send queue and sender task per
+dashboard, so a teacher on a slow hotspot never delays other dashboards or
+the student handler that triggered the broadcast.
+
+• enqueue() never awaits: a full queue drops its oldest entry.
+• Messages with a coalesce key replace the queued message with the same key
+  (e.g. the latest `student_update` for one student wins).
+• A send that stays blocked past `stuck_after` seconds disconnects the client.
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Optional
+
+from .logs import log_event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_STUCK_SECONDS = 10.0
+
+
+class DashboardClient:
+    """Per-dashboard queue + sender task."""
+
+    def __init__(self, ws, on_dead: Callable = None,
+                 max_queue: int = DEFAULT_QUEUE_SIZE, stuck_after: float = DEFAULT_STUCK_SECONDS,
+                 wire_format: str = "json", detections_format: str = "dicts", subscription=None,
+                 room: str = None):
+        self.ws = ws
+        self.room = room                      # room id the dashboard joined
+        self.wire_format = wire_format        # "json" text frames or "msgpack" binary frames
+        self.detections_format = detections_format  # "dicts" or "columnar"
+        self.subscription = subscription      # engine.topics.Subscription (None = everything)
+        self.label_offset = 0                 # columnar: shared label dictionary entries this client has
+        self.on_dead = on_dead
+        self.max_queue = max_queue
+        self.stuck_after = stuck_after
+        self.connected_at = time.time()
+        self._queue: deque = deque()          # entries: [key, payload]
+        self._keyed: dict = {}                # coalesce key -> queued entry
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._send_started = 0.0
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    # ── lifecycle ──────────────────────────────────────────────────────
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._keyed.clear()
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    # ── producer side (never blocks) ──────────────────────────────────
+    def enqueue(self, payload, key: str = None) -> bool:
+        """Queue a pre-serialised payload. Returns False if the client is closed or stuck."""
+        if self.closed:
+            return False
+        if self._send_started and time.time() - self._send_started > self.stuck_after:
+            self._die(f"send blocked > {self.stuck_after:g}s")
+            return False
+
+        if key is not None:
+            entry = self._keyed.get(key)
+            if entry is not None:
+                entry[1] = payload          # newest state wins, keeps its place in line
+                self.coalesced += 1
+                return True
+
+        if len(self._queue) >= self.max_queue:
+            old_key, _ = self._queue.popleft()
+            if old_key is not None:
+                self._keyed.pop(old_key, None)
+            self.dropped += 1
+            self.label_offset = 0             # the dropped message may have carried dictionary entries
+
+        entry = [key, payload]
+        self._queue.append(entry)
+        if key is not None:
+            self._keyed[key] = entry
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._wakeup.set()
+        return True
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def get_stats(self) -> dict:
+        return {
+            "room": self.room,
+            "wire_format": self.wire_format,
+            "detections_format": self.detections_format,
+            "subscription": self.subscription.describe() if self.subscription else None,
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self.max_depth,
+            "queue_limit": self.max_queue,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "sending_for": round(time.time() - self._send_started, 2) if self._send_started else 0.0,
+            "connected_for": round(time.time() - self.connected_at, 1),
+        }
+
+    # ── sender task ───────────────────────────────────────────────────
+    async def _run(self):
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                key, payload = self._queue.popleft()
+                if key is not None:
+                    self._keyed.pop(key, None)
+                self._send_started = time.time()
+                try:
+                    if isinstance(payload, (bytes, bytearray)):
+                        await asyncio.wait_for(self.ws.send_bytes(payload), self.stuck_after)
+                    else:
+                        await asyncio.wait_for(self.ws.send_text(payload), self.stuck_after)
+                except asyncio.TimeoutError:
+                    self._die(f"send blocked > {self.stuck_after:g}s")
+                    return
+                except Exception as e:
+                    self._die(f"send failed: {e}")
+                    return
+                finally:
+                    self._send_started = 0.0
+                self.sent += 1
+        except asyncio.CancelledError:
+            pass
+
+    def _die(self, reason: str):
+        if self.closed:
+            return
+        log_event(logger, "fanout.drop", "Dropping dashboard (%s)", reason, level=logging.WARNING,
+                  sent=self.sent, dropped=self.dropped)
+        self.close()
+        if self.on_dead:
+            try:
+                self.on_dead(self)
+            except Exception:
+                pass
+        try:
+            asyncio.get_running_loop().create_task(self.ws.close())
+        except Exception:
+            pass
@@ -12,9 +12,15 @@
 
 import os
 import json
-import time
+import logging
 import threading
 
+from .clock import SYSTEM_CLOCK
+from .logs import log_event
+from .safety import SafetyEngine
+
+logger = logging.getLogger(__name__)
+
 # ── config paths ─────────────────────────────────────────────────────────
 _HERE = os.path.dirname(os.path.abspath(__file__))
 _CFG_PATH = os.path.join(_HERE, "..", "config", "experiment.json")
@@ -27,6 +33,16 @@ _TRANSITION_KEYS = {"en": "transition_en", "hi": "transition_hi", "te": "transit
 FRAMES_TO_ADVANCE  = 3   # consecutive frames ALL required objects must be present
 REMOVAL_FRAMES     = 2   # consecutive frames with NO required objects to end transition
 
+# ── sampling hints (how much the next frames matter) ──────────────────────
+SAMPLING_IDLE_AFTER = 10.0   # seconds without any required object before asking for fewer frames
+SAMPLING_FACTORS = {         # multiplier on the load-based capture interval
+    "burst":    0.5,         # stability / removal count is running — decide quickly (floor: PACING_BURST_MAX_FPS)
+    "safety":   1.0,         # a dangerous-pair label is in view — never slow down
+    "normal":   1.0,
+    "idle":     3.0,         # nothing relevant in view for SAMPLING_IDLE_AFTER
+    "complete": 4.0,         # experiment done; frames only feed safety and dashboards
+}
+
 
 class ExperimentFSM:
     """
@@ -43,10 +59,12 @@ class ExperimentFSM:
     5.  Last step (id == total_steps-1) transitions directly to experiment_complete.
     """
 
-    def __init__(self, config_path: str = _CFG_PATH, demo_mode: bool = False, demo_timeout: float = 5.0):
+    def __init__(self, config_path: str = _CFG_PATH, demo_mode: bool = False, demo_timeout: float = 5.0,
+                 clock=None):
         self.config = self._load_config(config_path)
         self.total_steps = self.config["total_steps"]
         self._lock = threading.Lock()
+        self.clock = clock or SYSTEM_CLOCK   # anything with .time(); VirtualClock for simulations
 
         # ── demo mode ────────────────────────────────────────────────
 
@@ -54,8 +72,8 @@ class ExperimentFSM:
         self.demo_timeout = demo_timeout
 
         # ── timing ─────────────────────────────────────────────────────
-        self.start_time    = time.time()
-        self.step_start    = time.time()
+        self.start_time    = self.clock.time()
+        self.step_start    = self.start_time
 
         # ── step state ─────────────────────────────────────────────────
         self.current_step_index   = 0
@@ -70,12 +88,19 @@ class ExperimentFSM:
         # ── intro audio ────────────────────────────────────────────────
         self.intro_played_for_step = -1     # step index for which intro was already played
 
+        # ── sampling hint inputs ───────────────────────────────────────
+        self.last_required_seen   = self.start_time   # last frame with any required object
+        self.danger_in_view       = False             # last frame had a dangerous-pair label
+
         # ── safety ─────────────────────────────────────────────────────
         srules = self.config.get("safety_rules", {})
-        self.proximity_threshold  = srules.get("proximity_threshold", 150)
-        self.alert_cooldown       = srules.get("alert_cooldown_seconds", 3)
+        self.safety               = SafetyEngine(srules)
+        self.proximity_threshold  = self.safety.proximity_threshold
+        self.alert_cooldown       = self.safety.alert_cooldown
         self.dangerous_pairs      = srules.get("dangerous_pairs", [])
-        self._last_alert_time     = 0
+
+        # ── event sink (journal) — callable(name, data, ts) or None ───
+        self.event_sink           = None
 
         print(f"   [FSM] Loaded: {self.config['name']} ({self.total_steps} steps, "
               f"{FRAMES_TO_ADVANCE} frames to advance)")
@@ -108,6 +133,11 @@ class ExperimentFSM:
 
             # ── 1. Safety check FIRST — always ──────────────────────────
             safety_alert = self._check_safety(detections)
+            detected_labels = set()
+            for d in (detections or []):
+                if isinstance(d, dict) and isinstance(d.get("label"), str):
+                    detected_labels.add(d["label"])
+            self.danger_in_view = not detected_labels.isdisjoint(self.safety.labels)
 
             # ── 2. Already completed ─────────────────────────────────────
             if self.completed:
@@ -121,12 +151,10 @@ class ExperimentFSM:
 
             step_cfg = self.config["steps"][self.current_step_index]
             required = set(step_cfg.get("required_objects", []))
-            detected_labels = set()
-            for d in (detections or []):
-                if isinstance(d, dict) and isinstance(d.get("label"), str):
-                    detected_labels.add(d["label"])
             detected_required = required & detected_labels
             all_present = detected_required == required
+            if detected_required:
+                self.last_required_seen = self.clock.time()
 
             # ── 3. TRANSITION state — waiting for removal ────────────────
             if self.in_transition:
@@ -172,13 +200,15 @@ class ExperimentFSM:
 
             # Demo mode: auto-advance if stuck for demo_timeout seconds
             if self.demo_mode and not all_present and required:
-                elapsed_on_step = time.time() - self.step_start
+                elapsed_on_step = self.clock.time() - self.step_start
                 if elapsed_on_step >= self.demo_timeout:
                     self.stable_count    = 0
                     self.removal_count   = 0
                     self.in_transition   = True
                     self.transition_sent = False
-                    print(f"   [FSM] Demo auto-advance: step {self.current_step_index} after {elapsed_on_step:.1f}s")
+                    self._emit("transition", step=self.current_step_index)
+                    log_event(logger, "fsm.demo_advance", "Demo auto-advance", step=self.current_step_index,
+                              after_s=round(elapsed_on_step, 1))
                     return self._result(
                         step_info=self._build_step_info(lang, force_transition=True),
                         safety_alert=safety_alert,
@@ -203,6 +233,7 @@ class ExperimentFSM:
                 self.removal_count  = 0
                 self.in_transition  = True
                 self.transition_sent = False
+                self._emit("transition", step=self.current_step_index)
 
                 # Enter transition state for all steps (including final)
                 return self._result(
@@ -235,11 +266,31 @@ class ExperimentFSM:
             "total_steps": self.total_steps,
             "completed": self.completed,
             "in_transition": self.in_transition,
-            "elapsed_total": round(time.time() - self.start_time, 1),
+            "elapsed_total": round(self.clock.time() - self.start_time, 1),
             "stable_count": self.stable_count,
-            "removal_count": self.removal_count
+            "removal_count": self.removal_count,
+            "sampling_hint": self.sampling_hint(),
+            "safety": self.safety.get_stats(),
         }
 
+    def sampling_hint(self) -> dict:
+        """
+        How much the next frames matter, from the current step state:
+        {"mode": "burst" | "safety" | "normal" | "idle" | "complete", "factor": float}.
+        `factor` scales the server's load-based capture interval (<1 = faster).
+        """
+        if not self.completed and (self.in_transition or 0 < self.stable_count < FRAMES_TO_ADVANCE):
+            mode = "burst"
+        elif self.danger_in_view:
+            mode = "safety"
+        elif self.completed:
+            mode = "complete"
+        elif self.clock.time() - self.last_required_seen >= SAMPLING_IDLE_AFTER:
+            mode = "idle"
+        else:
+            mode = "normal"
+        return {"mode": mode, "factor": SAMPLING_FACTORS[mode]}
+
     def get_full_state(self) -> dict:
         """Return serialisable full state snapshot."""
         return {
@@ -248,7 +299,7 @@ class ExperimentFSM:
             "current_step":     self.current_step_index,
             "completed":        self.completed,
             "in_transition":    self.in_transition,
-            "elapsed_total":    round(time.time() - self.start_time, 1),
+            "elapsed_total":    round(self.clock.time() - self.start_time, 1),
             "step_info":        self._build_step_info("en"),
         }
 
@@ -262,15 +313,55 @@ class ExperimentFSM:
             self.in_transition        = False
             self.transition_sent      = False
             self.intro_played_for_step = -1
-            self._last_alert_time     = 0
-            self.start_time           = time.time()
-            self.step_start           = time.time()
+            self.safety.reset()
+            self.start_time           = self.clock.time()
+            self.step_start           = self.start_time
+            self.last_required_seen   = self.start_time
+            self.danger_in_view       = False
+        self._emit("reset")
         print("   [FSM] Reset complete")
 
+    def export_state(self) -> dict:
+        """Durable step state for snapshots (per-frame counters are not kept)."""
+        with self._lock:
+            return {
+                "current_step_index":    self.current_step_index,
+                "completed":             self.completed,
+                "in_transition":         self.in_transition,
+                "transition_sent":       self.transition_sent,
+                "intro_played_for_step": self.intro_played_for_step,
+                "start_time":            self.start_time,
+                "step_start":            self.step_start,
+            }
+
+    def restore_state(self, state: dict):
+        """Load a state produced by export_state() (or rebuilt from the journal)."""
+        with self._lock:
+            idx = int(state.get("current_step_index", 0))
+            self.current_step_index    = max(0, min(idx, self.total_steps - 1))
+            self.completed             = bool(state.get("completed", False))
+            self.in_transition         = bool(state.get("in_transition", False))
+            self.transition_sent       = bool(state.get("transition_sent", False))
+            self.intro_played_for_step = int(state.get("intro_played_for_step", -1))
+            self.start_time            = float(state.get("start_time", self.start_time))
+            self.step_start            = float(state.get("step_start", self.step_start))
+            self.stable_count          = 0
+            self.removal_count         = 0
+            self.last_required_seen    = self.clock.time()
+
     # ─────────────────────────────────────────────────────────────────────
     # PRIVATE HELPERS
     # ─────────────────────────────────────────────────────────────────────
 
+    def _emit(self, name: str, **data):
+        """Forward a state-change event to the journal sink, never failing the frame."""
+        if self.event_sink is None:
+            return
+        try:
+            self.event_sink(name, data, self.clock.time())
+        except Exception as e:
+            log_event(logger, "fsm.error", "Event sink error (ignored): %s", e, level=logging.WARNING)
+
     def _do_advance(self, lang: str, safety_alert) -> dict:
         """Actually advance index or complete experiment."""
         
@@ -279,6 +370,7 @@ class ExperimentFSM:
             self.completed = True
             self.in_transition = False
             self.transition_sent = False
+            self._emit("step_advance", step=self.current_step_index, completed=True)
             return self._result(
                 step_info=self._build_step_info(lang, force_complete=True),
                 safety_alert=safety_alert,
@@ -294,11 +386,13 @@ class ExperimentFSM:
         self.in_transition         = False
         self.transition_sent       = False
         self.intro_played_for_step = -1
-        self.step_start            = time.time()
+        self.step_start            = self.clock.time()
+        self.last_required_seen    = self.step_start
 
         new_step_cfg = self.config["steps"][self.current_step_index]
         intro_audio  = new_step_cfg.get("audio_intro")
         self.intro_played_for_step = self.current_step_index
+        self._emit("step_advance", step=self.current_step_index, completed=False)
 
         return self._result(
             step_info=self._build_step_info(lang),
@@ -315,7 +409,7 @@ class ExperimentFSM:
         idx      = min(self.current_step_index, self.total_steps - 1)
         step_cfg = self.config["steps"][idx]
         required = step_cfg.get("required_objects", [])
-        now      = time.time()
+        now      = self.clock.time()
 
         # During transition or explicit complete: progress = 100, missing = []
         if force_transition or force_complete or self.in_transition:
@@ -354,7 +448,7 @@ class ExperimentFSM:
         idx      = min(self.current_step_index, self.total_steps - 1)
         step_cfg = self.config["steps"][idx]
         required = step_cfg.get("required_objects", [])
-        now      = time.time()
+        now      = self.clock.time()
 
         detected_req = [o for o in required if o in detected_labels]
         missing      = [o for o in required if o not in detected_labels]
@@ -380,41 +474,13 @@ class ExperimentFSM:
 
     def _check_safety(self, detections: list) -> dict | None:
         """Return a safety alert dict if a dangerous pair is too close, else None."""
-        if not detections or not self.dangerous_pairs:
-            return None
-        now = time.time()
-        if now - self._last_alert_time < self.alert_cooldown:
-            return None
-
         try:
-            centers = {}
-            for d in detections:
-                if not isinstance(d, dict):
-                    continue
-                label  = d.get("label", "")
-                center = d.get("center")
-                if label and isinstance(center, (list, tuple)) and len(center) >= 2:
-                    centers[label] = center
-
-            for pair in self.dangerous_pairs:
-                if not isinstance(pair, (list, tuple)) or len(pair) < 2:
-                    continue
-                a, b = pair[0], pair[1]
-                if a in centers and b in centers:
-                    cx1, cy1 = centers[a]
-                    cx2, cy2 = centers[b]
-                    dist = ((cx1 - cx2) ** 2 + (cy1 - cy2) ** 2) ** 0.5
-                    if dist < self.proximity_threshold:
-                        self._last_alert_time = now
-                        print(f"   [FSM] Safety alert: {a} <-> {b} dist={dist:.0f}px")
-                        return {
-                            "type":    "proximity",
-                            "message": f"Warning! Keep {a} and {b} apart!",
-                            "objects": [a, b],
-                            "distance": round(dist, 1),
-                        }
+            alert = self.safety.check(detections, self.clock.time())
+            if alert:
+                self._emit("safety_alert", distance=alert.get("distance"), objects=alert.get("objects", []))
+            return alert
         except Exception as e:
-            print(f"   [FSM] Safety check error (ignored): {e}")
+            log_event(logger, "fsm.error", "Safety check error (ignored): %s", e, level=logging.WARNING)
         return None
 
     def _result(self, step_info, safety_alert, step_advance, audio_to_play, experiment_complete) -> dict:
@@ -424,6 +490,7 @@ class ExperimentFSM:
             "step_advance":        step_advance,
             "audio_to_play":       audio_to_play,
             "experiment_complete": experiment_complete,
+            "sampling_hint":       self.sampling_hint(),
         }
 
     @staticmethod
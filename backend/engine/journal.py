@@ -0,0 +1,351 @@
+"""
+VocalLab FSM journal — append-only binary log of session events plus
+periodic snapshots, so live sessions survive a crash or deploy.
+
+Layout of the journal directory
+───────────────────────────────
+  snapshot.json       — all session states + the journal segment they precede
+  journal-<N>.bin     — events appended after snapshot N
+
+Record format (little-endian)
+─────────────────────────────
+  u8 kind | f64 timestamp | u8 len(session_id) | u16 len(payload) | session_id | payload
+
+Appends are queued from the hot path and written by a single background
+thread; snapshots travel through the same queue so the snapshot always lines
+up exactly with the start of the next segment.
+"""
+import os
+import json
+import glob
+import time
+import queue
+import struct
+import threading
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+# ── event kinds ───────────────────────────────────────────────────────────
+EV_SESSION_START = 1   # payload: resume token
+EV_STEP_ADVANCE  = 2   # payload: <HB step index, completed>
+EV_TRANSITION    = 3   # payload: <H  step index>
+EV_SAFETY_ALERT  = 4   # payload: <f  distance> + "a|b"
+EV_RESET         = 5   # payload: —
+EV_LANGUAGE      = 6   # payload: language code
+EV_SESSION_END   = 7   # payload: —  (session parked / left)
+
+EVENT_NAMES = {
+    EV_SESSION_START: "session_start",
+    EV_STEP_ADVANCE:  "step_advance",
+    EV_TRANSITION:    "transition",
+    EV_SAFETY_ALERT:  "safety_alert",
+    EV_RESET:         "reset",
+    EV_LANGUAGE:      "language",
+    EV_SESSION_END:   "session_end",
+}
+EVENT_KINDS = {name: kind for kind, name in EVENT_NAMES.items()}
+
+_HEADER   = struct.Struct("<BdBH")
+_STEP     = struct.Struct("<HB")
+_U16      = struct.Struct("<H")
+_F32      = struct.Struct("<f")
+
+SNAPSHOT_FILE = "snapshot.json"
+_SNAPSHOT_REQ = object()   # queue marker
+_STOP         = object()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# ENCODING
+# ═══════════════════════════════════════════════════════════════════════
+def encode_payload(kind: int, data: dict) -> bytes:
+    if kind == EV_STEP_ADVANCE:
+        return _STEP.pack(int(data.get("step", 0)), 1 if data.get("completed") else 0)
+    if kind == EV_TRANSITION:
+        return _U16.pack(int(data.get("step", 0)))
+    if kind == EV_SAFETY_ALERT:
+        objs = "|".join(str(o) for o in data.get("objects", ()))
+        return _F32.pack(float(data.get("distance") or 0.0)) + objs.encode("utf-8")
+    if kind in (EV_LANGUAGE, EV_SESSION_START):
+        return str(data.get("value", "")).encode("utf-8")
+    return b""
+
+
+def decode_payload(kind: int, raw: bytes) -> dict:
+    if kind == EV_STEP_ADVANCE:
+        step, completed = _STEP.unpack_from(raw)
+        return {"step": step, "completed": bool(completed)}
+    if kind == EV_TRANSITION:
+        return {"step": _U16.unpack_from(raw)[0]}
+    if kind == EV_SAFETY_ALERT:
+        dist = _F32.unpack_from(raw)[0]
+        objs = raw[_F32.size:].decode("utf-8")
+        return {"distance": round(dist, 1), "objects": objs.split("|") if objs else []}
+    if kind in (EV_LANGUAGE, EV_SESSION_START):
+        return {"value": raw.decode("utf-8")}
+    return {}
+
+
+def encode_record(kind: int, ts: float, session_id: str, data: dict) -> bytes:
+    sid = session_id.encode("utf-8")[:255]
+    payload = encode_payload(kind, data)
+    return _HEADER.pack(kind, ts, len(sid), len(payload)) + sid + payload
+
+
+def read_events(path: str) -> Iterator[Tuple[int, float, str, dict]]:
+    """Yield (kind, timestamp, session_id, data) from one segment; stops at a torn tail."""
+    try:
+        with open(path, "rb") as f:
+            buf = f.read()
+    except FileNotFoundError:
+        return
+    pos, end = 0, len(buf)
+    while pos + _HEADER.size <= end:
+        kind, ts, sid_len, pl_len = _HEADER.unpack_from(buf, pos)
+        pos += _HEADER.size
+        if pos + sid_len + pl_len > end:
+            break   # partially written record from a crash
+        sid = buf[pos:pos + sid_len].decode("utf-8")
+        pos += sid_len
+        data = decode_payload(kind, buf[pos:pos + pl_len])
+        pos += pl_len
+        yield kind, ts, sid, data
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# STATE REBUILD
+# ═══════════════════════════════════════════════════════════════════════
+def apply_event(sessions: Dict[str, dict], kind: int, ts: float, sid: str, data: dict):
+    """Fold one event into the {session_id: state} map used for recovery and replay."""
+    state = sessions.get(sid)
+    if state is None:
+        state = sessions[sid] = {
+            "fsm": {"current_step_index": 0, "completed": False, "in_transition": False,
+                    "transition_sent": False, "intro_played_for_step": -1,
+                    "start_time": ts, "step_start": ts},
+            "stats": {"steps_completed": 0, "safety_alerts_count": 0, "connected_at": ts},
+            "language": "en",
+            "resume_token": None,
+            "ended_at": None,
+        }
+    fsm = state["fsm"]
+    if kind == EV_SESSION_START:
+        state["resume_token"] = data.get("value") or None
+        state["ended_at"] = None
+    elif kind == EV_SESSION_END:
+        state["ended_at"] = ts
+    elif kind == EV_LANGUAGE:
+        state["language"] = data.get("value") or "en"
+    elif kind == EV_TRANSITION:
+        fsm["current_step_index"] = data["step"]
+        fsm["in_transition"] = True
+        fsm["transition_sent"] = False      # as in the FSM: the audio is queued with the next frame
+    elif kind == EV_STEP_ADVANCE:
+        fsm["current_step_index"] = data["step"]
+        fsm["completed"] = data["completed"]
+        fsm["in_transition"] = False
+        fsm["transition_sent"] = False
+        fsm["intro_played_for_step"] = data["step"]
+        fsm["step_start"] = ts
+        state["stats"]["steps_completed"] = state["stats"].get("steps_completed", 0) + 1
+    elif kind == EV_SAFETY_ALERT:
+        state["stats"]["safety_alerts_count"] = state["stats"].get("safety_alerts_count", 0) + 1
+    elif kind == EV_RESET:
+        fsm.update({"current_step_index": 0, "completed": False, "in_transition": False,
+                    "transition_sent": False, "intro_played_for_step": -1,
+                    "start_time": ts, "step_start": ts})
+
+
+def _segment_path(directory: str, segment: int) -> str:
+    return os.path.join(directory, f"journal-{segment}.bin")
+
+
+def recover(directory: str, ttl: float = None) -> Tuple[Dict[str, dict], int]:
+    """
+    Rebuild {session_id: state} from the latest snapshot plus its journal tail.
+    Sessions that ended more than `ttl` seconds before the last journaled
+    event are dropped (they would have expired from parking anyway).
+    Returns (sessions, segment).
+    """
+    sessions, segment, last_ts = {}, 0, 0.0
+    snap_path = os.path.join(directory, SNAPSHOT_FILE)
+    if os.path.isfile(snap_path):
+        try:
+            with open(snap_path, encoding="utf-8") as f:
+                snap = json.load(f)
+            sessions = snap.get("sessions", {})
+            segment = int(snap.get("segment", 0))
+            last_ts = float(snap.get("taken_at", 0.0))
+        except (OSError, ValueError) as e:
+            print(f"   [Journal] Snapshot unreadable, replaying without it: {e}")
+            sessions, segment, last_ts = {}, 0, 0.0
+
+    for kind, ts, sid, data in read_events(_segment_path(directory, segment)):
+        apply_event(sessions, kind, ts, sid, data)
+        last_ts = max(last_ts, ts)
+
+    if ttl is not None and last_ts:
+        sessions = {sid: st for sid, st in sessions.items()
+                    if st.get("ended_at") is None or last_ts - st["ended_at"] <= ttl}
+    return sessions, segment
+
+
+def replay(directory: str, handler: Callable[[int, float, str, dict], None] = None) -> Dict[str, dict]:
+    """Offline replay of every segment on disk at full speed; returns the final session states."""
+    sessions = {}
+    paths = sorted(glob.glob(os.path.join(directory, "journal-*.bin")),
+                   key=lambda p: int(os.path.basename(p)[8:-4]))
+    for path in paths:
+        for kind, ts, sid, data in read_events(path):
+            apply_event(sessions, kind, ts, sid, data)
+            if handler:
+                handler(kind, ts, sid, data)
+    return sessions
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# WRITER
+# ═══════════════════════════════════════════════════════════════════════
+class Journal:
+    """Background-thread journal writer. `append()` never blocks on disk."""
+
+    def __init__(self, directory: str, segment: int = 0, keep_segments: Optional[int] = 2):
+        """keep_segments: older segments retained for offline replay (None = keep all)."""
+        self.directory = directory
+        self.segment = segment
+        self.keep_segments = keep_segments
+        self.events_written = 0
+        self.bytes_written = 0
+        self.snapshots_written = 0
+        self.last_snapshot_ms = 0.0
+        self._q: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._file = None
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    # ── lifecycle ──────────────────────────────────────────────────────
+    def start(self):
+        self._file = open(_segment_path(self.directory, self.segment), "ab")
+        self._thread = threading.Thread(target=self._run, name="fsm-journal", daemon=True)
+        self._thread.start()
+        print(f"   [Journal] Writing to {_segment_path(self.directory, self.segment)}")
+
+    def close(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        self._q.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ── hot path ───────────────────────────────────────────────────────
+    def append(self, kind: int, session_id: str, ts: float = None, **data):
+        self._q.put((kind, time.time() if ts is None else ts, session_id, data))
+
+    def sink(self, session_id: str) -> Callable:
+        """Per-session callback for ExperimentFSM.event_sink: sink("step_advance", {...})."""
+        def _emit(name: str, data: dict, ts: float = None):
+            kind = EVENT_KINDS.get(name)
+            if kind is not None:
+                self.append(kind, session_id, ts, **data)
+        return _emit
+
+    def snapshot(self, sessions: Dict[str, dict]):
+        """Queue a snapshot; everything appended before it lands in the current segment."""
+        self._q.put((_SNAPSHOT_REQ, sessions))
+
+    def get_stats(self) -> dict:
+        return {
+            "segment": self.segment,
+            "events_written": self.events_written,
+            "bytes_written": self.bytes_written,
+            "snapshots_written": self.snapshots_written,
+            "last_snapshot_ms": self.last_snapshot_ms,
+            "queue_depth": self._q.qsize(),
+        }
+
+    # ── writer thread ─────────────────────────────────────────────────
+    def _run(self):
+        while True:
+            item = self._q.get()
+            batch = [item]
+            # drain whatever else is queued so one flush covers many events
+            while True:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            chunks = []
+            for it in batch:
+                if it is _STOP:
+                    stop = True
+                    break
+                if it[0] is _SNAPSHOT_REQ:
+                    self._write(chunks)
+                    chunks = []
+                    self._write_snapshot(it[1])
+                    continue
+                try:
+                    chunks.append(encode_record(*it))
+                except Exception as e:
+                    print(f"   [Journal] Dropped unencodable event {it!r}: {e}")
+            self._write(chunks)
+            if stop:
+                self._file.close()
+                return
+
+    def _write(self, chunks: list):
+        if not chunks:
+            return
+        blob = b"".join(chunks)
+        try:
+            self._file.write(blob)
+            self._file.flush()
+            self.events_written += len(chunks)
+            self.bytes_written += len(blob)
+        except OSError as e:
+            print(f"   [Journal] Write failed: {e}")
+
+    def _write_snapshot(self, sessions: dict):
+        t0 = time.perf_counter()
+        next_segment = self.segment + 1
+        snap_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        tmp_path = snap_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"segment": next_segment, "taken_at": time.time(), "sessions": sessions}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, snap_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"   [Journal] Snapshot failed: {e}")
+            return
+        # switch segments only after the snapshot is durable
+        self._file.close()
+        self.segment = next_segment
+        self._file = open(_segment_path(self.directory, self.segment), "ab")
+        if self.keep_segments is None:
+            self.snapshots_written += 1
+            self.last_snapshot_ms = round((time.perf_counter() - t0) * 1000, 2)
+            return
+        stale = self.segment - self.keep_segments
+        for path in glob.glob(os.path.join(self.directory, "journal-*.bin")):
+            try:
+                if int(os.path.basename(path)[8:-4]) <= stale:
+                    os.remove(path)
+            except (ValueError, OSError):
+                pass
+        self.snapshots_written += 1
+        self.last_snapshot_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+
+if __name__ == "__main__":
+    import sys
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "journal")
+    counts = {}
+    t0 = time.perf_counter()
+    final = replay(directory, lambda kind, ts, sid, data: counts.__setitem__(kind, counts.get(kind, 0) + 1))
+    elapsed = (time.perf_counter() - t0) * 1000
+    total = sum(counts.values())
+    print(f"Replayed {total} events for {len(final)} sessions in {elapsed:.1f}ms")
+    for kind, n in sorted(counts.items()):
+        print(f"  {EVENT_NAMES.get(kind, kind):>14}: {n}")
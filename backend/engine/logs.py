@@ -0,0 +1,232 @@
+"""
+VocalLab logging — hot-path messages (every frame, every HTTP request,
+every step advance) go through `logging` instead of print, and nothing on
+the event loop or the inference thread ever writes to stdout itself:
+
+    log_event() ──▶ EventSampler ──▶ QueueHandler ──queue──▶ QueueListener thread
+                    (sample / rate-limit                     (format + write stdout)
+                     per event type)
+
+• Records carry an `event` name ("detector.frame", "http.request", ...)
+  and structured `fields`. They are rendered in the listener thread, as
+  the usual `   [Tag] message  key=value` line or as one JSON object per
+  line (LOG_FORMAT = "json").
+• Each event type can be sampled (keep 1 in N) and rate limited (token
+  bucket, per second). The next record that gets through reports how many
+  were suppressed since the last one.
+• The queue is bounded. When the writer falls behind, records are dropped
+  and counted; a caller never blocks.
+• Levels and sampling rules can be changed at runtime (POST /admin/logging).
+"""
+import sys
+import json
+import time
+import queue
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+try:
+    import orjson
+except ImportError:           # optional — stdlib json is the fallback
+    orjson = None
+
+DEFAULT_QUEUE_SIZE = 10_000
+APP_LOGGERS = ("vocallab", "engine", "config")   # get LOG_LEVEL; third-party loggers stay at WARNING
+FORMAT_TEXT = "text"
+FORMAT_JSON = "json"
+
+# Tag printed in text mode, from the event name's prefix
+_TAGS = {"detector": "Detector", "ws": "WS", "http": "HTTP", "watchdog": "Watchdog",
+         "safety": "Safety", "fsm": "FSM", "fanout": "Fanout", "cm": "CM"}
+
+
+def log_event(logger: logging.Logger, event: str, message: str, *args, level: int = logging.INFO,
+              exc_info=None, **fields):
+    """
+    Log `message % args` as structured event `event` with extra key=value fields.
+    Formatting is deferred to the listener thread; a disabled level costs one check.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, *args, exc_info=exc_info, extra={"event": event, "fields": fields})
+
+
+class _Rule:
+    __slots__ = ("sample_every", "per_second", "tokens", "refilled", "seen", "passed",
+                 "sampled_out", "rate_limited", "suppressed")
+
+    def __init__(self, sample_every: int = 1, per_second: float = 0.0):
+        self.sample_every = max(1, int(sample_every))
+        self.per_second = max(0.0, float(per_second))   # 0 = no rate limit
+        self.tokens = self.per_second
+        self.refilled = time.monotonic()
+        self.seen = 0
+        self.passed = 0
+        self.sampled_out = 0
+        self.rate_limited = 0
+        self.suppressed = 0                             # dropped since the last record let through
+
+    def to_dict(self) -> dict:
+        return {
+            "sample_every": self.sample_every,
+            "per_second": self.per_second or None,
+            "seen": self.seen,
+            "passed": self.passed,
+            "sampled_out": self.sampled_out,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class EventSampler(logging.Filter):
+    """Per-event sampling (1 in N) and token-bucket rate limiting. Warnings and errors are only rate limited."""
+
+    def __init__(self, rules: Dict[str, tuple] = None):
+        super().__init__()
+        self.rules: Dict[str, _Rule] = {}
+        for event, (sample_every, per_second) in (rules or {}).items():
+            self.set_rule(event, sample_every, per_second)
+
+    def set_rule(self, event: str, sample_every: int = 1, per_second: float = 0.0):
+        self.rules[event] = _Rule(sample_every, per_second)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rule = self.rules.get(getattr(record, "event", None))
+        if rule is None:
+            return True
+        rule.seen += 1
+        if record.levelno < logging.WARNING and rule.seen % rule.sample_every:
+            rule.sampled_out += 1
+            rule.suppressed += 1
+            return False
+        if rule.per_second:
+            now = time.monotonic()
+            rule.tokens = min(rule.per_second, rule.tokens + (now - rule.refilled) * rule.per_second)
+            rule.refilled = now
+            if rule.tokens < 1.0:
+                rule.rate_limited += 1
+                rule.suppressed += 1
+                return False
+            rule.tokens -= 1.0
+        rule.passed += 1
+        if rule.suppressed:
+            record.fields = {**getattr(record, "fields", {}), "suppressed": rule.suppressed}
+            rule.suppressed = 0
+        return True
+
+    def get_stats(self) -> dict:
+        return {event: rule.to_dict() for event, rule in self.rules.items()}
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never formats on the caller's thread and drops instead of blocking."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None                       # tracebacks hold frames; don't queue them
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredFormatter(logging.Formatter):
+    """`   [Tag] message  key=value` lines, or one JSON object per line."""
+
+    def __init__(self, fmt: str = FORMAT_TEXT):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        event = getattr(record, "event", None)
+        fields = getattr(record, "fields", None) or {}
+        if self.fmt == FORMAT_JSON:
+            entry = {
+                "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+                "level": record.levelname,
+                "logger": record.name,
+                "event": event,
+                "msg": message,
+                **fields,
+            }
+            if record.exc_text:
+                entry["exc"] = record.exc_text
+            return orjson.dumps(entry, default=str).decode() if orjson else json.dumps(entry, default=str)
+        tag = _TAGS.get(event.split(".", 1)[0]) if event else None
+        tag = tag or record.name.rsplit(".", 1)[-1].title()
+        line = f"   [{tag}] {message}"
+        if fields:
+            line += "  " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.levelno >= logging.WARNING:
+            line = f"{line}  ({record.levelname.lower()})"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class LogPipeline:
+    """Owns the queue, the sampler and the listener thread behind the root logger."""
+
+    def __init__(self, level: str = "INFO", fmt: str = FORMAT_TEXT, sampling: Dict[str, tuple] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, stream=None, app_loggers: tuple = APP_LOGGERS):
+        self.format = fmt
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.sampler = EventSampler(sampling)
+        self.handler = _NonBlockingQueueHandler(self.queue)
+        self.handler.addFilter(self.sampler)
+        out = logging.StreamHandler(stream or sys.stdout)
+        out.setFormatter(StructuredFormatter(fmt))
+        self.listener = logging.handlers.QueueListener(self.queue, out, respect_handler_level=False)
+        self.root = logging.getLogger()
+        self.app_loggers = app_loggers
+        self._previous_handlers = None
+        self._previous_level = None
+        self._adjusted = set(app_loggers)                # loggers whose level is reported in get_stats()
+        self.set_level(level)
+
+    def start(self):
+        self._previous_handlers = self.root.handlers[:]
+        self._previous_level = self.root.level
+        self.root.handlers = [self.handler]
+        self.root.setLevel(logging.WARNING)
+        self.listener.start()
+
+    def stop(self):
+        """Flush what is queued and give the root logger its old handlers back."""
+        if self._previous_handlers is not None:
+            self.root.handlers = self._previous_handlers
+            self.root.setLevel(self._previous_level)
+            self._previous_handlers = None
+            self.listener.stop()
+
+    def set_level(self, level: str, logger_name: Optional[str] = None) -> str:
+        """Change one logger's level (the app loggers when None). Raises ValueError for an unknown level."""
+        name = str(level).upper()
+        if not isinstance(logging.getLevelName(name), int):
+            raise ValueError(f"unknown log level '{level}'")
+        for target in ([logger_name] if logger_name else self.app_loggers):
+            logging.getLogger(target if target != "root" else None).setLevel(name)
+            self._adjusted.add(target)
+        return name
+
+    def get_stats(self) -> dict:
+        levels = {"root": logging.getLevelName(self.root.level)}
+        for name in sorted(self._adjusted):
+            levels[name] = logging.getLevelName(logging.getLogger(name).level)
+        return {
+            "format": self.format,
+            "levels": levels,
+            "queue_depth": self.queue.qsize(),
+            "queue_limit": self.queue.maxsize,
+            "dropped": self.handler.dropped,
+            "sampling": self.sampler.get_stats(),
+        }
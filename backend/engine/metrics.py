@@ -0,0 +1,208 @@
+"""
+VocalLab metrics — counters, gauges and latency histograms rendered in the
+Prometheus text exposition format at GET /metrics.
+
+Every series is an object with __slots__ created once (at startup, or the
+first time a label value is seen); recording is an attribute increment or,
+for histograms, a bisect into fixed bucket bounds plus one list-slot
+increment. Nothing takes a lock and nothing allocates per observation, and
+a scrape only reads these numbers — it never waits on or walks the
+per-frame path.
+
+    vocallab_frames_admitted_total                 frames queued for inference
+    vocallab_frames_dropped_total{reason}          pacing | superseded | invalid
+    vocallab_frames_inferred_total                 frames the detector finished
+    vocallab_detections_total{label}
+    vocallab_step_advances_total / vocallab_safety_alerts_total{kind}
+    vocallab_stage_seconds{stage}                  decode | inference | fsm | send
+    vocallab_frame_seconds{room}                   receive → result queued, per room
+    vocallab_event_loop_lag_seconds                histogram (+ _last_seconds gauge)
+    vocallab_event_loop_stalls_total               lag above the watchdog threshold
+    vocallab_students_connected, ..._queue_depth   gauges, refreshed at scrape time
+
+Label values are capped per family (`max_series`); anything beyond folds
+into "other", so client-chosen room ids cannot grow the series count.
+
+prometheus_client is not required: the format is simple enough to write
+directly, and it keeps the dependency list unchanged.
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OVERFLOW_LABEL = "other"
+DEFAULT_MAX_SERIES = 64
+
+STAGES = ("decode", "inference", "fsm", "send")
+DROP_REASONS = ("pacing", "superseded", "invalid")
+
+# Gauges refreshed at scrape time: name -> help
+GAUGES = {
+    "vocallab_students_connected": "Student WebSocket connections on this worker",
+    "vocallab_dashboards_connected": "Dashboard WebSocket connections on this worker",
+    "vocallab_parked_sessions": "Disconnected sessions still resumable",
+    "vocallab_rooms": "Open rooms",
+    "vocallab_scheduler_queued": "Frames waiting for the inference thread",
+    "vocallab_inference_in_flight": "Frames inside the inference thread",
+    "vocallab_admission_queue_length": "Connections waiting in the admission queue",
+    "vocallab_dashboard_queue_depth": "Messages queued across all dashboard send queues",
+    "vocallab_log_queue_depth": "Log records waiting for the writer thread",
+}
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)       # last slot = above the largest bound (+Inf)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Family:
+    """One metric name with its labelled children."""
+
+    _kinds = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names: Tuple[str, ...] = (),
+                 preset: Iterable[tuple] = (), max_series: int = DEFAULT_MAX_SERIES):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = label_names
+        self.max_series = max_series
+        self.children: Dict[tuple, object] = {}
+        if not label_names:
+            self.children[()] = self._kinds[kind]()
+        for values in preset:
+            self.labels(*values)
+
+    def labels(self, *values):
+        """Child series for these label values (created on first use, capped at max_series)."""
+        child = self.children.get(values)
+        if child is None:
+            if len(self.children) >= self.max_series:
+                values = (OVERFLOW_LABEL,) * len(self.label_names)
+                child = self.children.get(values)
+            if child is None:
+                child = self.children[values] = self._kinds[self.kind]()
+        return child
+
+    @property
+    def only(self):
+        """The single child of an unlabelled family."""
+        return self.children[()]
+
+    def render(self, out: List[str]):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in list(self.children.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, values))
+            if self.kind == "histogram":
+                prefix = f"{labels}," if labels else ""
+                cumulative = 0
+                for bound, count in zip(child.bounds, child.counts):
+                    cumulative += count
+                    out.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+                out.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {child.count}')
+                suffix = f"{{{labels}}}" if labels else ""
+                out.append(f"{self.name}_sum{suffix} {child.sum:.6f}")
+                out.append(f"{self.name}_count{suffix} {child.count}")
+            else:
+                suffix = f"{{{labels}}}" if labels else ""
+                out.append(f"{self.name}{suffix} {_number(child.value)}")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    return str(value) if isinstance(value, int) else f"{value:.6g}"
+
+
+class Metrics:
+    """All VocalLab series. Hot paths hold direct references to children (e.g. `metrics.frames_inferred`)."""
+
+    def __init__(self, labels: Iterable[str] = (), max_series: int = DEFAULT_MAX_SERIES):
+        labels = tuple(labels)
+        self.families: List[Family] = []
+        f = self._family
+        # ── frame flow ──
+        self.frames_admitted = f("vocallab_frames_admitted_total", "Frames accepted into a student's pipeline",
+                                 "counter").only
+        dropped = f("vocallab_frames_dropped_total", "Frames dropped before inference", "counter",
+                    ("reason",), [(r,) for r in DROP_REASONS])
+        self.frames_dropped = {reason: dropped.labels(reason) for reason in DROP_REASONS}
+        self.frames_inferred = f("vocallab_frames_inferred_total", "Frames the detector finished", "counter").only
+        self.detections = f("vocallab_detections_total", "Detected objects by lab label", "counter",
+                            ("label",), [(label,) for label in labels], max_series=max(max_series, len(labels) + 16))
+        self.step_advances = f("vocallab_step_advances_total", "FSM step advances", "counter").only
+        self.safety_alerts = f("vocallab_safety_alerts_total", "Safety alerts issued", "counter", ("kind",))
+        # ── latency ──
+        stages = f("vocallab_stage_seconds", "Per-frame time in each pipeline stage", "histogram",
+                   ("stage",), [(s,) for s in STAGES])
+        self.stage = {stage: stages.labels(stage) for stage in STAGES}
+        self.frame_latency = f("vocallab_frame_seconds", "Frame received → result queued, per room", "histogram",
+                               ("room",), max_series=max_series)
+        self.loop_lag = f("vocallab_event_loop_lag_seconds", "Event-loop scheduling delay", "histogram").only
+        self.loop_lag_last = f("vocallab_event_loop_lag_last_seconds", "Most recent event-loop scheduling delay",
+                               "gauge").only
+        self.loop_stalls = f("vocallab_event_loop_stalls_total", "Event-loop stalls caught by the watchdog",
+                             "counter").only
+        # ── gauges refreshed at scrape time ──
+        self.gauges = {name: f(name, help_text, "gauge").only for name, help_text in GAUGES.items()}
+
+    def _family(self, *args, **kwargs) -> Family:
+        family = Family(*args, **kwargs)
+        self.families.append(family)
+        return family
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stage[stage].observe(seconds)
+
+    def count_detections(self, detections: list):
+        labels = self.detections
+        for d in detections:
+            labels.labels(d.get("label", "")).inc()
+
+    def observe_loop_lag(self, seconds: float):
+        self.loop_lag.observe(seconds)
+        self.loop_lag_last.set(seconds)
+
+    def set_gauges(self, values: Dict[str, float]):
+        for name, value in values.items():
+            self.gauges[name].set(value)
+
+    def render(self) -> str:
+        out: List[str] = []
+        for family in self.families:
+            family.render(out)
+        out.append("")
+        return "\n".join(out)
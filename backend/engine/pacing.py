@@ -0,0 +1,151 @@
+"""
+VocalLab frame pacing — tells student clients how often to capture, based
+on current server load, so frames the server would drop are never taken,
+encoded or uploaded in the first place.
+
+Load model: inference runs one frame at a time, so the server sustains
+about `target_utilization / inference_latency` frames per second in total.
+That budget is shared by the students who are actively streaming:
+
+    interval = max(1 / MAX_FPS, active_students × latency / target_utilization)
+               + backlog × latency
+
+Each student's FSM scales that interval with a sampling hint
+(ExperimentFSM.sampling_hint): faster while a step is about to be decided
+or a dangerous pair is in view, slower when nothing relevant has been seen
+for a while. Bursting students borrow the budget idle ones give back. A
+hint below 1× may go under 1 / MAX_FPS, down to the hard floor
+1 / burst_max_fps, so burst mode speeds capture up on an idle server too.
+
+Latency is an EWMA of measured detect() time. Advice is quantised and only
+re-sent to a student when the hint mode changes or the interval moves by
+more than `hysteresis`, so clients are not flooded as latency jitters.
+
+    {"type": "frame_pacing", "capture_interval_ms": 750, "reason": "load", ...}
+    {"type": "frame_pacing", "capture_interval_ms": 500, "reason": "burst", ...}
+"""
+from typing import Dict, Optional
+
+from .clock import SYSTEM_CLOCK
+
+DEFAULT_TARGET_UTILIZATION = 0.75    # leave headroom for FSM, encoding and dashboards
+DEFAULT_MAX_INTERVAL = 5.0           # never ask a client to wait longer than this
+DEFAULT_ACTIVE_WINDOW = 5.0          # a student streamed within this many seconds counts as active
+QUANTUM_MS = 50
+ACCEPT_SLACK = 0.8                   # accepts(): a frame may arrive this fraction of the interval early
+
+
+class FramePacer:
+    """Server-wide inference load → recommended per-student capture interval."""
+
+    def __init__(self, max_fps: float, target_utilization: float = DEFAULT_TARGET_UTILIZATION,
+                 max_interval: float = DEFAULT_MAX_INTERVAL, active_window: float = DEFAULT_ACTIVE_WINDOW,
+                 alpha: float = 0.2, hysteresis: float = 0.15, burst_max_fps: float = None, clock=None):
+        self.min_interval = 1.0 / max_fps
+        self.burst_interval = 1.0 / max(burst_max_fps or max_fps, max_fps)   # hard floor for hints below 1×
+        self.target_utilization = target_utilization
+        self.max_interval = max_interval
+        self.active_window = active_window
+        self.alpha = alpha                         # EWMA weight of the newest latency sample
+        self.hysteresis = hysteresis               # relative change needed before re-advising
+        self.clock = clock or SYSTEM_CLOCK
+        self.latency: Optional[float] = None       # EWMA seconds per inference
+        self.backlog = 0                           # frames queued in the FairScheduler (set per frame)
+        self._last_frame: Dict[str, float] = {}    # student_id -> time of last processed frame
+        self._advised: Dict[str, int] = {}         # student_id -> last advised interval (ms)
+        self._modes: Dict[str, str] = {}           # student_id -> last advised sampling mode
+        self._penalty: Dict[str, float] = {}       # student_id -> extra interval factor (admitted degraded)
+        self.advisories_sent = 0
+
+    # ── inputs ────────────────────────────────────────────────────────
+    def observe(self, student_id: str, latency: float):
+        """Record one processed frame and how long its inference took (seconds)."""
+        self._last_frame[student_id] = self.clock.time()
+        if latency >= 0:
+            self.latency = latency if self.latency is None else \
+                (1 - self.alpha) * self.latency + self.alpha * latency
+
+    def forget(self, student_id: str):
+        self._last_frame.pop(student_id, None)
+        self._advised.pop(student_id, None)
+        self._modes.pop(student_id, None)
+        self._penalty.pop(student_id, None)
+
+    def degrade(self, student_id: str, factor: float):
+        """Slow one student down for the rest of its session (admission control, degrade policy)."""
+        self._penalty[student_id] = factor
+
+    # ── model ─────────────────────────────────────────────────────────
+    def active_students(self) -> int:
+        cutoff = self.clock.time() - self.active_window
+        return sum(1 for t in self._last_frame.values() if t >= cutoff)
+
+    def interval(self) -> float:
+        """Recommended seconds between captures for every active student."""
+        if not self.latency:
+            return self.min_interval
+        active = max(1, self.active_students())
+        interval = max(self.min_interval, active * self.latency / self.target_utilization)
+        interval += self.backlog * self.latency
+        return min(interval, self.max_interval)
+
+    def interval_ms(self, factor: float = 1.0) -> int:
+        floor = self.burst_interval if factor < 1.0 else self.min_interval
+        interval = min(max(self.interval() * factor, floor), self.max_interval)
+        return int(-(-interval * 1000 // QUANTUM_MS) * QUANTUM_MS)     # round up to the quantum
+
+    # ── advice ────────────────────────────────────────────────────────
+    def _factor(self, student_id: str, hint: Optional[dict]) -> float:
+        return (hint["factor"] if hint else 1.0) * self._penalty.get(student_id, 1.0)
+
+    def current(self, student_id: str, hint: dict = None) -> int:
+        """Interval to announce now (welcome); remembered as this student's advice."""
+        ms = self.interval_ms(self._factor(student_id, hint))
+        self._advised[student_id] = ms
+        self._modes[student_id] = hint["mode"] if hint else "normal"
+        return ms
+
+    def advise(self, student_id: str, hint: dict = None) -> Optional[int]:
+        """
+        New interval for this student if its sampling mode changed or the
+        interval moved past the hysteresis band, else None. A mode change that
+        lands on the same interval (e.g. burst already at the hard floor) is not sent.
+        """
+        mode = hint["mode"] if hint else "normal"
+        ms = self.interval_ms(self._factor(student_id, hint))
+        last = self._advised.get(student_id)
+        mode_changed = mode != self._modes.get(student_id)
+        self._modes[student_id] = mode
+        if last is not None and (ms == last or (not mode_changed and abs(ms - last) <= last * self.hysteresis)):
+            return None
+        self._advised[student_id] = ms
+        self.advisories_sent += 1
+        return ms
+
+    def requested_fps(self) -> float:
+        """Frames per second all students would send if they follow their current advice."""
+        return sum(1000 / ms for ms in self._advised.values() if ms)
+
+    def accepts(self, student_id: str, since_last: float) -> bool:
+        """
+        Server-side guard: drop a frame that arrives well ahead of the advice
+        (clients that ignore pacing). The slack applies to the effective interval,
+        so a client pacing to exactly the advice survives capture/network jitter.
+        """
+        advised = self._advised.get(student_id)
+        interval = self.min_interval if advised is None else max(self.burst_interval, advised / 1000)
+        return since_last >= ACCEPT_SLACK * interval
+
+    def get_stats(self) -> dict:
+        return {
+            "inference_latency_ms": round(self.latency * 1000, 1) if self.latency else None,
+            "active_students": self.active_students(),
+            "backlog": self.backlog,
+            "capture_interval_ms": self.interval_ms(),
+            "min_interval_ms": round(self.min_interval * 1000),
+            "burst_interval_ms": round(self.burst_interval * 1000),
+            "target_utilization": self.target_utilization,
+            "advisories_sent": self.advisories_sent,
+            "degraded_students": len(self._penalty),
+            "modes": {mode: sum(1 for m in self._modes.values() if m == mode) for mode in set(self._modes.values())},
+        }
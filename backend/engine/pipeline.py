@@ -0,0 +1,90 @@
+"""
+VocalLab student pipeline primitives — each student connection runs three
+stages joined by small mailboxes:
+
+    receiver ──LatestSlot──▶ processor ──asyncio.Queue──▶ sender
+       │                      (detect in the inference thread, FSM)
+       └─ ping / language_change answered immediately ──▶ sender
+
+The receiver keeps reading while a frame is in inference and keeps only
+the newest frame: a frame that arrives while an older one is still waiting
+replaces it, so the processor never works on a stale image. The
+replaced frames are counted as `superseded`.
+
+Inference itself runs in one dedicated thread (InferenceRunner): the event
+loop stays free for pings, dashboards and other students, and the YOLO
+model — which is not thread-safe — only ever sees one frame at a time.
+"""
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+
+class LatestSlot:
+    """Single-item mailbox: put() replaces an item that has not been taken yet."""
+
+    __slots__ = ("_item", "_event", "superseded", "taken")
+
+    def __init__(self):
+        self._item: Optional[Any] = None
+        self._event = asyncio.Event()
+        self.superseded = 0                     # items replaced before the consumer got to them
+        self.taken = 0
+
+    def put(self, item):
+        if self._item is not None:
+            self.superseded += 1
+        self._item = item
+        self._event.set()
+
+    async def get(self):
+        while self._item is None:
+            self._event.clear()
+            await self._event.wait()
+        item, self._item = self._item, None
+        self._event.clear()
+        self.taken += 1
+        return item
+
+    @property
+    def pending(self) -> bool:
+        return self._item is not None
+
+
+class InferenceRunner:
+    """Runs blocking detector calls one at a time in a dedicated thread."""
+
+    def __init__(self, name: str = "inference"):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.in_flight = 0
+        self.completed = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.time()
+
+    async def run(self, fn: Callable, *args) -> Tuple[Any, float]:
+        """(fn(*args), seconds spent inside fn) — time queued behind other calls is not counted."""
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._timed, fn, args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def _timed(self, fn: Callable, args: tuple) -> Tuple[Any, float]:
+        t0 = time.perf_counter()
+        try:
+            return fn(*args), time.perf_counter() - t0
+        finally:
+            self.busy_seconds += time.perf_counter() - t0
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> dict:
+        uptime = max(time.time() - self.started_at, 1e-9)
+        return {
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "utilization": round(min(self.busy_seconds / uptime, 1.0), 3),
+        }
@@ -0,0 +1,240 @@
+"""
+VocalLab on-demand profiler — profile the live frame pipeline for the next
+N frames or T seconds without a restart (POST /admin/profile), then fetch
+an artifact a flamegraph tool can render (GET /admin/profile/result).
+
+    sampling       a helper thread reads the stacks of the event-loop thread
+                   and the inference thread every `sample_interval` via
+                   sys._current_frames() → collapsed stacks
+                   ("event-loop;ws_student (main.py:1094);... 42"), for
+                   flamegraph.pl, speedscope or inferno
+    deterministic  cProfile on the event-loop thread for the whole window
+                   (ws_student receive / process / send, ExperimentFSM, ...)
+                   plus one cProfile per detector call on the inference
+                   thread, merged → pstats (snakeviz, gprof2dot, flameprof)
+
+Outside a window the hooks cost one attribute check: `wrap()` hands the
+detector call back unchanged and `frame_done()` is only called while
+`active` is set. The sampler thread and the profilers exist only for the
+duration of the window. Only the last finished window's result is kept.
+"""
+import io
+import sys
+import time
+import marshal
+import pstats
+import asyncio
+import cProfile
+import threading
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+from .watchdog import _short
+
+SAMPLING = "sampling"
+DETERMINISTIC = "deterministic"
+MODES = (SAMPLING, DETERMINISTIC)
+
+FORMAT_COLLAPSED = "collapsed"
+FORMAT_PSTATS = "pstats"
+FORMAT_TEXT = "text"
+FORMATS = {SAMPLING: (FORMAT_COLLAPSED,), DETERMINISTIC: (FORMAT_PSTATS, FORMAT_TEXT)}
+
+DEFAULT_SAMPLE_INTERVAL = 0.005     # seconds between stack samples (sampling mode)
+MAX_STACK_DEPTH = 128               # innermost frames kept per sample
+TEXT_TOP = 60                       # rows in the pstats text report
+
+
+class ProfileWindow:
+    """One profiling run: its limits, its progress and, once finished, its data."""
+
+    def __init__(self, mode: str, frames: Optional[int], seconds: float):
+        self.mode = mode
+        self.frame_limit = frames
+        self.seconds_limit = seconds
+        self.frames = 0
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.finished = False
+        self.stop_reason: Optional[str] = None
+        # sampling
+        self.samples: Counter = Counter()           # collapsed stack -> count
+        self.sample_count = 0
+        # deterministic
+        self.loop_profile: Optional[cProfile.Profile] = None
+        self.call_profiles = []                     # one per profiled detector call
+        self.calls_unprofiled = 0                   # another profiler was already active in that thread
+        self.stats: Optional[pstats.Stats] = None
+
+    def to_dict(self) -> dict:
+        stopped = self.stop_reason is not None
+        elapsed = self.elapsed if stopped else time.perf_counter() - self.started
+        info = {
+            "mode": self.mode,
+            "state": "finished" if self.finished else "stopping" if stopped else "running",
+            "started_at": round(self.started_at, 3),
+            "elapsed_s": round(elapsed, 3),
+            "frames": self.frames,
+            "frame_limit": self.frame_limit,
+            "seconds_limit": self.seconds_limit,
+            "stop_reason": self.stop_reason,
+            "formats": list(FORMATS[self.mode]),
+        }
+        if self.mode == SAMPLING:
+            info["samples"] = self.sample_count
+            info["distinct_stacks"] = len(self.samples)
+        else:
+            info["detector_calls_profiled"] = len(self.call_profiles)
+            info["detector_calls_unprofiled"] = self.calls_unprofiled
+        return info
+
+
+class FrameProfiler:
+    """Runs at most one ProfileWindow at a time over the event loop and the inference thread."""
+
+    def __init__(self, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.sample_interval = sample_interval
+        self.active = False                         # hot-path check
+        self.window: Optional[ProfileWindow] = None # running, or the last finished one
+        self.windows = 0
+        self._lock = threading.Lock()
+        self._threads: Dict[int, str] = {}          # thread id -> name used as the stack root
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._stop: Optional[threading.Event] = None # the running sampler's, one per window
+
+    # ── control (event-loop thread) ───────────────────────────────────
+    def start(self, mode: str, frames: Optional[int] = None, seconds: float = 0.0) -> ProfileWindow:
+        """
+        Open a window that closes after `frames` processed frames or `seconds`, whichever
+        comes first. Raises ValueError for an unknown mode, RuntimeError if one is running.
+        """
+        if mode not in MODES:
+            raise ValueError(f"unknown profiling mode '{mode}' (use {' or '.join(MODES)})")
+        if self.active:
+            raise RuntimeError("a profiling window is already running")
+        window = ProfileWindow(mode, frames, seconds)
+        self._threads = {threading.get_ident(): "event-loop"}
+        self.window = window
+        self.windows += 1
+        if mode == SAMPLING:
+            self._stop = threading.Event()
+            threading.Thread(target=self._sample, args=(window, self._stop), name="frame-profiler",
+                             daemon=True).start()
+        else:
+            window.loop_profile = cProfile.Profile()
+            window.loop_profile.enable()
+        self._timer = asyncio.get_running_loop().call_later(seconds, self.stop, "seconds")
+        self.active = True
+        return window
+
+    def frame_done(self):
+        """A student frame went through the pipeline (called while `active`)."""
+        window = self.window
+        window.frames += 1
+        if window.frame_limit and window.frames >= window.frame_limit:
+            self.stop("frames")
+
+    def stop(self, reason: str = "stopped") -> Optional[ProfileWindow]:
+        """
+        Close the running window (no-op when idle). A sampling window is only told to
+        stop: the sampler thread marks it finished once its last sample is in, so the
+        event loop never waits on it.
+        """
+        window = self.window
+        if not self.active or window is None:
+            return window
+        self.active = False
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        window.elapsed = time.perf_counter() - window.started
+        window.stop_reason = reason
+        if window.mode == SAMPLING:
+            self._stop.set()
+            self._stop = None
+            return window
+        window.loop_profile.disable()
+        with self._lock:                            # detector calls finishing after this are left out
+            window.finished = True
+        window.stats = pstats.Stats(window.loop_profile)
+        for profile in window.call_profiles:
+            window.stats.add(profile)
+        return window
+
+    # ── hooks ─────────────────────────────────────────────────────────
+    def wrap(self, fn: Callable) -> Callable:
+        """`fn` itself when idle; during a window, `fn` instrumented for the thread that will run it."""
+        if not self.active:
+            return fn
+        window = self.window
+
+        def profiled(*args):
+            self._threads.setdefault(threading.get_ident(), "inference")
+            if window.mode == SAMPLING:
+                return fn(*args)
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:                      # a profiler is already active here (e.g. Python 3.12+)
+                window.calls_unprofiled += 1
+                return fn(*args)
+            try:
+                return fn(*args)
+            finally:
+                profile.disable()
+                with self._lock:
+                    if not window.finished:
+                        window.call_profiles.append(profile)
+
+        return profiled
+
+    # ── sampler thread ────────────────────────────────────────────────
+    def _sample(self, window: ProfileWindow, stop: threading.Event):
+        samples = window.samples
+        while not stop.wait(self.sample_interval):
+            frames = sys._current_frames()
+            for thread_id, root in list(self._threads.items()):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(root)
+                samples[";".join(reversed(stack))] += 1
+                window.sample_count += 1
+            del frames
+        window.finished = True                      # render() may read the samples from here on
+
+    # ── results ───────────────────────────────────────────────────────
+    def render(self, fmt: Optional[str] = None):
+        """
+        (body, media type) of the last finished window. `fmt` defaults to the mode's
+        natural artifact. Raises LookupError when there is none, ValueError for a bad format.
+        """
+        window = self.window
+        if window is None or not window.finished:
+            raise LookupError("no finished profiling window")
+        fmt = fmt or FORMATS[window.mode][0]
+        if fmt not in FORMATS[window.mode]:
+            raise ValueError(f"format '{fmt}' is not available for a {window.mode} profile "
+                             f"(use {' or '.join(FORMATS[window.mode])})")
+        if fmt == FORMAT_COLLAPSED:
+            lines = [f"{stack} {count}" for stack, count in window.samples.most_common()]
+            return "\n".join(lines) + "\n", "text/plain"
+        if fmt == FORMAT_PSTATS:
+            return marshal.dumps(window.stats.stats), "application/octet-stream"
+        window.stats.stream = out = io.StringIO()
+        window.stats.sort_stats("cumulative").print_stats(TEXT_TOP)
+        return out.getvalue(), "text/plain"
+
+    def get_stats(self) -> dict:
+        return {
+            "active": self.active,
+            "windows": self.windows,
+            "sample_interval_ms": round(self.sample_interval * 1000, 2),
+            "window": self.window.to_dict() if self.window else None,
+        }
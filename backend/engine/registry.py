@@ -0,0 +1,145 @@
+"""
+VocalLab session registry — one record per connected student instead of a
+parallel dict per attribute (socket, FSM, counters, language, token, ...),
+and dashboards held as a set of their send-queue clients.
+
+    StudentSession   __slots__ record: socket, FSM, per-student counters, metadata
+    SessionRegistry  student_id -> StudentSession, set of DashboardClients,
+                     server-wide safety totals folded in as frames are processed
+
+A connect / disconnect touches one dict entry, a frame bumps attributes on
+one record, and the totals that /stats reports are kept up to date
+incrementally, so the stats endpoint never scans every session. Per-student
+detail is produced page by page.
+"""
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set
+
+# Counters carried in a session's `stats` dict (parking, journal snapshots)
+COUNTERS = ("frames_processed", "frames_superseded", "detections_count", "safety_alerts_count", "steps_completed")
+
+# SafetyEngine counters summed server-wide (see SafetyEngine.merge_stats)
+_SAFETY_COUNTERS = ("proximity_alerts", "predicted_alerts", "predicted_confirmed",
+                    "predicted_expired", "contact_events", "warned_contacts", "total_lead_time")
+
+
+class StudentSession:
+    """Everything the server holds for one connected student."""
+
+    __slots__ = ("student_id", "ws", "fsm", "language", "resume_token", "wire_format", "group", "room",
+                 "connected_at", "frames_processed", "frames_superseded", "detections_count",
+                 "safety_alerts_count", "steps_completed", "_safety_seen")
+
+    def __init__(self, student_id: str, ws, fsm=None, language: str = "en", wire_format: str = "json",
+                 group: str = None, room: str = None, connected_at: float = 0.0, stats: dict = None):
+        self.student_id = student_id
+        self.ws = ws
+        self.fsm = fsm                          # ExperimentFSM (None if creation failed)
+        self.language = language
+        self.resume_token: Optional[str] = None
+        self.wire_format = wire_format          # json / msgpack
+        self.group = group                      # lab bench, for dashboard topics
+        self.room = room
+        stats = stats or {}
+        self.connected_at = stats.get("connected_at", connected_at)
+        self.frames_processed = stats.get("frames_processed", 0)
+        self.frames_superseded = stats.get("frames_superseded", 0)
+        self.detections_count = stats.get("detections_count", 0)
+        self.safety_alerts_count = stats.get("safety_alerts_count", 0)
+        self.steps_completed = stats.get("steps_completed", 0)
+        self._safety_seen = _safety_counters(fsm)
+
+    def counters(self) -> dict:
+        """Counters as the plain dict parked sessions and journal snapshots carry."""
+        stats = {name: getattr(self, name) for name in COUNTERS}
+        stats["connected_at"] = self.connected_at
+        return stats
+
+
+def _page(items, offset: int, limit: int) -> list:
+    offset = max(offset, 0)
+    return list(islice(items, offset, offset + max(limit, 0)))
+
+
+def _safety_counters(fsm) -> tuple:
+    safety = getattr(fsm, "safety", None)
+    if safety is None:
+        return (0,) * len(_SAFETY_COUNTERS)
+    return tuple(getattr(safety, name) for name in _SAFETY_COUNTERS)
+
+
+class SessionRegistry:
+    """Live student sessions and dashboard clients of one worker."""
+
+    def __init__(self):
+        self._students: Dict[str, StudentSession] = {}
+        self.dashboards: Set = set()            # DashboardClient
+        self.opened = 0
+        self.resumed = 0
+        self.closed = 0
+        self._safety = dict.fromkeys(_SAFETY_COUNTERS, 0)
+        self._max_lead_time = 0.0
+
+    # ── students ──────────────────────────────────────────────────────
+    def __len__(self):
+        return len(self._students)
+
+    def __contains__(self, student_id: str) -> bool:
+        return student_id in self._students
+
+    def __iter__(self) -> Iterator[StudentSession]:
+        return iter(list(self._students.values()))
+
+    def get(self, student_id: str) -> Optional[StudentSession]:
+        return self._students.get(student_id)
+
+    def add(self, session: StudentSession, resumed: bool = False):
+        self._students[session.student_id] = session
+        self.opened += 1
+        if resumed:
+            self.resumed += 1
+
+    def remove(self, student_id: str) -> Optional[StudentSession]:
+        session = self._students.pop(student_id, None)
+        if session is not None:
+            self.fold_safety(session)
+            self.closed += 1
+        return session
+
+    def page(self, offset: int = 0, limit: int = 50) -> List[StudentSession]:
+        """Sessions [offset, offset + limit) in connection order."""
+        return _page(self._students.values(), offset, limit)
+
+    def dashboard_page(self, offset: int = 0, limit: int = 50) -> List:
+        """DashboardClients [offset, offset + limit) (set order: stable while none connect or leave)."""
+        return _page(self.dashboards, offset, limit)
+
+    # ── incremental totals ────────────────────────────────────────────
+    def fold_safety(self, session: StudentSession):
+        """Add what the session's safety engine counted since the last fold (call after each frame)."""
+        current = _safety_counters(session.fsm)
+        if current == session._safety_seen:
+            return
+        for name, now, seen in zip(_SAFETY_COUNTERS, current, session._safety_seen):
+            if now > seen:
+                self._safety[name] += now - seen
+        session._safety_seen = current
+        if session.fsm is not None:
+            self._max_lead_time = max(self._max_lead_time, session.fsm.safety.max_lead_time)
+
+    def safety_stats(self) -> dict:
+        """Server-wide safety counters in SafetyEngine.merge_stats() form."""
+        stats = {name: self._safety[name] for name in _SAFETY_COUNTERS if name != "total_lead_time"}
+        contacts = self._safety["contact_events"]
+        stats["mean_lead_time"] = round(self._safety["total_lead_time"] / contacts, 3) if contacts else 0.0
+        stats["max_lead_time"] = round(self._max_lead_time, 3)
+        return stats
+
+    def get_stats(self) -> dict:
+        return {
+            "students": len(self._students),
+            "dashboards": len(self.dashboards),
+            "sessions_opened": self.opened,
+            "sessions_resumed": self.resumed,
+            "sessions_closed": self.closed,
+        }
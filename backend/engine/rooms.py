@@ -0,0 +1,65 @@
+"""
+VocalLab rooms — one backend hosts many classes at once. Students and
+dashboards join a room id (`?room=chem-10b`); dashboard broadcasts, batched
+updates and resets are scoped to the room, so the cost of each event grows
+with the room, not with every connection on the server.
+
+Per-room counters are maintained incrementally as frames are processed, so
+room stats never need a scan over sessions.
+"""
+import time
+from typing import Optional, Set
+
+DEFAULT_ROOM = "main"
+MAX_ROOM_ID_LENGTH = 64
+
+
+def clean_room_id(raw: Optional[str]) -> str:
+    """Normalise a client-supplied room id; empty / missing → DEFAULT_ROOM."""
+    room_id = (raw or "").strip()[:MAX_ROOM_ID_LENGTH]
+    return room_id or DEFAULT_ROOM
+
+
+class Room:
+    """Membership, per-room dashboard batching and incremental counters for one class."""
+
+    __slots__ = ("room_id", "students", "dashboards", "aggregator", "created_at",
+                 "frames_processed", "total_detections", "step_advances", "safety_alerts",
+                 "students_joined", "resets")
+
+    def __init__(self, room_id: str, aggregator=None):
+        self.room_id = room_id
+        self.students: Set[str] = set()
+        self.dashboards: Set = set()              # DashboardClient
+        self.aggregator = aggregator              # DashboardAggregator (None = per-frame updates)
+        self.created_at = time.time()
+        self.frames_processed = 0
+        self.total_detections = 0
+        self.step_advances = 0
+        self.safety_alerts = 0
+        self.students_joined = 0
+        self.resets = 0
+
+    @property
+    def empty(self) -> bool:
+        return not self.students and not self.dashboards
+
+    def reset_counters(self):
+        self.step_advances = 0
+        self.safety_alerts = 0
+        self.resets += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "room": self.room_id,
+            "students": len(self.students),
+            "dashboards": len(self.dashboards),
+            "frames_processed": self.frames_processed,
+            "total_detections": self.total_detections,
+            "step_advances": self.step_advances,
+            "safety_alerts": self.safety_alerts,
+            "students_joined": self.students_joined,
+            "resets": self.resets,
+            "age": round(time.time() - self.created_at, 1),
+            "dashboard_batches": self.aggregator.get_stats() if self.aggregator else None,
+        }
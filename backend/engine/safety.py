@@ -0,0 +1,479 @@
+"""
+╔═══════════════════════════════════════════════════════════════╗
+║          VocalLab — Safety Engine  (v2.1.0)                  ║
+║  Proximity checks between dangerous object pairs             ║
+║                                                              ║
+║  • keeps EVERY instance per label (two beakers = two points) ║
+║  • one vectorised NumPy pass per pair for small frames       ║
+║  • uniform grid index for crowded frames (O(n) expected)     ║
+║  • per-pair thresholds + cooldowns, closest pair reported    ║
+║  • predictive alerts from per-object motion (time-to-contact)║
+╚═══════════════════════════════════════════════════════════════╝
+"""
+
+import logging
+from collections import deque
+
+import numpy as np
+
+from .logs import log_event
+
+logger = logging.getLogger(__name__)
+
+# ── defaults (overridable via experiment.json → safety_rules) ──────────────
+DEFAULT_PROXIMITY_THRESHOLD = 150   # pixels between object centers
+DEFAULT_ALERT_COOLDOWN      = 3     # seconds between alerts for the same pair
+GRID_MIN_POINTS             = 64    # switch from dense matrix to grid index above this
+
+# ── motion prediction defaults ─────────────────────────────────────────────
+DEFAULT_PREDICTION_HORIZON  = 1.0   # seconds; 0 disables predictive alerts
+DEFAULT_HISTORY_FRAMES      = 5     # positions kept per tracked object
+DEFAULT_MATCH_RADIUS        = 200   # px an object may move between frames and keep its track
+DEFAULT_TRACK_TTL           = 1.5   # seconds before an unseen track is dropped
+
+
+class SafetyPair:
+    """One dangerous pair rule: labels a/b, pixel threshold and cooldown."""
+
+    __slots__ = ("a", "b", "threshold", "cooldown", "last_alert", "predicted_at", "in_contact")
+
+    def __init__(self, a: str, b: str, threshold: float, cooldown: float):
+        self.a            = a
+        self.b            = b
+        self.threshold    = float(threshold)
+        self.cooldown     = float(cooldown)
+        self.last_alert   = float("-inf")
+        self.predicted_at = None    # time of a pending predictive alert
+        self.in_contact   = False   # True while the pair is under threshold
+
+    @property
+    def key(self) -> tuple:
+        return (self.a, self.b)
+
+
+class _Track:
+    __slots__ = ("track_id", "history", "last_seen")
+
+    def __init__(self, track_id, history_frames: int):
+        self.track_id  = track_id
+        self.history   = deque(maxlen=history_frames)   # (t, x, y)
+        self.last_seen = 0.0
+
+    def velocity(self) -> tuple:
+        """Mean velocity (px/s) over the kept history; (0, 0) until two samples exist."""
+        if len(self.history) < 2:
+            return (0.0, 0.0)
+        t0, x0, y0 = self.history[0]
+        t1, x1, y1 = self.history[-1]
+        dt = t1 - t0
+        if dt <= 0:
+            return (0.0, 0.0)
+        return ((x1 - x0) / dt, (y1 - y0) / dt)
+
+
+class MotionTracker:
+    """
+    Short per-object motion history for pair-relevant labels.
+
+    Detections carrying a "track_id" keep that identity; everything else is
+    associated to the previous frame by greedy nearest-neighbour matching
+    within `match_radius` pixels.
+    """
+
+    def __init__(self, history_frames: int = DEFAULT_HISTORY_FRAMES,
+                 match_radius: float = DEFAULT_MATCH_RADIUS,
+                 track_ttl: float = DEFAULT_TRACK_TTL):
+        self.history_frames = history_frames
+        self.match_radius   = float(match_radius)
+        self.track_ttl      = float(track_ttl)
+        self.tracks         = {}   # label -> list[_Track]
+        self._next_id       = 0
+
+    def update(self, points: dict, ids: dict, now: float):
+        """Feed one frame of {label: (n, 2) array} (+ optional {label: [track_id|None]})."""
+        for label in list(self.tracks):
+            alive = [t for t in self.tracks[label] if now - t.last_seen <= self.track_ttl]
+            if alive:
+                self.tracks[label] = alive
+            else:
+                del self.tracks[label]
+
+        for label, pts in points.items():
+            tracks    = self.tracks.setdefault(label, [])
+            label_ids = ids.get(label) or [None] * len(pts)
+            assigned  = [None] * len(pts)
+
+            # 1. explicit tracking ids from the detector
+            by_id = {t.track_id: t for t in tracks}
+            for k, tid in enumerate(label_ids):
+                if tid is not None:
+                    tr = by_id.get(("id", tid))
+                    if tr is None:
+                        tr = _Track(("id", tid), self.history_frames)
+                        tracks.append(tr)
+                    assigned[k] = tr
+
+            # 2. greedy nearest-neighbour for the rest
+            free_pts = [k for k in range(len(pts)) if assigned[k] is None]
+            used     = {id(tr) for tr in assigned if tr is not None}
+            free_trk = [t for t in tracks if id(t) not in used and t.history and t.last_seen < now]
+            if free_pts and free_trk:
+                last = np.asarray([t.history[-1][1:] for t in free_trk], dtype=np.float64)
+                diff = pts[free_pts][:, None, :] - last[None, :, :]
+                d2   = np.einsum("ijk,ijk->ij", diff, diff)
+                r2   = self.match_radius ** 2
+                taken_p, taken_t = set(), set()
+                for flat in np.argsort(d2, axis=None).tolist():
+                    i, j = divmod(flat, d2.shape[1])
+                    if d2[i, j] > r2:
+                        break
+                    if i in taken_p or j in taken_t:
+                        continue
+                    taken_p.add(i)
+                    taken_t.add(j)
+                    assigned[free_pts[i]] = free_trk[j]
+            for k in range(len(pts)):
+                if assigned[k] is None:
+                    self._next_id += 1
+                    assigned[k] = _Track(("nn", self._next_id), self.history_frames)
+                    tracks.append(assigned[k])
+
+            for k, tr in enumerate(assigned):
+                tr.history.append((now, float(pts[k][0]), float(pts[k][1])))
+                tr.last_seen = now
+
+    def state(self, label: str, now: float):
+        """(positions, velocities) arrays for tracks of `label` seen this frame, or None."""
+        live = [t for t in self.tracks.get(label, ()) if t.last_seen == now]
+        if not live:
+            return None
+        pos = np.asarray([t.history[-1][1:] for t in live], dtype=np.float64)
+        vel = np.asarray([t.velocity() for t in live], dtype=np.float64)
+        return pos, vel
+
+    def time_to_contact(self, a: str, b: str, threshold: float, now: float, same: bool = False):
+        """
+        Earliest predicted (ttc, i, j, pos_a, pos_b) at which a track of `a` comes
+        within `threshold` of a track of `b` under constant velocity, else None.
+        Pairs already inside the threshold are ignored (the distance rule owns those).
+        """
+        sa = self.state(a, now)
+        sb = sa if same else self.state(b, now)
+        if sa is None or sb is None:
+            return None
+        (pa, va), (pb, vb) = sa, sb
+
+        p  = pb[None, :, :] - pa[:, None, :]          # relative position (i, j, 2)
+        v  = vb[None, :, :] - va[:, None, :]          # relative velocity
+        aa = np.einsum("ijk,ijk->ij", v, v)
+        bb = np.einsum("ijk,ijk->ij", p, v)
+        cc = np.einsum("ijk,ijk->ij", p, p) - float(threshold) ** 2
+        disc = bb * bb - aa * cc
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ttc = (-bb - np.sqrt(disc)) / aa
+        valid = (aa > 1e-9) & (disc >= 0) & (cc > 0) & (bb < 0) & (ttc > 0)
+        if same:
+            valid &= np.triu(np.ones_like(valid, dtype=bool), k=1)
+        if not valid.any():
+            return None
+        ttc  = np.where(valid, ttc, np.inf)
+        flat = int(np.argmin(ttc))
+        i, j = divmod(flat, ttc.shape[1])
+        return float(ttc[i, j]), i, j, pa[i], pb[j]
+
+    def reset(self):
+        self.tracks.clear()
+
+
+class SafetyEngine:
+    """
+    Checks detections against the dangerous_pairs rules of an experiment.
+
+    Rule format (experiment.json → safety_rules)
+    ────────────────────────────────────────────
+      "proximity_threshold":    150,
+      "alert_cooldown_seconds": 3,
+      "dangerous_pairs": [
+        ["hand", "beaker"],                                          # defaults
+        {"objects": ["hand", "hotplate"], "threshold": 220, "cooldown": 5}
+      ],
+      "prediction_horizon_seconds": 1.0,   # 0 = distance rule only
+      "history_frames":             5,
+      "track_match_radius":         200
+
+    A pair that is not yet under its threshold but is predicted to get there
+    within the horizon raises an early "predicted_proximity" alert. Each
+    contact episode records how much earlier than contact it was warned
+    about (lead time), so predictive and distance-only alerts can be compared.
+    """
+
+    def __init__(self, rules: dict = None, grid_min_points: int = GRID_MIN_POINTS):
+        rules = rules or {}
+        self.proximity_threshold = rules.get("proximity_threshold", DEFAULT_PROXIMITY_THRESHOLD)
+        self.alert_cooldown      = rules.get("alert_cooldown_seconds", DEFAULT_ALERT_COOLDOWN)
+        self.grid_min_points     = grid_min_points
+        self.pairs               = self._parse_pairs(rules.get("dangerous_pairs", []))
+        self.labels              = frozenset(l for p in self.pairs for l in (p.a, p.b))
+
+        self.prediction_horizon  = float(rules.get("prediction_horizon_seconds", DEFAULT_PREDICTION_HORIZON))
+        self.tracker             = None
+        if self.prediction_horizon > 0 and self.pairs:
+            self.tracker = MotionTracker(
+                history_frames=rules.get("history_frames", DEFAULT_HISTORY_FRAMES),
+                match_radius=rules.get("track_match_radius", DEFAULT_MATCH_RADIUS),
+            )
+
+        # ── latency metrics ──────────────────────────────────────────────
+        self.proximity_alerts    = 0   # distance-rule alerts issued
+        self.predicted_alerts    = 0   # early alerts issued
+        self.predicted_confirmed = 0   # early alerts followed by real contact
+        self.predicted_expired   = 0   # early alerts never followed by contact
+        self.contact_events      = 0   # pair went from apart → under threshold
+        self.warned_contacts     = 0   # ...with an early alert before it
+        self.total_lead_time     = 0.0 # sum of (contact time − first alert time)
+        self.max_lead_time       = 0.0
+
+    # ─────────────────────────────────────────────────────────────────────
+    # PUBLIC API
+    # ─────────────────────────────────────────────────────────────────────
+
+    def check(self, detections: list, now: float) -> dict | None:
+        """
+        Return an alert for the closest dangerous pair under its threshold, else
+        an early alert for the pair with the soonest predicted contact, else None.
+        Pairs still inside their cooldown window are skipped.
+        """
+        if not self.pairs:
+            return None
+
+        points, ids = self._collect(detections or [])
+        if self.tracker is not None:
+            self.tracker.update(points, ids, now)
+        if not points and self.tracker is None:
+            return None
+
+        best = None   # (distance, pair, pa, pb)
+        for pair in self.pairs:
+            pa = points.get(pair.a)
+            pb = points.get(pair.b)
+            hit = None
+            if pa is not None and pb is not None:
+                hit = self.closest(pa, pb, pair.threshold, same=pair.a == pair.b)
+            # a confirmed prediction escalates to a real alert even inside the cooldown
+            escalate = self._track_contact(pair, hit is not None, now)
+            if hit is None or (now - pair.last_alert < pair.cooldown and not escalate):
+                continue
+            dist, i, j = hit
+            if best is None or dist < best[0]:
+                best = (dist, pair, pa[i], pb[j])
+
+        if best is not None:
+            dist, pair, pa, pb = best
+            pair.last_alert = now
+            self.proximity_alerts += 1
+            log_event(logger, "safety.alert", "Alert: %s <-> %s", pair.a, pair.b, level=logging.DEBUG,
+                      dist=round(dist), threshold=round(pair.threshold))
+            return {
+                "type":      "proximity",
+                "severity":  "high",
+                "message":   f"Warning! Keep {pair.a} and {pair.b} apart!",
+                "objects":   [pair.a, pair.b],
+                "distance":  round(dist, 1),
+                "threshold": pair.threshold,
+                "positions": [self._xy(pa), self._xy(pb)],
+            }
+
+        if self.tracker is not None:
+            return self._check_predicted(now)
+        return None
+
+    def group_points(self, detections: list) -> dict:
+        """Collect every center of every pair-relevant label → {label: (n, 2) float array}."""
+        return self._collect(detections)[0]
+
+    def closest(self, pa: np.ndarray, pb: np.ndarray, threshold: float, same: bool = False):
+        """
+        Closest (distance, i, j) between point sets pa/pb with distance < threshold, else None.
+        `same` means pa is pb (pair of one label) — self-matches are excluded.
+        """
+        if len(pa) + len(pb) >= self.grid_min_points:
+            return self._closest_grid(pa, pb, threshold, same)
+        return self._closest_dense(pa, pb, threshold, same)
+
+    def get_stats(self) -> dict:
+        """Alert counts and early-warning lead time (seconds before contact)."""
+        return {
+            "prediction_enabled":  self.tracker is not None,
+            "prediction_horizon":  self.prediction_horizon,
+            "proximity_alerts":    self.proximity_alerts,
+            "predicted_alerts":    self.predicted_alerts,
+            "predicted_confirmed": self.predicted_confirmed,
+            "predicted_expired":   self.predicted_expired,
+            "contact_events":      self.contact_events,
+            "warned_contacts":     self.warned_contacts,
+            "mean_lead_time":      round(self.total_lead_time / self.contact_events, 3) if self.contact_events else 0.0,
+            "max_lead_time":       round(self.max_lead_time, 3),
+        }
+
+    @staticmethod
+    def merge_stats(stats: list) -> dict:
+        """Combine get_stats() dicts from many engines (e.g. one per student)."""
+        keys = ("proximity_alerts", "predicted_alerts", "predicted_confirmed",
+                "predicted_expired", "contact_events", "warned_contacts")
+        merged = {k: sum(s.get(k, 0) for s in stats) for k in keys}
+        total_lead = sum(s.get("mean_lead_time", 0.0) * s.get("contact_events", 0) for s in stats)
+        merged["mean_lead_time"] = round(total_lead / merged["contact_events"], 3) if merged["contact_events"] else 0.0
+        merged["max_lead_time"]  = max((s.get("max_lead_time", 0.0) for s in stats), default=0.0)
+        return merged
+
+    def reset(self):
+        """Clear all per-pair cooldowns and motion history."""
+        for pair in self.pairs:
+            pair.last_alert   = float("-inf")
+            pair.predicted_at = None
+            pair.in_contact   = False
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    # ─────────────────────────────────────────────────────────────────────
+    # PRIVATE HELPERS
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _collect(self, detections: list) -> tuple:
+        """({label: (n, 2) centers}, {label: [track_id|None]}) for pair-relevant labels."""
+        buckets, ids = {}, {}
+        for d in detections:
+            if not isinstance(d, dict):
+                continue
+            label = d.get("label", "")
+            if label not in self.labels:
+                continue
+            center = d.get("center")
+            if isinstance(center, (list, tuple)) and len(center) >= 2:
+                buckets.setdefault(label, []).append((center[0], center[1]))
+                ids.setdefault(label, []).append(d.get("track_id"))
+        points = {label: np.asarray(pts, dtype=np.float64) for label, pts in buckets.items()}
+        return points, ids
+
+    def _check_predicted(self, now: float) -> dict | None:
+        """Early alert for the pair whose predicted contact is soonest within the horizon."""
+        best = None   # (ttc, pair, pa, pb)
+        for pair in self.pairs:
+            if pair.predicted_at is not None and now - pair.predicted_at > 2 * self.prediction_horizon:
+                pair.predicted_at = None
+                self.predicted_expired += 1
+            if pair.in_contact or now - pair.last_alert < pair.cooldown:
+                continue
+            hit = self.tracker.time_to_contact(pair.a, pair.b, pair.threshold, now, same=pair.a == pair.b)
+            if hit is None or hit[0] > self.prediction_horizon:
+                continue
+            if best is None or hit[0] < best[0]:
+                best = (hit[0], pair, hit[3], hit[4])
+
+        if best is None:
+            return None
+        ttc, pair, pa, pb = best
+        pair.last_alert   = now
+        pair.predicted_at = now
+        self.predicted_alerts += 1
+        dist = float(np.hypot(*(pb - pa)))
+        log_event(logger, "safety.predicted", "Predicted: %s -> %s", pair.a, pair.b, level=logging.DEBUG,
+                  ttc=round(ttc, 2), dist=round(dist))
+        return {
+            "type":            "predicted_proximity",
+            "severity":        "medium",
+            "message":         f"Careful! {pair.a} is getting close to {pair.b}!",
+            "objects":         [pair.a, pair.b],
+            "distance":        round(dist, 1),
+            "threshold":       pair.threshold,
+            "time_to_contact": round(ttc, 2),
+            "positions":       [self._xy(pa), self._xy(pb)],
+        }
+
+    def _track_contact(self, pair: SafetyPair, touching: bool, now: float) -> bool:
+        """Record lead-time metrics on the apart → under-threshold edge; True if it confirmed a prediction."""
+        confirmed = False
+        if touching and not pair.in_contact:
+            self.contact_events += 1
+            if pair.predicted_at is not None:
+                lead = now - pair.predicted_at
+                self.predicted_confirmed += 1
+                self.warned_contacts     += 1
+                self.total_lead_time     += lead
+                self.max_lead_time        = max(self.max_lead_time, lead)
+                pair.predicted_at         = None
+                confirmed                 = True
+        pair.in_contact = touching
+        return confirmed
+
+    @staticmethod
+    def _xy(pt) -> list:
+        return [round(float(pt[0]), 1), round(float(pt[1]), 1)]
+
+    @staticmethod
+    def _closest_dense(pa, pb, threshold, same):
+        """All-pairs squared distances in one broadcast; fine for a handful of boxes."""
+        diff = pa[:, None, :] - pb[None, :, :]
+        d2   = np.einsum("ijk,ijk->ij", diff, diff)
+        if same:
+            # keep upper triangle only (i < j) so a point never matches itself
+            d2[np.tril_indices(len(pa))] = np.inf
+        flat = int(np.argmin(d2))
+        i, j = divmod(flat, d2.shape[1])
+        dist = float(np.sqrt(d2[i, j]))
+        return (dist, i, j) if dist < threshold else None
+
+    @staticmethod
+    def _closest_grid(pa, pb, threshold, same):
+        """
+        Uniform grid with cell size == threshold: any pair closer than the
+        threshold must sit in the same or an adjacent cell, so each point
+        only inspects 9 cells.
+        """
+        cell = max(float(threshold), 1.0)
+        grid = {}
+        for j, key in enumerate(map(tuple, np.floor(pb / cell).astype(np.int64).tolist())):
+            grid.setdefault(key, []).append(j)
+
+        t2     = float(threshold) ** 2
+        best   = None
+        cells  = np.floor(pa / cell).astype(np.int64).tolist()
+        for i, (gx, gy) in enumerate(cells):
+            cand = []
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    bucket = grid.get((gx + dx, gy + dy))
+                    if bucket:
+                        cand.extend(bucket)
+            if same:
+                cand = [j for j in cand if j > i]
+            if not cand:
+                continue
+            idx  = np.asarray(cand, dtype=np.int64)
+            diff = pb[idx] - pa[i]
+            d2   = np.einsum("ij,ij->i", diff, diff)
+            k    = int(np.argmin(d2))
+            if d2[k] < t2 and (best is None or d2[k] < best[0]):
+                best = (float(d2[k]), i, int(idx[k]))
+
+        if best is None:
+            return None
+        return (best[0] ** 0.5, best[1], best[2])
+
+    def _parse_pairs(self, raw_pairs) -> list:
+        pairs = []
+        for raw in raw_pairs or []:
+            threshold = self.proximity_threshold
+            cooldown  = self.alert_cooldown
+            if isinstance(raw, dict):
+                objs      = raw.get("objects", [])
+                threshold = raw.get("threshold", threshold)
+                cooldown  = raw.get("cooldown", cooldown)
+            else:
+                objs = raw
+            if not isinstance(objs, (list, tuple)) or len(objs) < 2:
+                print(f"   [Safety] Ignoring malformed dangerous pair: {raw!r}")
+                continue
+            pairs.append(SafetyPair(str(objs[0]), str(objs[1]), threshold, cooldown))
+        return pairs
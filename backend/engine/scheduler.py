@@ -0,0 +1,238 @@
+"""
+VocalLab inference scheduler — decides which student's frame the detector
+runs next, so one client cannot starve the others and safety-relevant
+frames never wait behind routine ones.
+
+    submit(sid, fn, *args, cost, priority) ──▶ per-session FIFO
+                                                   │
+          priority ring (DRR) ─┐                   ▼
+          starved ring  (DRR) ─┼──▶ dispatcher ──▶ InferenceRunner (one thread)
+          routine ring  (DRR) ─┘
+
+Deficit round-robin: each time a session reaches the head of its ring it
+earns `quantum` credit, and it is served while its credit covers the cost
+of its next frame (cost = encoded frame size, so a client uploading huge
+images gets proportionally fewer turns). Sessions whose FSM has a
+dangerous-pair label in view submit with priority=True and are always
+served before the other rings. A routine frame that has waited longer
+than `max_wait` is promoted to the starved ring, served after the priority
+ring but ahead of the rest of the routine ring, so detection latency stays
+bounded without a safety frame ever waiting behind routine work. Once its
+overdue frame is served, the session goes back to the routine ring.
+
+Wait time (enqueue → dispatch) is recorded per session and overall.
+"""
+import time
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+DEFAULT_QUANTUM = 96_000        # credit per turn, in cost units (base64 chars ≈ a 70 KB JPEG)
+DEFAULT_MAX_WAIT = 2.0          # seconds before a routine frame is promoted
+WAIT_SAMPLES = 512              # recent waits kept for percentiles
+
+# Rings, in dispatch order
+PRIORITY = 0                    # dangerous-pair label in view
+STARVED = 1                     # routine frame waiting longer than max_wait
+ROUTINE = 2
+
+
+class _Job:
+    __slots__ = ("fn", "args", "cost", "priority", "future", "enqueued")
+
+    def __init__(self, fn, args, cost, priority, future, enqueued):
+        self.fn = fn
+        self.args = args
+        self.cost = cost
+        self.priority = priority
+        self.future = future
+        self.enqueued = enqueued
+
+
+class _Session:
+    __slots__ = ("session_id", "jobs", "deficit", "turn", "ring", "served", "wait_total", "wait_max")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.jobs: Deque[_Job] = deque()
+        self.deficit = 0
+        self.turn = False               # already earned this round's quantum
+        self.ring: Optional[int] = None   # PRIORITY / STARVED / ROUTINE, None = idle
+        self.served = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class FairScheduler:
+    """Deficit round-robin across sessions with a strict-priority safety ring and a starved-routine ring."""
+
+    def __init__(self, runner, quantum: int = DEFAULT_QUANTUM, max_wait: float = DEFAULT_MAX_WAIT):
+        self.runner = runner                       # InferenceRunner
+        self.quantum = quantum
+        self.max_wait = max_wait
+        self._sessions: Dict[str, _Session] = {}
+        self._rings: Dict[int, Deque[_Session]] = {PRIORITY: deque(), STARVED: deque(), ROUTINE: deque()}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self.queued = 0
+        self.served_priority = 0
+        self.served_routine = 0
+        self.promoted = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for session in self._sessions.values():
+            for job in session.jobs:
+                if not job.future.done():
+                    job.future.cancel()
+            session.jobs.clear()
+
+    # ── producer side ─────────────────────────────────────────────────
+    async def submit(self, session_id: str, fn: Callable, *args, cost: int = 1, priority: bool = False) -> Any:
+        """Queue fn(*args) for this session and wait for its (result, seconds) from the runner."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session(session_id)
+        job = _Job(fn, args, max(1, cost), priority, asyncio.get_running_loop().create_future(), time.monotonic())
+        session.jobs.append(job)
+        self.queued += 1
+        if session.ring is None:
+            self._enter(session, PRIORITY if priority else ROUTINE)
+        elif priority and session.ring != PRIORITY:
+            self._rings[session.ring].remove(session)
+            self._enter(session, PRIORITY)
+        self._wakeup.set()
+        return await job.future
+
+    def forget(self, session_id: str):
+        """Drop a closed session (its pending frames are cancelled)."""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        for job in session.jobs:
+            if not job.future.done():
+                job.future.cancel()
+        self.queued -= len(session.jobs)
+        session.jobs.clear()
+        if session.ring is not None:
+            self._rings[session.ring].remove(session)
+            session.ring = None
+
+    def _enter(self, session: _Session, ring: int):
+        session.ring = ring
+        session.turn = False
+        self._rings[ring].append(session)
+
+    def _leave(self, session: _Session):
+        self._rings[session.ring].popleft()
+        session.ring = None
+        session.deficit = 0
+        session.turn = False
+
+    # ── dispatch ──────────────────────────────────────────────────────
+    def _promote_starved(self, now: float):
+        routine = self._rings[ROUTINE]
+        if not routine:
+            return
+        starved = [s for s in routine if now - s.jobs[0].enqueued >= self.max_wait]
+        for session in starved:
+            routine.remove(session)
+            self._enter(session, STARVED)
+            self.promoted += 1
+
+    def _pick(self):
+        """Next (session, job) by DRR, priority ring first, then starved, then routine; None when idle."""
+        self._promote_starved(time.monotonic())
+        for level in (PRIORITY, STARVED, ROUTINE):
+            ring = self._rings[level]
+            while ring:
+                session = ring[0]
+                job = session.jobs[0]
+                if session.deficit >= job.cost:
+                    session.deficit -= job.cost
+                    session.jobs.popleft()
+                    self.queued -= 1
+                    if not session.jobs:
+                        self._leave(session)
+                    elif level == STARVED:          # overdue frame served → back to the routine ring
+                        ring.popleft()
+                        self._enter(session, ROUTINE)
+                    return session, job
+                if session.turn:                    # credit spent for this round → next session
+                    session.turn = False
+                    ring.rotate(-1)
+                    continue
+                session.deficit += self.quantum
+                session.turn = True
+        return None
+
+    async def _run(self):
+        while True:
+            picked = self._pick()
+            if picked is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            session, job = picked
+            if job.future.done():                   # submitter went away (disconnect)
+                continue
+            wait = time.monotonic() - job.enqueued
+            session.served += 1
+            session.wait_total += wait
+            session.wait_max = max(session.wait_max, wait)
+            self._waits.append(wait)
+            if job.priority:
+                self.served_priority += 1
+            else:
+                self.served_routine += 1
+            try:
+                result = await self.runner.run(job.fn, *job.args)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+                continue
+            if not job.future.done():
+                job.future.set_result(result)
+
+    # ── stats ─────────────────────────────────────────────────────────
+    def session_stats(self, session_id: str) -> Optional[dict]:
+        session = self._sessions.get(session_id)
+        if session is None or not session.served:
+            return None
+        return {
+            "served": session.served,
+            "avg_wait_ms": round(session.wait_total / session.served * 1000, 1),
+            "max_wait_ms": round(session.wait_max * 1000, 1),
+        }
+
+    def get_stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else None
+
+        return {
+            "queued": self.queued,
+            "sessions": len(self._sessions),
+            "priority_ring": len(self._rings[PRIORITY]),
+            "starved_ring": len(self._rings[STARVED]),
+            "routine_ring": len(self._rings[ROUTINE]),
+            "served_priority": self.served_priority,
+            "served_routine": self.served_routine,
+            "promoted": self.promoted,
+            "quantum": self.quantum,
+            "wait_p50_ms": pct(0.50),
+            "wait_p95_ms": pct(0.95),
+            "wait_max_ms": round(waits[-1] * 1000, 1) if waits else None,
+        }
@@ -0,0 +1,150 @@
+"""
+VocalLab session parking — keeps a disconnected student's FSM, counters and
+language for a short while so a reconnect (phone blipping off Wi-Fi) resumes
+where it left off instead of restarting at step 1.
+
+Parked sessions live in an LRU keyed by resume token, bounded by count,
+estimated memory and a TTL.
+"""
+import sys
+import time
+import secrets
+from collections import OrderedDict
+from typing import Optional
+
+# ── defaults ──────────────────────────────────────────────────────────────
+DEFAULT_TTL_SECONDS = 120          # how long a dropped session stays resumable
+DEFAULT_MAX_SESSIONS = 200
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def new_resume_token() -> str:
+    """Unguessable, URL-safe token handed to the client in `welcome`."""
+    return secrets.token_urlsafe(18)
+
+
+def estimate_size(obj, _seen=None, _depth=0) -> int:
+    """Rough recursive sys.getsizeof — good enough to bound parked memory."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or _depth > 8:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj, 64)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += estimate_size(k, _seen, _depth + 1) + estimate_size(v, _seen, _depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += estimate_size(item, _seen, _depth + 1)
+    elif hasattr(obj, "__dict__"):
+        size += estimate_size(vars(obj), _seen, _depth + 1)
+    elif hasattr(obj, "__slots__"):
+        for name in obj.__slots__:
+            if hasattr(obj, name):
+                size += estimate_size(getattr(obj, name), _seen, _depth + 1)
+    return size
+
+
+class ParkedSession:
+    """Everything needed to resume a student: FSM, counters, language, room."""
+
+    __slots__ = ("student_id", "fsm", "stats", "language", "parked_at", "nbytes", "token", "room")
+
+    def __init__(self, student_id: str, fsm, stats: dict, language: str, parked_at: float, room: str = None):
+        self.student_id = student_id
+        self.room = room
+        self.fsm = fsm
+        self.stats = stats
+        self.language = language
+        self.parked_at = parked_at
+        self.nbytes = estimate_size(fsm) + estimate_size(stats)
+        self.token = None
+
+
+class SessionParking:
+    """Memory-bounded LRU of parked sessions with TTL eviction."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, ParkedSession]" = OrderedDict()  # token -> session
+        self.total_bytes = 0
+        self.parked = 0
+        self.resumed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, token: str) -> bool:
+        return bool(token) and token in self._sessions
+
+    def park(self, token: str, session: ParkedSession):
+        """Store a session under its resume token, evicting expired / oldest entries."""
+        if not token or self.ttl <= 0:
+            return
+        self._discard(token)
+        session.token = token
+        self._sessions[token] = session
+        self.total_bytes += session.nbytes
+        self.parked += 1
+        self.evict_expired(session.parked_at)
+        while self._sessions and (len(self._sessions) > self.max_sessions or self.total_bytes > self.max_bytes):
+            oldest = next(iter(self._sessions))
+            self._discard(oldest)
+            self.evicted += 1
+
+    def resume(self, token: str, now: float = None) -> Optional[ParkedSession]:
+        """Pop and return the parked session for `token` if it is still alive."""
+        if not token:
+            return None
+        session = self._sessions.get(token)
+        if session is None:
+            return None
+        self._discard(token)
+        now = time.time() if now is None else now
+        if now - session.parked_at > self.ttl:
+            self.expired += 1
+            return None
+        self.resumed += 1
+        return session
+
+    def evict_expired(self, now: float = None) -> int:
+        """Drop sessions parked longer than the TTL. Oldest are first, so stop at the first live one."""
+        now = time.time() if now is None else now
+        dropped = 0
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if now - session.parked_at <= self.ttl:
+                break
+            self._discard(token)
+            dropped += 1
+        self.expired += dropped
+        return dropped
+
+    def sessions(self):
+        """Iterate parked sessions (oldest first)."""
+        return list(self._sessions.values())
+
+    def get_stats(self) -> dict:
+        return {
+            "count": len(self._sessions),
+            "bytes": self.total_bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "parked_total": self.parked,
+            "resumed_total": self.resumed,
+            "expired_total": self.expired,
+            "evicted_total": self.evicted,
+        }
+
+    def _discard(self, token: str):
+        session = self._sessions.pop(token, None)
+        if session is not None:
+            self.total_bytes -= session.nbytes
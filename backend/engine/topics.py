@@ -0,0 +1,109 @@
+"""
+VocalLab dashboard topics — lets a dashboard follow a subset of students
+(by id or by group, e.g. a lab bench) at a chosen detail level, so a screen
+watching one bench does not pay for the whole class.
+
+Detail levels:
+    summary   student_stats counters + events (safety_alert, step_advance, completion)
+    progress  summary + step_info
+    full      everything, including detections (default)
+
+Routing happens before serialisation: dashboards with the same subscription
+share one filtered copy and one encoding. A batch's `unset` map (keys removed
+from dict fields) is trimmed to the fields the detail level keeps.
+"""
+from typing import Callable, Iterable, Optional
+
+DETAIL_SUMMARY = "summary"
+DETAIL_PROGRESS = "progress"
+DETAIL_FULL = "full"
+
+_SUMMARY_FIELDS = frozenset({"student_id", "group", "student_stats", "safety_alert", "step_advance",
+                             "experiment_complete", "timestamp", "type"})
+DETAIL_FIELDS = {
+    DETAIL_SUMMARY: _SUMMARY_FIELDS,
+    DETAIL_PROGRESS: _SUMMARY_FIELDS | {"step_info"},
+    DETAIL_FULL: None,                          # no filtering
+}
+
+
+class Subscription:
+    """Which students a dashboard follows, and how much of each update it wants."""
+
+    __slots__ = ("students", "groups", "detail", "key")
+
+    def __init__(self, students: Iterable[str] = (), groups: Iterable[str] = (), detail: str = DETAIL_FULL):
+        if detail not in DETAIL_FIELDS:
+            raise ValueError(f"unknown detail level '{detail}' (expected one of {', '.join(DETAIL_FIELDS)})")
+        self.students = frozenset(s for s in students if s)
+        self.groups = frozenset(g for g in groups if g)
+        self.detail = detail
+        self.key = (self.students, self.groups, detail)   # dashboards with equal keys share encodings
+
+    @property
+    def everyone(self) -> bool:
+        return not self.students and not self.groups
+
+    def wants(self, student_id: str, group: Optional[str]) -> bool:
+        if self.everyone:
+            return True
+        return student_id in self.students or (group is not None and group in self.groups)
+
+    def filter(self, message: dict, group_of: Callable[[str], Optional[str]]) -> Optional[dict]:
+        """
+        Route one outgoing message through this subscription.
+        Returns the (possibly trimmed) message, or None if this dashboard should not get it.
+        """
+        fields = DETAIL_FIELDS[self.detail]
+        students = message.get("students")
+        if isinstance(students, dict):              # dashboard_batch
+            if self.everyone and fields is None:
+                return message
+            kept = {}
+            for sid, data in students.items():
+                if self.wants(sid, group_of(sid)):
+                    kept[sid] = data if fields is None else _trim(data, fields)
+            # the batch itself is still sent (even if empty) so the client's seq stays contiguous
+            return {**message, "students": kept}
+
+        sid = message.get("student_id")
+        if sid is None:
+            return message                          # heartbeat, reset, … go to everyone
+        if not self.wants(sid, message.get("group") or group_of(sid)):
+            return None
+        if fields is None or message.get("type") != "student_update":
+            return message
+        return {k: v for k, v in message.items() if k in fields}
+
+    def describe(self) -> dict:
+        return {"students": sorted(self.students), "groups": sorted(self.groups), "detail": self.detail}
+
+    @classmethod
+    def from_message(cls, msg: dict) -> "Subscription":
+        """Build from a `subscribe` message: {"students": [...], "groups": [...], "detail": "..."}."""
+        students = msg.get("students") or []
+        groups = msg.get("groups") or []
+        if not isinstance(students, list) or not isinstance(groups, list):
+            raise ValueError("students and groups must be lists")
+        return cls([str(s) for s in students], [str(g) for g in groups], msg.get("detail") or DETAIL_FULL)
+
+    @classmethod
+    def from_query(cls, params) -> "Subscription":
+        """Build from connect-time query params: ?students=a,b&groups=bench-3&detail=progress."""
+        def split(name):
+            return [p.strip() for p in (params.get(name) or "").split(",") if p.strip()]
+        return cls(split("students"), split("groups"), params.get("detail") or DETAIL_FULL)
+
+
+def _trim(data: dict, fields: frozenset) -> dict:
+    """One student's batch entry reduced to `fields`, keeping `unset` entries for those fields."""
+    trimmed = {k: v for k, v in data.items() if k in fields}
+    unset = data.get("unset")
+    if unset:
+        unset = {k: v for k, v in unset.items() if k in fields}
+        if unset:
+            trimmed["unset"] = unset
+    return trimmed
+
+
+EVERYONE = Subscription()
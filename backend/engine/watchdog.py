@@ -0,0 +1,137 @@
+"""
+VocalLab event-loop watchdog — notices when something blocks the event loop
+(a detector call or a large json.dumps run inline in a handler) and records
+what the loop was doing at that moment.
+
+    loop thread:    heartbeat task sleeps `interval`, measures how late it woke (lag)
+    helper thread:  polls the heartbeat's deadline; once it is overdue by more than
+                    `threshold`, grabs the loop thread's stack via sys._current_frames()
+
+The stack is taken from the helper thread *while* the loop is still blocked,
+so it shows the offending frames rather than the code that ran afterwards.
+When the heartbeat finally runs it knows the stall's full length and pushes
+a record into a bounded ring buffer:
+
+    {"at": ..., "duration_ms": 812.4, "stack": ["main.py:1203 in process_frame → detector.detect_base64(b64)", ...]}
+
+A stall shorter than the helper's poll period can finish before a stack is
+taken; it is still counted, with `stack: null`.
+"""
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from typing import Callable, Optional
+
+DEFAULT_INTERVAL = 0.1          # heartbeat period (seconds)
+DEFAULT_THRESHOLD = 0.25        # lag that counts as a stall (seconds)
+DEFAULT_CAPACITY = 32           # stalls kept in the ring buffer
+MAX_STACK_FRAMES = 40           # innermost frames kept per capture
+
+
+class LoopWatchdog:
+    """Heartbeat on the event loop + helper thread that captures the loop's stack during a stall."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, threshold: float = DEFAULT_THRESHOLD,
+                 capacity: int = DEFAULT_CAPACITY, on_lag: Callable[[float], None] = None,
+                 on_stall: Callable[[dict], None] = None):
+        self.interval = interval
+        self.threshold = threshold
+        self.on_lag = on_lag                    # every heartbeat: lag in seconds (metrics)
+        self.on_stall = on_stall                # every finished stall: its record
+        self.stalls = deque(maxlen=capacity)
+        self.stall_count = 0
+        self.captures = 0
+        self.max_lag = 0.0
+        self._deadline: Optional[float] = None  # time.monotonic() the heartbeat should wake by
+        self._capture: Optional[tuple] = None   # (deadline, stack) taken by the helper thread
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    # ── loop side ─────────────────────────────────────────────────────
+    async def _heartbeat(self):
+        while True:
+            deadline = time.monotonic() + self.interval
+            self._deadline = deadline
+            try:
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                break
+            lag = max(0.0, time.monotonic() - deadline)
+            self.max_lag = max(self.max_lag, lag)
+            if self.on_lag:
+                self.on_lag(lag)
+            if lag > self.threshold:
+                self._record(deadline, lag)
+
+    def _record(self, deadline: float, lag: float):
+        capture, self._capture = self._capture, None
+        stall = {
+            "at": round(time.time() - lag, 3),
+            "duration_ms": round(lag * 1000, 1),
+            "stack": capture[1] if capture and capture[0] == deadline else None,
+        }
+        self.stalls.append(stall)
+        self.stall_count += 1
+        if self.on_stall:
+            self.on_stall(stall)
+
+    # ── helper thread ─────────────────────────────────────────────────
+    def _watch(self):
+        poll = max(self.threshold / 2, 0.01)
+        captured_for = None
+        while not self._stop.wait(poll):
+            deadline = self._deadline
+            if deadline is None or deadline == captured_for:
+                continue
+            if time.monotonic() - deadline > self.threshold:
+                stack = self._loop_stack()
+                if stack is not None:
+                    self._capture = (deadline, stack)
+                    self.captures += 1
+                captured_for = deadline
+
+    def _loop_stack(self) -> Optional[list]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        summary = traceback.extract_stack(frame)[-MAX_STACK_FRAMES:]
+        return [f"{_short(entry.filename)}:{entry.lineno} in {entry.name}" + (f" → {entry.line}" if entry.line else "")
+                for entry in summary]
+
+    # ── stats ─────────────────────────────────────────────────────────
+    def get_stats(self) -> dict:
+        return {
+            "interval_ms": round(self.interval * 1000),
+            "threshold_ms": round(self.threshold * 1000),
+            "stalls": self.stall_count,
+            "stacks_captured": self.captures,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "recent": list(self.stalls),
+        }
+
+
+def _short(path: str) -> str:
+    """Trim a source path to its last two components (engine/detector.py, asyncio/events.py)."""
+    parts = path.replace("\\", "/").rsplit("/", 2)
+    return "/".join(parts[-2:])
@@ -19,20 +19,21 @@ _torch.load = _patched_load
 
 import os
 import sys
-import json
 import time
+import socket
 import asyncio
 import logging
 import traceback
 from datetime import datetime, timezone
 from contextlib import asynccontextmanager
+from itertools import islice
 from typing import List, Dict, Tuple, Optional
 
 import uvicorn
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, Response
 
 # Ensure backend/ is importable
 _BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -41,7 +42,28 @@ if _BACKEND_DIR not in sys.path:
 
 from engine.detector import ObjectDetector
 from engine.fsm import ExperimentFSM
-from config.label_map import PROXY_MODE, map_label, get_fallback_mapping
+from engine.sessions import SessionParking, ParkedSession, new_resume_token
+from engine.registry import SessionRegistry, StudentSession
+from engine import journal as fsm_journal
+from engine.clock import SYSTEM_CLOCK
+from engine.fanout import DashboardClient
+from engine.aggregator import DashboardAggregator
+from engine import codec
+from engine import columnar
+from engine.topics import Subscription, EVERYONE
+from engine.rooms import Room, DEFAULT_ROOM, clean_room_id
+from engine.bus import create_bus
+from engine.cluster import ClusterNode
+from engine.pacing import FramePacer
+from engine.capture import CaptureProfile
+from engine.pipeline import LatestSlot, InferenceRunner
+from engine.scheduler import FairScheduler
+from engine.admission import AdmissionController, DEGRADE, QUEUE, REJECT
+from engine.logs import LogPipeline, log_event
+from engine.metrics import Metrics
+from engine.watchdog import LoopWatchdog
+from engine.profiling import FrameProfiler
+from config.label_map import label_maps, get_all_lab_labels
 
 # ═══════════════════════════════════════════════════════════════════════
 # CONFIGURATION
@@ -51,13 +73,99 @@ DEMO_MODE = True  # Enable demo mode for testing without real equipment
 
 # Detection settings
 DETECTION_CONFIDENCE = 0.35
-DETECTION_IMGSZ = 640
+DETECTION_IMGSZ = 640               # inference size; student cameras are asked to upload this long side
+CAPTURE_JPEG_QUALITY = 0.4          # JPEG quality (0-1) announced in the capture profile
 MAX_FPS = 2  # Maximum processing frames per second
 
+# Student pipeline (receiver → processor → sender per connection)
+STUDENT_SEND_QUEUE = 8              # outgoing messages buffered per student before the processor waits
+
+# Inference scheduling: deficit round-robin across students, dangerous-pair frames first
+SCHEDULER_QUANTUM = 96_000          # DRR credit per turn (frame cost = base64 length)
+SCHEDULER_MAX_WAIT = 2.0            # seconds before a routine frame is promoted ahead of other routine frames
+
+# Admission control: new students vs measured inference capacity
+OVERLOAD_POLICY = "degrade"         # accept | degrade | queue | reject (see engine/admission.py)
+ADMISSION_MIN_FPS = 0.5             # frame rate a student needs to be guided usefully
+ADMISSION_MAX_STUDENTS = 0          # hard cap per worker (0 = capacity-based only)
+ADMISSION_QUEUE_MAX = 50            # queued connections before new ones are rejected
+ADMISSION_DEGRADE_FACTOR = 2.0      # capture-interval multiplier for students admitted degraded
+ADMISSION_RETRY_AFTER = 30          # seconds a rejected client is told to wait
+
+# Frame pacing: clients are told how often to capture, from measured inference load
+PACING_TARGET_UTILIZATION = 0.75    # share of inference capacity the advice aims to use
+PACING_MAX_INTERVAL = 5.0           # longest capture interval ever advised (seconds)
+PACING_BURST_MAX_FPS = 4            # hard capture-rate cap for students in burst mode (hint below 1×)
+
+# Logging: hot-path messages are sampled, rate limited and written by a background thread
+LOG_LEVEL = os.environ.get("VOCALLAB_LOG_LEVEL", "INFO")   # also adjustable at runtime: POST /admin/logging
+LOG_FORMAT = "text"                 # text ("[Tag] message key=value") | json (one object per line)
+LOG_QUEUE_SIZE = 10_000             # records waiting for the writer thread before new ones are dropped
+LOG_SAMPLING = {                    # event -> (keep 1 in N, max per second; 0 = unlimited)
+    "detector.frame":   (10, 5),
+    "detector.error":   (1, 5),
+    "http.request":     (1, 20),
+    "ws.step_advance":  (1, 20),
+    "ws.safety_alert":  (1, 20),
+    "ws.error":         (1, 5),
+    "ws.welcome":       (1, 20),
+    "ws.language":      (1, 10),
+    "ws.disconnect":    (1, 20),
+    "ws.rejected":      (1, 5),
+    "cm.connect":       (1, 20),
+    "cm.disconnect":    (1, 20),
+    "cm.subscribe":     (1, 10),
+    "cm.room":          (1, 10),
+    "cm.error":         (1, 5),
+    "safety.alert":     (1, 20),
+    "safety.predicted": (1, 20),
+    "fsm.demo_advance": (1, 20),
+    "fsm.error":        (1, 5),
+    "fanout.drop":      (1, 5),
+    "watchdog.stall":   (1, 1),
+}
+
+# Prometheus metrics (GET /metrics)
+METRICS_MAX_SERIES = 64             # label values per metric (rooms, labels) before folding into "other"
+
+# Event-loop watchdog: lag probe + stack capture of whatever blocks the loop (GET /admin/stalls)
+LOOP_LAG_INTERVAL = 0.1             # seconds between event-loop lag probes
+WATCHDOG_STALL_THRESHOLD = 0.25     # lag (seconds) that counts as a stall and captures the loop's stack
+WATCHDOG_STALL_HISTORY = 32         # recent stalls kept for /admin/stalls
+
+# On-demand profiling of the frame pipeline (POST /admin/profile)
+PROFILE_MAX_SECONDS = 60            # longest window; also ends a frame-count window that never fills
+PROFILE_MAX_FRAMES = 5000           # largest frame count a window may ask for
+PROFILE_SAMPLE_INTERVAL = 0.005     # sampling mode: seconds between stack samples
+
 # Safety settings
 SAFETY_COOLDOWN_SECONDS = 3
 SAFETY_PROXIMITY_THRESHOLD = 150  # pixels
 
+# Label map hot reload (config/label_maps/default.json)
+LABEL_MAP_CHECK_INTERVAL = 2        # seconds between file change checks
+
+# Session resume settings (reconnects within the TTL keep FSM state)
+SESSION_RESUME_TTL = 120            # seconds a dropped session stays resumable
+SESSION_PARK_MAX = 200              # max parked sessions
+SESSION_PARK_MAX_BYTES = 32 * 1024 * 1024
+
+# FSM journal (crash / deploy recovery)
+JOURNAL_ENABLED = True
+JOURNAL_DIR = os.path.join(_BACKEND_DIR, "journal")
+JOURNAL_SNAPSHOT_INTERVAL = 60      # seconds between full session snapshots
+
+# Dashboard fan-out
+DASHBOARD_QUEUE_SIZE = 64           # pending messages per dashboard before the oldest is dropped
+DASHBOARD_STUCK_SECONDS = 10        # a send blocked this long disconnects the dashboard
+DASHBOARD_TICK_HZ = 4               # batched dashboard_batch rate (0 = one student_update per frame)
+DASHBOARD_KEYFRAME_SECONDS = 10     # full-state keyframe interval for dashboard batches
+
+# Sharded mode: several workers behind a sticky load balancer, joined by an event bus
+CLUSTER_BUS_URL = os.environ.get("VOCALLAB_BUS_URL", "")   # "" = single worker; memory:// or redis://host:6379/0
+WORKER_ID = os.environ.get("VOCALLAB_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+CLUSTER_STATS_INTERVAL = 5          # seconds between per-worker stats publications
+
 # Demo mode settings
 DEMO_SIMULATION_DELAY = 3  # seconds to simulate detection if objects not found (reduced for faster testing)
 
@@ -66,6 +174,18 @@ DEMO_SIMULATION_DELAY = 3  # seconds to simulate detection if objects not found
 # ═══════════════════════════════════════════════════════════════════════
 detector: ObjectDetector = None
 fsm: ExperimentFSM = None
+journal: fsm_journal.Journal = None
+cluster: ClusterNode = None
+inference: InferenceRunner = None   # the one thread that runs the detector
+scheduler: FairScheduler = None     # decides whose frame the inference thread runs next
+log_pipeline: LogPipeline = None    # queue + writer thread behind every logger
+watchdog: LoopWatchdog = None       # event-loop stall detector
+
+main_log = logging.getLogger("vocallab.main")
+
+ws_log = logging.getLogger("vocallab.ws")
+cm_log = logging.getLogger("vocallab.cm")
+http_log = logging.getLogger("vocallab.http")
 
 server_stats = {
     "start_time": time.time(),
@@ -74,125 +194,364 @@ server_stats = {
     "step_advances": 0,
     "safety_alerts": 0,
     "demo_simulations": 0,
+    "frames_superseded": 0,     # replaced by a newer frame before inference got to them
+    "replies_dropped": 0,       # pongs / language_updated dropped for a client not reading
 }
 
+metrics = Metrics(get_all_lab_labels(), max_series=METRICS_MAX_SERIES)   # rendered at /metrics
+profiler = FrameProfiler(sample_interval=PROFILE_SAMPLE_INTERVAL)       # idle until POST /admin/profile
+
 
 # ═══════════════════════════════════════════════════════════════════════
 # CONNECTION MANAGER
 # ═══════════════════════════════════════════════════════════════════════
 class ConnectionManager:
-    def __init__(self):
-        self.student_connections: Dict[str, WebSocket] = {}  # student_id -> WebSocket
-        self.dashboard_connections: List[WebSocket] = []
-        self.student_fsms: Dict[str, ExperimentFSM] = {}    # student_id -> live FSM instance
-        self.student_stats: Dict[str, Dict] = {}             # student_id -> metrics counters
-
-    async def connect_student(self, ws: WebSocket, student_id: str = None):
-        if not student_id:
-            student_id = f"STU-{int(time.time() * 1000)}-{len(self.student_connections)}"
-        await ws.accept()
-        self.student_connections[student_id] = ws
-        # Create isolated FSM instance for this student
-        if student_id not in self.student_fsms:
+    def __init__(self, clock=None):
+        self.clock = clock or SYSTEM_CLOCK                   # injectable for simulations
+        self.sessions = SessionRegistry()                    # student_id -> StudentSession, dashboard clients
+        self.rooms: Dict[str, Room] = {}                     # room id -> members, batching, counters
+        self.remote_groups: Dict[str, str] = {}              # student_id -> group, for students on other workers
+        self.dashboard_labels = columnar.LabelDictionary(sorted(get_all_lab_labels()))  # shared by columnar dashboards
+        self.parked = SessionParking(ttl=SESSION_RESUME_TTL, max_sessions=SESSION_PARK_MAX,
+                                     max_bytes=SESSION_PARK_MAX_BYTES)
+        self.journal: Optional[fsm_journal.Journal] = None
+        self.cluster: Optional[ClusterNode] = None            # set in sharded mode
+        self.capture_profile = CaptureProfile(DETECTION_IMGSZ, CAPTURE_JPEG_QUALITY)  # revised via /capture-profile
+        self.pacer = FramePacer(MAX_FPS, target_utilization=PACING_TARGET_UTILIZATION,
+                                max_interval=PACING_MAX_INTERVAL, burst_max_fps=PACING_BURST_MAX_FPS,
+                                clock=self.clock)
+        self.admission = AdmissionController(self.pacer, policy=OVERLOAD_POLICY, min_fps=ADMISSION_MIN_FPS,
+                                             max_students=ADMISSION_MAX_STUDENTS, queue_max=ADMISSION_QUEUE_MAX,
+                                             degrade_factor=ADMISSION_DEGRADE_FACTOR)
+
+    def room(self, room_id: str = DEFAULT_ROOM) -> Room:
+        """Get or create a room; each room batches its own dashboard updates."""
+        room = self.rooms.get(room_id)
+        if room is None:
+            aggregator = None
+            if DASHBOARD_TICK_HZ > 0:
+                aggregator = DashboardAggregator(keyframe_every=int(DASHBOARD_TICK_HZ * DASHBOARD_KEYFRAME_SECONDS),
+                                                 snapshot=self.get_student_snapshot, worker=WORKER_ID)
+            room = self.rooms[room_id] = Room(room_id, aggregator)
+            log_event(cm_log, "cm.room", "Room opened: %s", room_id, rooms=len(self.rooms))
+        return room
+
+    def room_of(self, student_id: str) -> Optional[Room]:
+        session = self.sessions.get(student_id)
+        return self.rooms.get(session.room if session else DEFAULT_ROOM)
+
+    def _close_room_if_empty(self, room_id: str):
+        room = self.rooms.get(room_id)
+        if room is not None and room.empty:
+            del self.rooms[room_id]
+            log_event(cm_log, "cm.room", "Room closed: %s", room_id, rooms=len(self.rooms))
+
+    async def connect_student(self, ws: WebSocket, student_id: str = None, resume_token: str = None,
+                              group: str = None, room: str = DEFAULT_ROOM, accepted: bool = False):
+        """
+        Accept a student into `room`; a valid resume_token restores the parked FSM, counters,
+        language and room. `group` (e.g. a lab bench) is what dashboards can subscribe to.
+        `accepted` = the socket was already accepted (it waited in the admission queue).
+        Returns the StudentSession (its FSM, counters and metadata) and whether it was resumed.
+        """
+        parked = self.parked.resume(resume_token, self.clock.time()) if resume_token else None
+        resumed = parked is not None and parked.student_id not in self.sessions
+        if resumed:
+            student_id = parked.student_id
+            student_fsm, stats, language = parked.fsm, parked.stats, parked.language
+            room = parked.room or room
+            log_event(cm_log, "cm.connect", "Resumed session", student=student_id,
+                      step=parked.fsm.current_step_index if parked.fsm else 0)
+        else:
+            stats, language = None, "en"
+            student_id = student_id or f"STU-{int(self.clock.time() * 1000)}-{len(self.sessions)}"
+            # Create isolated FSM instance for this student
             try:
-                self.student_fsms[student_id] = ExperimentFSM(demo_mode=DEMO_MODE, demo_timeout=DEMO_SIMULATION_DELAY)
+                student_fsm = ExperimentFSM(demo_mode=DEMO_MODE, demo_timeout=DEMO_SIMULATION_DELAY, clock=self.clock)
             except Exception as e:
-                print(f"   [CM] FSM creation failed for {student_id}: {e}")
-                self.student_fsms[student_id] = None
-        # Initialize per-student metrics
-        if student_id not in self.student_stats:
-            self.student_stats[student_id] = {
-                "frames_processed": 0,
-                "detections_count": 0,
-                "safety_alerts_count": 0,
-                "steps_completed": 0,
-                "connected_at": time.time(),
-            }
-        print(f"   [CM] Student connected: {student_id} (total: {len(self.student_connections)})")
-        return student_id
-
-    async def connect_dashboard(self, ws: WebSocket):
-        await ws.accept()
-        self.dashboard_connections.append(ws)
-        print(f"   [CM] Dashboard connected (total: {len(self.dashboard_connections)})")
-
-    def disconnect_student(self, student_id: str):
-        if student_id in self.student_connections:
-            self.student_connections.pop(student_id)
-        if student_id in self.student_fsms:
-            self.student_fsms.pop(student_id)
-        self.student_stats.pop(student_id, None)
-        print(f"   [CM] Student disconnected: {student_id} (total: {len(self.student_connections)})")
-
-    def disconnect_dashboard(self, ws: WebSocket):
-        if ws in self.dashboard_connections:
-            self.dashboard_connections.remove(ws)
-        print(f"   [CM] Dashboard disconnected (total: {len(self.dashboard_connections)})")
-
-    async def broadcast_to_dashboards(self, message: dict, exclude_ws: WebSocket = None):
-        """Send JSON to all dashboard clients. Remove dead connections."""
-        if not self.dashboard_connections:
+                log_event(cm_log, "cm.error", "FSM creation failed: %s", e, level=logging.WARNING, student=student_id)
+                student_fsm = None
+        wire_format, subprotocol = codec.negotiate(ws)
+        if not accepted:
+            await ws.accept(subprotocol=subprotocol)
+        session = StudentSession(student_id, ws, student_fsm, language=language, wire_format=wire_format,
+                                 group=group, room=room, connected_at=self.clock.time(), stats=stats)
+        session.resume_token = new_resume_token()
+        self.sessions.add(session, resumed)
+        joined = self.room(room)
+        joined.students.add(student_id)
+        joined.students_joined += 1
+        self.record(fsm_journal.EV_SESSION_START, student_id, value=session.resume_token)
+        if self.journal and student_fsm:
+            student_fsm.event_sink = self.journal.sink(student_id)
+        log_event(cm_log, "cm.connect", "Student connected", student=student_id, room=room, total=len(self.sessions))
+        return session, resumed
+
+    async def connect_dashboard(self, ws: WebSocket, room: str = DEFAULT_ROOM) -> DashboardClient:
+        """Accept a dashboard into `room`; the returned client is its handle for sends."""
+        wire_format, subprotocol = codec.negotiate(ws)
+        try:
+            subscription = Subscription.from_query(ws.query_params)
+        except ValueError as e:
+            log_event(cm_log, "cm.error", "Bad dashboard subscription (%s); sending everything", e, level=logging.WARNING)
+            subscription = EVERYONE
+        await ws.accept(subprotocol=subprotocol)
+        client = DashboardClient(ws, on_dead=self.disconnect_dashboard,
+                                 max_queue=DASHBOARD_QUEUE_SIZE, stuck_after=DASHBOARD_STUCK_SECONDS,
+                                 wire_format=wire_format, detections_format=columnar.negotiate(ws),
+                                 subscription=subscription, room=room)
+        self.sessions.dashboards.add(client)
+        self.room(room).dashboards.add(client)
+        client.start()
+        log_event(cm_log, "cm.connect", "Dashboard connected", room=room, total=len(self.sessions.dashboards))
+        return client
+
+    def disconnect_student(self, student_id: str, park: bool = True):
+        """Drop a student's connection; with park=True the session stays resumable for the TTL."""
+        session = self.sessions.remove(student_id)
+        self.pacer.forget(student_id)
+        self.admission.release()
+        if session is None:
             return
-        text = json.dumps(message)
-        dead = []
-        for ws in self.dashboard_connections:
-            if ws == exclude_ws:
+        room_id = session.room
+        if park and session.fsm is not None:
+            self.parked.park(session.resume_token, ParkedSession(student_id, session.fsm, session.counters(),
+                                                                 session.language, self.clock.time(), room_id))
+        self.record(fsm_journal.EV_SESSION_END, student_id)
+        room = self.rooms.get(room_id)
+        if room is not None:
+            room.students.discard(student_id)
+            if room.aggregator:
+                room.aggregator.remove(student_id)
+            self._close_room_if_empty(room_id)
+        log_event(cm_log, "cm.disconnect", "Student disconnected", student=student_id, total=len(self.sessions))
+
+    def disconnect_dashboard(self, client: DashboardClient):
+        if client not in self.sessions.dashboards:
+            return
+        self.sessions.dashboards.discard(client)
+        client.close()
+        room = self.rooms.get(client.room)
+        if room is not None:
+            room.dashboards.discard(client)
+            self._close_room_if_empty(client.room)
+        log_event(cm_log, "cm.disconnect", "Dashboard disconnected", total=len(self.sessions.dashboards))
+
+    async def broadcast_to_dashboards(self, message: dict, coalesce_key: str = None, room: str = None):
+        """
+        Queue the message for every dashboard in `room` (all dashboards when room is None)
+        without awaiting any socket: each dashboard's
+        sender task drains its own queue, so one slow client cannot stall the rest.
+        Messages are routed through each dashboard's topic subscription first; dashboards
+        with the same subscription and formats share one filtered copy and one encoding.
+        Messages sharing a coalesce_key replace each other while still queued.
+        """
+        if room is None:
+            targets = self.sessions.dashboards
+        else:
+            targets = self.rooms[room].dashboards if room in self.rooms else ()
+        if not targets:
+            return
+        # (subscription, detections format, label offset) -> shared encoding; columnar clients that
+        # are equally far behind on the shared label dictionary get the same dictionary update
+        outs: Dict[tuple, Optional[codec.Outgoing]] = {}
+        for client in list(targets):
+            columnar_client = client.detections_format == columnar.COLUMNAR
+            variant = (client.subscription.key, client.detections_format,
+                       client.label_offset if columnar_client else None)
+            if variant not in outs:
+                routed = self._dashboard_variant(message, client)
+                outs[variant] = codec.Outgoing(routed) if routed is not None else None
+            out = outs[variant]
+            if out is None:
                 continue
-            try:
-                await ws.send_text(text)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            self.disconnect_dashboard(ws)
+            if columnar_client:
+                client.label_offset = len(self.dashboard_labels)
+            # a message that grows the label dictionary must not be coalesced away
+            key = None if "label_dictionary" in out.message else coalesce_key
+            client.enqueue(out.encoded(client.wire_format), key)
+
+    async def publish_to_room(self, message: dict, room: Optional[str], coalesce_key: str = None):
+        """
+        Room-scoped dashboard message (room=None: every room). In sharded mode it goes over
+        the event bus so dashboards connected to any worker receive it.
+        """
+        if self.cluster:
+            await self.cluster.publish_dashboard(message, room, coalesce_key)
+        else:
+            await self.broadcast_to_dashboards(message, coalesce_key=coalesce_key, room=room)
+
+    def send_to_dashboard(self, client: DashboardClient, message: dict, full_dictionary: bool = False):
+        """Queue a message for one dashboard (keeps ordering with broadcasts)."""
+        if not client.closed:
+            message = self._dashboard_variant(message, client, full_dictionary)
+            if message is not None:
+                if client.detections_format == columnar.COLUMNAR:
+                    client.label_offset = len(self.dashboard_labels)
+                client.enqueue(codec.Outgoing(message).encoded(client.wire_format))
+
+    def subscribe_dashboard(self, client: DashboardClient, subscription: Subscription):
+        if not client.closed:
+            client.subscription = subscription
+            log_event(cm_log, "cm.subscribe", "Dashboard subscribed", **subscription.describe())
+
+    def _dashboard_variant(self, message: dict, client: DashboardClient, full_dictionary: bool = False) -> Optional[dict]:
+        """
+        Filter by topic subscription, then apply the client's detections format. None = not for this client.
+        Columnar messages carry every shared-dictionary entry the client has not been sent yet.
+        """
+        message = client.subscription.filter(message, self.group_of)
+        if message is not None and client.detections_format == columnar.COLUMNAR:
+            message = columnar.pack_message(message, self.dashboard_labels,
+                                            since=0 if full_dictionary else client.label_offset)
+        return message
+
+    def group_of(self, student_id: str) -> Optional[str]:
+        session = self.sessions.get(student_id)
+        return (session.group if session else None) or self.remote_groups.get(student_id)
+
+    def get_dashboard_page(self, offset: int = 0, limit: int = 50) -> List[Dict]:
+        return [client.get_stats() for client in self.sessions.dashboard_page(offset, limit)]
+
+    def get_room_page(self, offset: int = 0, limit: int = 50) -> List[Dict]:
+        return [room.get_stats() for room in islice(self.rooms.values(), offset, offset + limit)]
 
     async def send_to_student(self, student_id: str, message: dict):
         """Send message to specific student."""
-        if student_id in self.student_connections:
-            ws = self.student_connections[student_id]
+        session = self.sessions.get(student_id)
+        if session is not None:
             try:
-                await ws.send_text(json.dumps(message))
+                await codec.send(session.ws, message, session.wire_format)
                 return True
             except Exception as e:
-                print(f"   [CM] Error sending to {student_id}: {e}")
+                log_event(cm_log, "cm.error", "Error sending: %s", e, level=logging.WARNING, student=student_id)
                 self.disconnect_student(student_id)
         return False
 
-    async def broadcast_to_students(self, message: dict):
-        """Send JSON to all student clients. Remove dead connections."""
-        if not self.student_connections:
+    async def broadcast_to_students(self, message: dict, room: str = None):
+        """Send to all student clients in `room` (everyone when None). Remove dead connections."""
+        if room is None:
+            targets = list(self.sessions)
+        else:
+            members = self.rooms[room].students if room in self.rooms else ()
+            targets = [self.sessions.get(sid) for sid in members if sid in self.sessions]
+        if not targets:
             return
-        text = json.dumps(message)
+        out = codec.Outgoing(message)
         dead = []
-        for student_id, ws in list(self.student_connections.items()):
+        for session in targets:
             try:
-                await ws.send_text(text)
+                await codec.send(session.ws, out, session.wire_format)
             except Exception:
-                dead.append(student_id)
+                dead.append(session.student_id)
         for student_id in dead:
             self.disconnect_student(student_id)
 
 
+    async def revise_capture_profile(self, imgsz: int = None, jpeg_quality: float = None) -> CaptureProfile:
+        """Change what students should upload (and the detector's inference size) and tell every student."""
+        self.capture_profile = self.capture_profile.revise(imgsz, jpeg_quality)
+        if detector is not None:
+            detector.imgsz = self.capture_profile.long_side
+        print(f"   [CM] Capture profile r{self.capture_profile.revision}: "
+              f"{self.capture_profile.width}x{self.capture_profile.height} q={self.capture_profile.jpeg_quality}")
+        await self.broadcast_to_students({
+            "type": "capture_profile",
+            **self.capture_profile.to_dict(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        })
+        return self.capture_profile
+
+    def record(self, kind: int, student_id: str, **data):
+        """Append a session event to the FSM journal (no-op when journaling is off)."""
+        if self.journal:
+            self.journal.append(kind, student_id, self.clock.time(), **data)
+
+    def export_sessions(self) -> dict:
+        """Durable state of every live and parked session, for journal snapshots."""
+        sessions = {}
+        for parked in self.parked.sessions():
+            if parked.fsm:
+                sessions[parked.student_id] = {
+                    "fsm": parked.fsm.export_state(),
+                    "stats": parked.stats,
+                    "language": parked.language,
+                    "resume_token": parked.token,
+                    "room": parked.room,
+                    "ended_at": parked.parked_at,
+                }
+        for session in self.sessions:
+            if session.fsm:
+                sessions[session.student_id] = {
+                    "fsm": session.fsm.export_state(),
+                    "stats": session.counters(),
+                    "language": session.language,
+                    "resume_token": session.resume_token,
+                    "room": session.room,
+                    "ended_at": None,
+                }
+        return sessions
+
+    def restore_sessions(self, sessions: dict) -> int:
+        """Park sessions rebuilt from the journal so their clients can resume them."""
+        restored = 0
+        now = self.clock.time()
+        for sid, state in sessions.items():
+            token = state.get("resume_token")
+            if not token:
+                continue
+            try:
+                sfsm = ExperimentFSM(demo_mode=DEMO_MODE, demo_timeout=DEMO_SIMULATION_DELAY, clock=self.clock)
+                sfsm.restore_state(state.get("fsm", {}))
+            except Exception as e:
+                print(f"   [CM] Could not restore {sid}: {e}")
+                continue
+            if self.journal:
+                sfsm.event_sink = self.journal.sink(sid)
+            self.parked.park(token, ParkedSession(sid, sfsm, dict(state.get("stats", {})),
+                                                  state.get("language", "en"), now, state.get("room")))
+            restored += 1
+        return restored
+
+    def get_local_stats(self) -> dict:
+        """This worker's counters, published to the cluster and summed across workers."""
+        return {
+            "frames_processed": server_stats["frames_processed"],
+            "total_detections": server_stats["total_detections"],
+            "step_advances": server_stats["step_advances"],
+            "safety_alerts": server_stats["safety_alerts"],
+            "students_connected": len(self.sessions),
+            "dashboards_connected": len(self.sessions.dashboards),
+            "parked_sessions": len(self.parked),
+            "rooms": sorted(self.rooms),
+        }
+
     def get_student_snapshot(self, student_id: str) -> dict:
         """Build a full per-student metrics snapshot (counters + FSM-derived fields)."""
-        stats = self.student_stats.get(student_id, {})
-        sfsm = self.student_fsms.get(student_id)
-        now = time.time()
+        session = self.sessions.get(student_id)
+        if session is None:
+            return {"student_id": student_id}
+        sfsm = session.fsm
+        now = self.clock.time()
         return {
             "student_id": student_id,
-            "frames_processed": stats.get("frames_processed", 0),
-            "detections_count": stats.get("detections_count", 0),
-            "safety_alerts_count": stats.get("safety_alerts_count", 0),
-            "steps_completed": stats.get("steps_completed", 0),
+            "group": session.group,
+            "room": session.room,
+            "frames_processed": session.frames_processed,
+            "frames_superseded": session.frames_superseded,
+            "detections_count": session.detections_count,
+            "safety_alerts_count": session.safety_alerts_count,
+            "steps_completed": session.steps_completed,
             "current_step": sfsm.current_step_index if sfsm else 0,
             "total_steps": sfsm.total_steps if sfsm else 0,
             "experiment_complete": sfsm.completed if sfsm else False,
             "time_on_current_step": round(now - sfsm.step_start, 1) if sfsm else 0.0,
-            "session_duration": round(now - stats.get("connected_at", now), 1),
+            "session_duration": round(now - session.connected_at, 1),
         }
 
-    def get_all_student_snapshots(self) -> list:
-        """Return metrics for every connected student."""
-        return [self.get_student_snapshot(sid) for sid in self.student_connections]
+    def get_student_page(self, offset: int = 0, limit: int = 50) -> list:
+        """Snapshots for one page of connected students (connection order)."""
+        return [self.get_student_snapshot(session.student_id) for session in self.sessions.page(offset, limit)]
 
 
 manager = ConnectionManager()
@@ -223,8 +582,13 @@ def print_banner():
 # ═══════════════════════════════════════════════════════════════════════
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global detector, fsm
+    global detector, fsm, journal, cluster, inference, scheduler, log_pipeline, watchdog
+    log_pipeline = LogPipeline(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLING, LOG_QUEUE_SIZE)
+    log_pipeline.start()
     print_banner()
+    inference = InferenceRunner()
+    scheduler = FairScheduler(inference, quantum=SCHEDULER_QUANTUM, max_wait=SCHEDULER_MAX_WAIT)
+    scheduler.start()
 
     # Mount audio
     audio_dir = os.path.join(_BACKEND_DIR, "audio")
@@ -246,7 +610,8 @@ async def lifespan(app: FastAPI):
     # Load detector
     print("   [Main] Loading AI engine...")
     try:
-        detector = ObjectDetector(model_path="yolov8n.pt", confidence=DETECTION_CONFIDENCE)
+        detector = ObjectDetector(model_path="yolov8n.pt", confidence=DETECTION_CONFIDENCE, imgsz=DETECTION_IMGSZ)
+        detector.observe_stage = metrics.observe_stage
         print("   [Main] Detector OK ✓")
     except Exception as e:
         print(f"   [Main] Detector FAILED: {e}")
@@ -257,13 +622,56 @@ async def lifespan(app: FastAPI):
     try:
         fsm = ExperimentFSM(demo_mode=DEMO_MODE, demo_timeout=DEMO_SIMULATION_DELAY)
         print(f"   [Main] FSM OK ✓ (demo_mode={DEMO_MODE})")
+        # Experiment-level label map overrides ("label_map" block in experiment.json)
+        mapper = label_maps.set_override(fsm.config.get("label_map"))
+        print(f"   [Main] Label map v{mapper.version} ({len(mapper.exact)} mappings"
+              f"{', experiment override' if label_maps.override else ''})")
     except Exception as e:
         print(f"   [Main] FSM FAILED: {e}")
         traceback.print_exc()
         fsm = None
 
+    # Recover sessions from the FSM journal, then start a fresh writer
+    if JOURNAL_ENABLED:
+        try:
+            t0 = time.perf_counter()
+            # each worker journals its own shard (set a stable VOCALLAB_WORKER_ID to recover across restarts)
+            journal_dir = os.path.join(JOURNAL_DIR, WORKER_ID) if CLUSTER_BUS_URL else JOURNAL_DIR
+            recovered, segment = fsm_journal.recover(journal_dir, ttl=SESSION_RESUME_TTL)
+            journal = fsm_journal.Journal(journal_dir, segment=segment)
+            journal.start()
+            manager.journal = journal
+            restored = manager.restore_sessions(recovered)
+            journal.snapshot(manager.export_sessions())
+            elapsed = (time.perf_counter() - t0) * 1000
+            print(f"   [Main] Journal OK ✓ (restored {restored} sessions in {elapsed:.1f}ms)")
+        except Exception as e:
+            print(f"   [Main] Journal FAILED (continuing without it): {e}")
+            traceback.print_exc()
+            journal = None
+            manager.journal = None
+
+    # Join the cluster event bus (sharded mode)
+    if CLUSTER_BUS_URL:
+        try:
+            cluster = ClusterNode(create_bus(CLUSTER_BUS_URL), WORKER_ID,
+                                  deliver=_deliver_from_bus, on_control=_on_cluster_control,
+                                  local_stats=manager.get_local_stats, stats_interval=CLUSTER_STATS_INTERVAL)
+            await cluster.start()
+            manager.cluster = cluster
+            print(f"   [Main] Cluster OK ✓ (worker={WORKER_ID}, bus={CLUSTER_BUS_URL.split('@')[-1]})")
+        except Exception as e:
+            print(f"   [Main] Cluster FAILED (running as a single worker): {e}")
+            cluster = None
+            manager.cluster = None
+
     # Start heartbeat task
     heartbeat_task = asyncio.create_task(_heartbeat_loop())
+    label_map_task = asyncio.create_task(_label_map_watch_loop())
+    dashboard_tick_task = asyncio.create_task(_dashboard_tick_loop()) if DASHBOARD_TICK_HZ > 0 else None
+    watchdog = LoopWatchdog(interval=LOOP_LAG_INTERVAL, threshold=WATCHDOG_STALL_THRESHOLD,
+                            capacity=WATCHDOG_STALL_HISTORY, on_lag=metrics.observe_loop_lag, on_stall=_on_stall)
+    watchdog.start()
     print("   [Main] Heartbeat task started")
 
     print(f"""
@@ -279,21 +687,101 @@ async def lifespan(app: FastAPI):
     yield
 
     heartbeat_task.cancel()
+    label_map_task.cancel()
+    await watchdog.stop()
+    profiler.stop("shutdown")
+    if dashboard_tick_task:
+        dashboard_tick_task.cancel()
+    if cluster:
+        await cluster.close()
+    if journal:
+        journal.snapshot(manager.export_sessions())
+        journal.close()
+    await scheduler.close()
+    inference.shutdown()
     print("   [Main] Server shutting down")
+    log_pipeline.stop()
 
 
 async def _heartbeat_loop():
+    last_snapshot = time.time()
     while True:
         try:
             await asyncio.sleep(25)
             msg = {"type": "heartbeat", "timestamp": datetime.now(timezone.utc).isoformat(), "server_version": VERSION}
             await manager.broadcast_to_dashboards(msg)
+            manager.parked.evict_expired(manager.clock.time())
+            if journal and time.time() - last_snapshot >= JOURNAL_SNAPSHOT_INTERVAL:
+                journal.snapshot(manager.export_sessions())
+                last_snapshot = time.time()
         except asyncio.CancelledError:
             break
         except Exception:
             pass
 
 
+def _on_stall(stall: dict):
+    """Watchdog callback (on the loop, once the stall is over)."""
+    metrics.loop_stalls.inc()
+    where = stall["stack"][-1] if stall["stack"] else "stack not captured"
+    log_event(main_log, "watchdog.stall", "Event loop blocked for %.0fms at %s", stall["duration_ms"], where,
+              level=logging.WARNING)
+
+
+async def _dashboard_tick_loop():
+    """Emit one delta-encoded dashboard_batch per room per tick instead of a student_update per frame."""
+    interval = 1.0 / DASHBOARD_TICK_HZ
+    while True:
+        try:
+            await asyncio.sleep(interval)
+            for room_id, room in list(manager.rooms.items()):
+                batch = room.aggregator.flush() if room.aggregator else None
+                if batch and (room.dashboards or manager.cluster):
+                    await manager.publish_to_room(batch, room_id)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print(f"   [Main] Dashboard tick error: {e}")
+
+
+async def _deliver_from_bus(message: dict, room: Optional[str], coalesce_key: Optional[str]):
+    """Event bus → this worker's dashboards."""
+    kind = message.get("type")
+    if kind == "student_connected" and message.get("group"):
+        manager.remote_groups[message["student_id"]] = message["group"]
+    elif kind == "student_disconnected":
+        manager.remote_groups.pop(message.get("student_id"), None)
+    await manager.broadcast_to_dashboards(message, coalesce_key=coalesce_key, room=room)
+
+
+async def _on_cluster_control(msg: dict):
+    """Cluster-wide requests; the originating worker already handled its own part."""
+    if msg.get("origin") == WORKER_ID:
+        return
+    action = msg.get("action")
+    room_id = msg.get("room")
+    if action == "keyframe":
+        room = manager.rooms.get(room_id)
+        if room and room.aggregator and room.students:
+            await manager.publish_to_room(room.aggregator.keyframe(), room_id)
+    elif action == "reset":
+        await _reset_sessions(room_id)
+    elif action == "capture_profile":
+        await manager.revise_capture_profile(msg.get("imgsz"), msg.get("jpeg_quality"))
+
+
+async def _label_map_watch_loop():
+    """Poll the label map file; recompiles run in a worker thread and swap in atomically."""
+    while True:
+        try:
+            await asyncio.sleep(LABEL_MAP_CHECK_INTERVAL)
+            await asyncio.to_thread(label_maps.reload)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print(f"   [Main] Label map watch error: {e}")
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # FASTAPI APP
 # ═══════════════════════════════════════════════════════════════════════
@@ -321,14 +809,13 @@ async def log_requests(request, call_next):
     t0 = time.time()
     try:
         response = await call_next(request)
-        elapsed = round((time.time() - t0) * 1000, 1)
         if not request.url.path.startswith("/audio"):   # skip static file noise
-            print(f"   [HTTP] {request.method} {request.url.path} → {response.status_code}  ({elapsed}ms)")
+            log_event(http_log, "http.request", "%s %s → %d", request.method, request.url.path,
+                      response.status_code, ms=round((time.time() - t0) * 1000, 1))
         return response
     except Exception as exc:
-        elapsed = round((time.time() - t0) * 1000, 1)
-        print(f"   [HTTP] {request.method} {request.url.path} → 500 UNHANDLED ({elapsed}ms): {exc}")
-        traceback.print_exc()
+        log_event(http_log, "http.error", "%s %s → 500 UNHANDLED: %s", request.method, request.url.path, exc,
+                  level=logging.ERROR, exc_info=True, ms=round((time.time() - t0) * 1000, 1))
         return JSONResponse(status_code=500, content={"error": str(exc), "path": request.url.path})
 
 
@@ -358,7 +845,7 @@ async def root():
         "fsm_loaded": fsm is not None,
         "uptime": round(time.time() - server_stats["start_time"], 1),
         "demo_mode": DEMO_MODE,
-        "proxy_mode": PROXY_MODE,
+        "proxy_mode": label_maps.current.proxy_mode,
     }
 
 
@@ -369,8 +856,8 @@ async def health():
         "model_loaded": detector is not None and detector.model is not None,
         "fsm_loaded": fsm is not None,
         "fsm_state": fsm.get_full_state() if fsm else None,
-        "dashboard_clients": len(manager.dashboard_connections),
-        "student_clients": len(manager.student_connections),
+        "dashboard_clients": len(manager.sessions.dashboards),
+        "student_clients": len(manager.sessions),
         "server_stats": server_stats,
     }
 
@@ -396,37 +883,161 @@ async def detect_image(body: dict):
     b64 = body.get("image") or body.get("data") or body.get("base64", "")
     if not b64:
         raise HTTPException(400, "Missing 'image' field (base64)")
-    dets, w, h = detector.detect_base64(b64)
+    (dets, w, h), _ = await scheduler.submit("http:/detect", detector.detect_base64, b64, cost=len(b64))
     return {"detections": dets, "count": len(dets), "frame_width": w, "frame_height": h}
 
 
-@app.post("/reset")
-async def reset_experiment():
-    # Reset global reference FSM
-    if fsm:
-        fsm.reset()
-    # Reset all per-student FSM instances
-    for sid, student_fsm in list(manager.student_fsms.items()):
+@app.get("/label-map")
+async def label_map_info():
+    return label_maps.get_stats()
+
+
+@app.post("/label-map/reload")
+async def label_map_reload():
+    changed = await asyncio.to_thread(label_maps.reload, True)
+    return {"reloaded": changed, **label_maps.get_stats()}
+
+
+@app.get("/capture-profile")
+async def capture_profile_info():
+    return manager.capture_profile.to_dict()
+
+
+@app.post("/capture-profile")
+async def capture_profile_update(imgsz: Optional[int] = None, jpeg_quality: Optional[float] = None):
+    """Revise the upload size / JPEG quality mid-session; pushed to every connected student (all workers)."""
+    if imgsz is not None and not 128 <= imgsz <= 1920:
+        raise HTTPException(400, "imgsz must be between 128 and 1920")
+    if jpeg_quality is not None and not 0 < jpeg_quality <= 1:
+        raise HTTPException(400, "jpeg_quality must be in (0, 1]")
+    profile = await manager.revise_capture_profile(imgsz, jpeg_quality)
+    if manager.cluster:
+        await manager.cluster.publish_control("capture_profile", imgsz=imgsz, jpeg_quality=jpeg_quality)
+    return profile.to_dict()
+
+
+@app.get("/admin/stalls")
+async def event_loop_stalls():
+    """Recent event-loop stalls with the loop thread's stack captured while it was blocked."""
+    return watchdog.get_stats() if watchdog else {"stalls": 0, "recent": []}
+
+
+@app.get("/admin/profile")
+async def profile_info():
+    return profiler.get_stats()
+
+
+@app.post("/admin/profile")
+async def profile_start(mode: str = "sampling", frames: Optional[int] = None, seconds: Optional[float] = None):
+    """
+    Profile the next `frames` student frames or `seconds` seconds, whichever ends first
+    (`?mode=sampling&seconds=10`, `?mode=deterministic&frames=200`). Fetch the result
+    from /admin/profile/result once the window has finished.
+    """
+    if frames is None and seconds is None:
+        raise HTTPException(400, "give frames and/or seconds")
+    if frames is not None and not 1 <= frames <= PROFILE_MAX_FRAMES:
+        raise HTTPException(400, f"frames must be between 1 and {PROFILE_MAX_FRAMES}")
+    if seconds is not None and not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(400, f"seconds must be in (0, {PROFILE_MAX_SECONDS}]")
+    try:
+        profiler.start(mode, frames, seconds or PROFILE_MAX_SECONDS)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+    log_event(main_log, "profile.start", "Profiling %s", mode, frames=frames, seconds=seconds)
+    return profiler.get_stats()
+
+
+@app.delete("/admin/profile")
+async def profile_stop():
+    """End the running window early; its result is kept."""
+    profiler.stop()
+    return profiler.get_stats()
+
+
+@app.get("/admin/profile/result")
+async def profile_result(format: Optional[str] = None):
+    """
+    The last finished window: collapsed stacks (sampling; flamegraph.pl / speedscope),
+    or pstats (deterministic; `pstats.Stats(path)`, snakeviz) / a cumulative-time text report.
+    """
+    if profiler.active or (profiler.window and profiler.window.stop_reason and not profiler.window.finished):
+        raise HTTPException(409, "profiling window still running")
+    try:
+        body, media_type = profiler.render(format)
+    except LookupError as e:
+        raise HTTPException(404, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if media_type == "application/octet-stream":
+        return Response(body, media_type=media_type,
+                        headers={"Content-Disposition": 'attachment; filename="vocallab.pstats"'})
+    return PlainTextResponse(body, media_type=media_type)
+
+
+@app.get("/admin/logging")
+async def logging_info():
+    return log_pipeline.get_stats()
+
+
+@app.post("/admin/logging")
+async def logging_update(level: Optional[str] = None, logger: Optional[str] = None, event: Optional[str] = None,
+                         sample_every: int = 1, per_second: float = 0.0):
+    """
+    Change a logger's level at runtime (`?level=DEBUG&logger=engine.detector`; without a logger, all app loggers)
+    and/or an event's sampling rule (`?event=detector.frame&sample_every=1&per_second=0`).
+    """
+    if level is not None:
+        try:
+            log_pipeline.set_level(level, logger)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+    if event is not None:
+        if sample_every < 1 or per_second < 0:
+            raise HTTPException(400, "sample_every must be >= 1 and per_second >= 0")
+        log_pipeline.sampler.set_rule(event, sample_every, per_second)
+    return log_pipeline.get_stats()
+
+
+async def _reset_sessions(room_id: Optional[str]):
+    """
+    Reset this worker's sessions in one room (or all rooms when room_id is None) and
+    re-send `welcome` to the affected students. Returns (students_reset, reference FSM).
+    """
+    if room_id is None:
+        # Reset global reference FSM
+        if fsm:
+            fsm.reset()
+        targets = [(session.student_id, session.fsm) for session in manager.sessions]
+        rooms = list(manager.rooms.values())
+    else:
+        scoped = manager.rooms.get(room_id)
+        targets = [(session.student_id, session.fsm)
+                   for session in map(manager.sessions.get, list(scoped.students) if scoped else ()) if session]
+        rooms = [scoped] if scoped else []
+    # Reset the per-student FSM instances in scope
+    for sid, student_fsm in targets:
         if student_fsm:
             try:
                 student_fsm.reset()
             except Exception as e:
                 print(f"   [Main] Reset failed for {sid}: {e}")
-    server_stats["step_advances"] = 0
-    server_stats["safety_alerts"] = 0
-    num_students = len(manager.student_connections)
-    print(f"   [Main] Experiment reset (students={num_students}, dashboards={len(manager.dashboard_connections)})")
-    # Build a reference state from global FSM for dashboard/broadcast
-    ref_fsm = fsm or (next(iter(manager.student_fsms.values()), None))
-    try:
-        state = ref_fsm.get_full_state() if ref_fsm else {}
-        await manager.broadcast_to_dashboards({
-            "type": "experiment_reset",
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            **state,
-        })
-    except Exception as e:
-        print(f"   [Main] Reset broadcast to dashboards failed: {e}")
+    # Parked sessions resume into the reset state too
+    for parked in manager.parked.sessions():
+        if parked.fsm and (room_id is None or (parked.room or DEFAULT_ROOM) == room_id):
+            parked.fsm.reset()
+    if room_id is None:
+        server_stats["step_advances"] = 0
+        server_stats["safety_alerts"] = 0
+    for r in rooms:
+        r.reset_counters()
+        if r.aggregator:
+            r.aggregator.clear()
+    print(f"   [Main] Experiment reset (room={room_id or 'all'}, students={len(targets)}, "
+          f"dashboards={sum(len(r.dashboards) for r in rooms)})")
+    ref_fsm = fsm or (next((f for _, f in targets if f), None))
     try:
         welcome = {
             "type": "welcome",
@@ -438,40 +1049,202 @@ async def reset_experiment():
             "model_loaded": detector is not None and detector.model is not None,
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
-        await manager.broadcast_to_students(welcome)
+        await manager.broadcast_to_students(welcome, room=room_id)
     except Exception as e:
         print(f"   [Main] Reset broadcast to students failed: {e}")
-    return {"status": "reset", "students_reset": num_students, "state": ref_fsm.get_full_state() if ref_fsm else {}}
+    return len(targets), ref_fsm
+
+
+@app.post("/reset")
+async def reset_experiment(room: Optional[str] = None):
+    """Reset one room (`?room=<id>`) or, without a room, every session — on every worker in sharded mode."""
+    room_id = clean_room_id(room) if room is not None else None
+    num_students, ref_fsm = await _reset_sessions(room_id)
+    if manager.cluster:
+        await manager.cluster.publish_control("reset", room=room_id)
+    # Build a reference state from global FSM for dashboard/broadcast
+    try:
+        state = ref_fsm.get_full_state() if ref_fsm else {}
+        await manager.publish_to_room({
+            "type": "experiment_reset",
+            "room": room_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            **state,
+        }, room_id)
+    except Exception as e:
+        print(f"   [Main] Reset broadcast to dashboards failed: {e}")
+    return {"status": "reset", "room": room_id, "students_reset": num_students, "state": ref_fsm.get_full_state() if ref_fsm else {}}
 
 
 @app.get("/stats")
-async def server_statistics():
-    return {
+async def server_statistics(students: bool = False, dashboards: bool = False, rooms: bool = False,
+                            offset: int = 0, limit: int = 50):
+    """
+    Server-wide counters (kept incrementally, no per-connection or per-room scan).
+    Per-student, per-dashboard and per-room detail is opt-in and paginated:
+    `?students=true&dashboards=true&rooms=true&offset=0&limit=50` (offset / limit apply to each list).
+    """
+    if offset < 0 or not 1 <= limit <= 500:
+        raise HTTPException(400, "offset must be >= 0 and limit between 1 and 500")
+    stats = {
         **server_stats,
         "uptime": round(time.time() - server_stats["start_time"], 1),
-        "students_connected": len(manager.student_connections),
-        "dashboards_connected": len(manager.dashboard_connections),
+        "students_connected": len(manager.sessions),
+        "dashboards_connected": len(manager.sessions.dashboards),
+        "rooms_open": len(manager.rooms),
+        "sessions": manager.sessions.get_stats(),
         "detector": detector.get_stats() if detector else None,
         "fsm": fsm.get_stats() if fsm else None,
-        "students": manager.get_all_student_snapshots(),
+        "parked_sessions": manager.parked.get_stats(),
+        "cluster": cluster.aggregate() if cluster else None,
+        "inference": inference.get_stats() if inference else None,
+        "scheduler": scheduler.get_stats() if scheduler else None,
+        "pacing": manager.pacer.get_stats(),
+        "admission": manager.admission.get_stats(len(manager.sessions)),
+        "capture_profile": manager.capture_profile.to_dict(),
+        "journal": journal.get_stats() if journal else None,
+        "safety": manager.sessions.safety_stats(),
+    }
+    if students:
+        page = manager.get_student_page(offset, limit)
+        if scheduler:
+            for snapshot in page:
+                snapshot["scheduler"] = scheduler.session_stats(snapshot["student_id"])
+        stats["students"] = {"offset": offset, "limit": limit, "total": len(manager.sessions), "items": page}
+    if dashboards:
+        stats["dashboards"] = {"offset": offset, "limit": limit, "total": len(manager.sessions.dashboards),
+                               "items": manager.get_dashboard_page(offset, limit)}
+    if rooms:
+        stats["rooms"] = {"offset": offset, "limit": limit, "total": len(manager.rooms),
+                          "items": manager.get_room_page(offset, limit)}
+    return stats
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text format. Counters and histograms are read as-is; gauges are sampled now."""
+    metrics.set_gauges({
+        "vocallab_students_connected": len(manager.sessions),
+        "vocallab_dashboards_connected": len(manager.sessions.dashboards),
+        "vocallab_parked_sessions": len(manager.parked),
+        "vocallab_rooms": len(manager.rooms),
+        "vocallab_scheduler_queued": scheduler.queued if scheduler else 0,
+        "vocallab_inference_in_flight": inference.in_flight if inference else 0,
+        "vocallab_admission_queue_length": manager.admission.queue_length,
+        "vocallab_dashboard_queue_depth": sum(client.depth for client in list(manager.sessions.dashboards)),
+        "vocallab_log_queue_depth": log_pipeline.queue.qsize() if log_pipeline else 0,
+    })
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/rooms")
+async def list_rooms():
+    return {"rooms": [room.get_stats() for room in manager.rooms.values()]}
+
+
+@app.get("/rooms/{room_id}")
+async def room_statistics(room_id: str):
+    room = manager.rooms.get(clean_room_id(room_id))
+    if room is None:
+        raise HTTPException(status_code=404, detail=f"No active room '{room_id}'")
+    return {
+        **room.get_stats(),
+        "students_detail": [manager.get_student_snapshot(sid) for sid in room.students],
     }
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # WEBSOCKET — STUDENT
 # ═══════════════════════════════════════════════════════════════════════
+async def _wait_for_admission(websocket: WebSocket, wire_format: str) -> Tuple[bool, Optional[str]]:
+    """
+    Hold an accepted-but-queued student until admission control has room.
+    Returns (admitted, language requested while waiting); admitted=False if the client left.
+    """
+    async def announce(position: int):
+        await codec.send(websocket, {
+            "type": "admission",
+            "status": "queued",
+            "position": position,
+            "capacity": manager.admission.capacity(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }, wire_format)
+
+    language = None
+    waiter = asyncio.create_task(manager.admission.wait_for_slot(lambda: len(manager.sessions), announce))
+    try:
+        while True:
+            receiver = asyncio.create_task(websocket.receive())
+            done, _ = await asyncio.wait({waiter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if waiter in done:
+                receiver.cancel()
+                waiter.result()
+                return True, language
+            frame = receiver.result()
+            if frame["type"] == "websocket.disconnect":
+                return False, None
+            try:
+                msg = codec.decode(frame["text"] if frame.get("text") is not None else frame.get("bytes"))
+            except (ValueError, TypeError):
+                continue
+            # Frames are ignored while queued; a language choice is kept for the session
+            if isinstance(msg, dict) and msg.get("type") == "language_change" and msg.get("language") in ("en", "hi", "te", "ta"):
+                language = msg["language"]
+    finally:
+        waiter.cancel()
+
+
 @app.websocket("/ws/student")
 async def ws_student(websocket: WebSocket):
     student_id = None
+    group = None
+    room_id = DEFAULT_ROOM
     language = "en"
-    last_frame_time = 0.0
-    min_frame_interval = 1.0 / MAX_FPS  # based on MAX_FPS
 
     try:
-        # Connect student and get isolated FSM instance
-        student_id = await manager.connect_student(websocket)
-        student_fsm = manager.student_fsms.get(student_id)
-        student_stats = manager.student_stats.get(student_id, {})
+        resume_token = websocket.query_params.get("resume_token")
+        group = (websocket.query_params.get("group") or "").strip()[:64] or None   # lab bench, for dashboard topics
+
+        # Admission control: does one more student fit in the measured inference capacity?
+        admission, admission_reason = manager.admission.decide(len(manager.sessions),
+                                                               resuming=resume_token in manager.parked)
+        queued_language = None
+        if admission in (REJECT, QUEUE):
+            wire_format, subprotocol = codec.negotiate(websocket)
+            await websocket.accept(subprotocol=subprotocol)
+            if admission == REJECT:
+                log_event(ws_log, "ws.rejected", "Student rejected: server at capacity (%s)", admission_reason,
+                          level=logging.WARNING)
+                await codec.send(websocket, {
+                    "type": "server_at_capacity",
+                    "reason": admission_reason,
+                    "capacity": manager.admission.capacity(),
+                    "retry_after": ADMISSION_RETRY_AFTER,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                }, wire_format)
+                await websocket.close(code=1013)     # 1013 = try again later
+                return
+            admitted, queued_language = await _wait_for_admission(websocket, wire_format)
+            if not admitted:
+                return
+            admission_reason = "from queue"
+
+        # Connect student and get isolated FSM instance (or resume a parked one)
+        session, resumed = await manager.connect_student(websocket, resume_token=resume_token, group=group,
+                                                            room=clean_room_id(websocket.query_params.get("room")),
+                                                            accepted=admission == QUEUE)
+        student_id = session.student_id
+        if queued_language:
+            session.language = queued_language
+        if admission == DEGRADE:
+            manager.pacer.degrade(student_id, ADMISSION_DEGRADE_FACTOR)
+        room_id = session.room   # a resumed session keeps its room
+        room = manager.rooms[room_id]
+        student_fsm = session.fsm
+        language = session.language
+        # Optional columnar detections: per-connection label dictionary, sent in full with welcome
+        detections_format = columnar.negotiate(websocket)
+        labels = columnar.LabelDictionary(sorted(get_all_lab_labels())) if detections_format == columnar.COLUMNAR else None
 
         # Send welcome with student-specific state
         step_names = [s["name"] for s in student_fsm.config["steps"]] if student_fsm else []
@@ -482,177 +1255,312 @@ async def ws_student(websocket: WebSocket):
             "total_steps": student_fsm.total_steps if student_fsm else 0,
             "current_step": student_fsm.current_step_index if student_fsm else 0,
             "step_names": step_names,
-            "step_info": student_fsm._build_step_info("en") if student_fsm else None,
+            "step_info": student_fsm._build_step_info(language) if student_fsm else None,
+            "student_id": student_id,
+            "language": language,
+            "resume_token": session.resume_token,
+            "resumed": resumed,
+            "group": group,
+            "room": room_id,
             "model_loaded": detector is not None and detector.model is not None,
             "demo_mode": DEMO_MODE,
-            "proxy_mode": PROXY_MODE,
+            "proxy_mode": label_maps.current.proxy_mode,
+            "detections_format": detections_format,
+            "capture_profile": manager.capture_profile.to_dict(),
+            "capture_interval_ms": manager.pacer.current(student_id, student_fsm.sampling_hint() if student_fsm else None),
+            "admission": {"status": "degraded" if admission == DEGRADE else "admitted", "reason": admission_reason},
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
-        await websocket.send_text(json.dumps(welcome))
-        print(f"   [Main] Sent welcome to {student_id} (exp={welcome['experiment_name']}, steps={welcome['total_steps']})")
+        if labels is not None:
+            welcome["label_dictionary"] = {"offset": 0, "labels": list(labels.labels)}
+        wire_format = session.wire_format
+        await codec.send(websocket, welcome, wire_format)
+        log_event(ws_log, "ws.welcome", "Sent welcome", student=student_id, exp=welcome["experiment_name"],
+                  steps=welcome["total_steps"], resumed=resumed)
 
         # Notify dashboards
-        await manager.broadcast_to_dashboards({
+        await manager.publish_to_room({
             "type": "student_connected",
             "student_id": student_id,
-            "student_count": len(manager.student_connections),
+            "group": group,
+            "room": room_id,
+            "resumed": resumed,
+            "student_count": len(room.students),
             "timestamp": datetime.now(timezone.utc).isoformat(),
-        })
+        }, room_id)
 
-        while True:
-            try:
-                raw = await websocket.receive_text()
-            except Exception:
-                break  # connection lost — exit loop cleanly
-            try:
-                msg = json.loads(raw)
-            except (json.JSONDecodeError, TypeError):
-                continue
-            if not isinstance(msg, dict):
-                continue
-            msg_type = msg.get("type", "")
+        # Three stages (engine/pipeline.py): the receiver never waits for inference,
+        # the processor always takes the newest frame, the sender owns the socket writes
+        frames = LatestSlot()
+        outbox: asyncio.Queue = asyncio.Queue(STUDENT_SEND_QUEUE)
+        frame_latency = metrics.frame_latency.labels(room_id)
 
+        def reply(message: dict):
+            """Queue an immediate answer (pong, language_updated); dropped if the client stopped reading."""
             try:
-                # ── LANGUAGE CHANGE ─────────────────────────
-                if msg_type == "language_change":
-                    language = msg.get("language", "en")
-                    if not isinstance(language, str) or language not in ("en", "hi", "te", "ta"):
-                        language = "en"
-                    print(f"   [WS] Lang → {language} for {student_id}")
-
-                    audio_url = None
-                    if student_fsm:
-                        student_fsm.intro_played_for_step = -1
-                        info = student_fsm._build_step_info(language)
-                        step = student_fsm.get_current_step()
-                        if step and step.get("audio_intro"):
-                            audio_url = f"/audio/{language}/{step['audio_intro']}.mp3"
-
-                        await websocket.send_text(json.dumps({
-                            "type": "language_updated",
-                            "student_id": student_id,
-                            "language": language,
-                            "step_info": info,
-                            "audio_url": audio_url
-                        }))
+                outbox.put_nowait(message)
+            except asyncio.QueueFull:
+                server_stats["replies_dropped"] += 1
+
+        def set_language(lang: str):
+            nonlocal language
+            language = lang
+            session.language = lang
+            manager.record(fsm_journal.EV_LANGUAGE, student_id, value=lang)
+
+        async def receive_loop():
+            last_frame_time = 0.0
+            while True:
+                try:
+                    frame = await websocket.receive()
+                except Exception:
+                    return  # connection lost — exit loop cleanly
+                if frame["type"] == "websocket.disconnect":
+                    return
+                try:
+                    msg = codec.decode(frame["text"] if frame.get("text") is not None else frame.get("bytes"))
+                except (ValueError, TypeError):
                     continue
-
-                # ── PING ────────────────────────────────────
-                if msg_type == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong", "timestamp": datetime.now(timezone.utc).isoformat()}))
+                if not isinstance(msg, dict):
                     continue
-
-                # ── FRAME ───────────────────────────────────
-                if msg_type == "frame":
-                    # Rate limit based on MAX_FPS
-                    now = time.time()
-                    if now - last_frame_time < min_frame_interval:
+                msg_type = msg.get("type", "")
+
+                try:
+                    # ── LANGUAGE CHANGE ─────────────────────────
+                    if msg_type == "language_change":
+                        lang = msg.get("language", "en")
+                        if not isinstance(lang, str) or lang not in ("en", "hi", "te", "ta"):
+                            lang = "en"
+                        set_language(lang)
+                        log_event(ws_log, "ws.language", "Language changed", student=student_id, lang=lang)
+
+                        audio_url = None
+                        if student_fsm:
+                            student_fsm.intro_played_for_step = -1
+                            info = student_fsm._build_step_info(lang)
+                            step = student_fsm.get_current_step()
+                            if step and step.get("audio_intro"):
+                                audio_url = f"/audio/{lang}/{step['audio_intro']}.mp3"
+
+                            reply({
+                                "type": "language_updated",
+                                "student_id": student_id,
+                                "language": lang,
+                                "step_info": info,
+                                "audio_url": audio_url
+                            })
                         continue
-                    last_frame_time = now
 
-                    base64_data = msg.get("data", "")
-                    if not isinstance(base64_data, str) or not base64_data:
+                    # ── PING ────────────────────────────────────
+                    if msg_type == "ping":
+                        reply({"type": "pong", "timestamp": datetime.now(timezone.utc).isoformat()})
                         continue
 
-                    frame_lang = msg.get("language", language)
-                    if isinstance(frame_lang, str) and frame_lang != language:
-                        language = frame_lang
-
-                    server_stats["frames_processed"] += 1
-                    student_stats["frames_processed"] = student_stats.get("frames_processed", 0) + 1
-
-                    # Detect objects
-                    detections = []
-                    frame_width, frame_height = 640, 480
-                    try:
-                        if detector and detector.model:
-                            detections, frame_width, frame_height = detector.detect_base64(base64_data)
-                            server_stats["total_detections"] += len(detections)
-                            student_stats["detections_count"] = student_stats.get("detections_count", 0) + len(detections)
-                    except Exception as e:
-                        print(f"   [WS] Detection error for {student_id}: {e}")
-
-                    # Process detections through student's FSM
-                    fsm_result = {}
-                    audio_url = None
-                    try:
-                        if student_fsm:
-                            fsm_result = student_fsm.process_detections(detections, language)
-
-                            audio_key = fsm_result.get("audio_to_play")
-                            if audio_key:
-                                audio_url = f"/audio/{language}/{audio_key}.mp3"
-
-                            if fsm_result.get("step_advance"):
-                                server_stats["step_advances"] += 1
-                                student_stats["steps_completed"] = student_stats.get("steps_completed", 0) + 1
-                                print(f"   [WS] Step advance for {student_id} → step {student_fsm.current_step_index}")
-                                next_step = student_fsm.get_current_step()
-                                if next_step and next_step.get("audio_intro") and not audio_url:
-                                    audio_url = f"/audio/{language}/{next_step['audio_intro']}.mp3"
-                                    student_fsm.intro_played_for_step = student_fsm.current_step_index
-
-                            if fsm_result.get("safety_alert"):
-                                server_stats["safety_alerts"] += 1
-                                student_stats["safety_alerts_count"] = student_stats.get("safety_alerts_count", 0) + 1
-                                print(f"   [WS] Safety alert for {student_id}")
-                    except Exception as e:
-                        print(f"   [WS] FSM error for {student_id}: {e}")
-
-                    # Build response
-                    step_info = fsm_result.get("step_info") or (student_fsm._build_step_info(language) if student_fsm else {})
-                    ts = datetime.now(timezone.utc).isoformat()
-                    response = {
-                        "type": "detection_result",
-                        "student_id": student_id,
-                        "detections": detections,
-                        "count": len(detections),
-                        "frame_width": frame_width,
-                        "frame_height": frame_height,
-                        "step_info": step_info,
-                        "safety_alert": fsm_result.get("safety_alert"),
-                        "audio_url": audio_url,
-                        "step_advance": fsm_result.get("step_advance", False),
-                        "experiment_complete": fsm_result.get("experiment_complete", False),
-                        "timestamp": ts,
-                    }
-                    await websocket.send_text(json.dumps(response))
-
-                    # Broadcast to dashboards with rich per-student metrics
-                    dashboard_msg = {
-                        "type": "student_update",
-                        "student_id": student_id,
-                        "detections": detections,
-                        "count": len(detections),
-                        "step_info": step_info,
-                        "safety_alert": fsm_result.get("safety_alert"),
-                        "step_advance": fsm_result.get("step_advance", False),
-                        "experiment_complete": fsm_result.get("experiment_complete", False),
-                        "student_stats": manager.get_student_snapshot(student_id),
-                        "timestamp": ts,
-                    }
-                    await manager.broadcast_to_dashboards(dashboard_msg)
+                    # ── FRAME → newest-frame slot ───────────────
+                    if msg_type == "frame":
+                        # Rate limit: MAX_FPS, or the advised capture interval if the client ignores it
+                        now = time.time()
+                        if not manager.pacer.accepts(student_id, now - last_frame_time):
+                            metrics.frames_dropped["pacing"].inc()
+                            continue
+                        last_frame_time = now
+
+                        base64_data = msg.get("data", "")
+                        if not isinstance(base64_data, str) or not base64_data:
+                            metrics.frames_dropped["invalid"].inc()
+                            continue
+
+                        frame_lang = msg.get("language", language)
+                        if isinstance(frame_lang, str) and frame_lang != language:
+                            set_language(frame_lang)
+
+                        if frames.pending:
+                            server_stats["frames_superseded"] += 1
+                            session.frames_superseded += 1
+                            metrics.frames_dropped["superseded"].inc()
+                        frames.put((base64_data, now))
+                        metrics.frames_admitted.inc()
+                except Exception as e:
+                    log_event(ws_log, "ws.error", "Error processing message: %s", e, level=logging.ERROR,
+                              student=student_id)
+
+        async def process_loop():
+            while True:
+                base64_data, received_at = await frames.get()
+                try:
+                    await process_frame(base64_data, received_at)
+                except Exception as e:
+                    log_event(ws_log, "ws.error", "Error processing frame: %s", e, level=logging.ERROR,
+                              student=student_id)
+                if profiler.active:
+                    profiler.frame_done()
+
+        async def process_frame(base64_data: str, received_at: float):
+            lang = language
+            server_stats["frames_processed"] += 1
+            room.frames_processed += 1
+            session.frames_processed += 1
+
+            # Detect objects (scheduled onto the inference thread; the receiver keeps reading meanwhile).
+            # A dangerous-pair label in the last frame puts this frame ahead of routine ones.
+            detections = []
+            frame_width, frame_height = 640, 480
+            try:
+                if detector and detector.model:
+                    manager.pacer.backlog = scheduler.queued            # frames already waiting for the model
+                    (detections, frame_width, frame_height), latency = await scheduler.submit(
+                        student_id, profiler.wrap(detector.detect_base64), base64_data, cost=len(base64_data),
+                        priority=bool(student_fsm and student_fsm.danger_in_view))
+                    manager.pacer.observe(student_id, latency)
+                    metrics.frames_inferred.inc()
+                    metrics.count_detections(detections)
+                    server_stats["total_detections"] += len(detections)
+                    room.total_detections += len(detections)
+                    session.detections_count += len(detections)
+            except Exception as e:
+                log_event(ws_log, "ws.error", "Detection error: %s", e, level=logging.ERROR, student=student_id)
 
-            except WebSocketDisconnect:
-                raise  # re-raise so outer handler runs cleanup
+            # Process detections through student's FSM
+            fsm_result = {}
+            audio_url = None
+            try:
+                if student_fsm:
+                    t0 = time.perf_counter()
+                    fsm_result = student_fsm.process_detections(detections, lang)
+                    metrics.stage["fsm"].observe(time.perf_counter() - t0)
+                    manager.sessions.fold_safety(session)
+
+                    audio_key = fsm_result.get("audio_to_play")
+                    if audio_key:
+                        audio_url = f"/audio/{lang}/{audio_key}.mp3"
+
+                    if fsm_result.get("step_advance"):
+                        server_stats["step_advances"] += 1
+                        room.step_advances += 1
+                        session.steps_completed += 1
+                        metrics.step_advances.inc()
+                        log_event(ws_log, "ws.step_advance", "Step advance", student=student_id,
+                                  step=student_fsm.current_step_index, room=room_id)
+                        next_step = student_fsm.get_current_step()
+                        if next_step and next_step.get("audio_intro") and not audio_url:
+                            audio_url = f"/audio/{lang}/{next_step['audio_intro']}.mp3"
+                            student_fsm.intro_played_for_step = student_fsm.current_step_index
+
+                    if fsm_result.get("safety_alert"):
+                        server_stats["safety_alerts"] += 1
+                        room.safety_alerts += 1
+                        session.safety_alerts_count += 1
+                        metrics.safety_alerts.labels(fsm_result["safety_alert"].get("type", "unknown")).inc()
+                        log_event(ws_log, "ws.safety_alert", "Safety alert", student=student_id,
+                                  kind=fsm_result["safety_alert"].get("type"), room=room_id)
             except Exception as e:
-                print(f"   [WS] Error processing message for {student_id}: {e}")
+                log_event(ws_log, "ws.error", "FSM error: %s", e, level=logging.ERROR, student=student_id)
+
+            # Build response
+            step_info = fsm_result.get("step_info") or (student_fsm._build_step_info(lang) if student_fsm else {})
+            ts = datetime.now(timezone.utc).isoformat()
+            response = {
+                "type": "detection_result",
+                "student_id": student_id,
+                "detections": detections,
+                "count": len(detections),
+                "frame_width": frame_width,
+                "frame_height": frame_height,
+                "step_info": step_info,
+                "safety_alert": fsm_result.get("safety_alert"),
+                "audio_url": audio_url,
+                "step_advance": fsm_result.get("step_advance", False),
+                "experiment_complete": fsm_result.get("experiment_complete", False),
+                "frame_age_ms": round((time.time() - received_at) * 1000),
+                "timestamp": ts,
+            }
+            # Back-pressure: a client that stops reading holds up only its own processor
+            await outbox.put(columnar.pack_message(response, labels) if labels is not None else response)
+            frame_latency.observe(time.time() - received_at)
+
+            # Load or FSM sampling hint changed → tell the client to capture faster / slower
+            hint = fsm_result.get("sampling_hint")
+            capture_interval_ms = manager.pacer.advise(student_id, hint)
+            if capture_interval_ms is not None:
+                mode = hint["mode"] if hint else "normal"
+                await outbox.put({
+                    "type": "frame_pacing",
+                    "capture_interval_ms": capture_interval_ms,
+                    "reason": "load" if mode == "normal" else mode,
+                    "active_students": manager.pacer.active_students(),
+                    "timestamp": ts,
+                })
+
+            # Dashboards get this frame in the next batched tick
+            if room.aggregator:
+                room.aggregator.update(
+                    student_id,
+                    detections=detections,
+                    count=len(detections),
+                    step_info=step_info,
+                    safety_alert=fsm_result.get("safety_alert"),
+                    step_advance=fsm_result.get("step_advance", False),
+                    experiment_complete=fsm_result.get("experiment_complete", False),
+                )
+                return
+
+            # Broadcast to dashboards with rich per-student metrics
+            dashboard_msg = {
+                "type": "student_update",
+                "student_id": student_id,
+                "detections": detections,
+                "count": len(detections),
+                "step_info": step_info,
+                "safety_alert": fsm_result.get("safety_alert"),
+                "step_advance": fsm_result.get("step_advance", False),
+                "experiment_complete": fsm_result.get("experiment_complete", False),
+                "student_stats": manager.get_student_snapshot(student_id),
+                "timestamp": ts,
+            }
+            # Plain frame updates for a student may be coalesced; alerts and advances never are
+            routine = not (dashboard_msg["safety_alert"] or dashboard_msg["step_advance"] or dashboard_msg["experiment_complete"])
+            await manager.publish_to_room(dashboard_msg, room_id,
+                                          coalesce_key=f"student_update:{student_id}" if routine else None)
+
+        async def send_loop():
+            send_seconds = metrics.stage["send"]
+            while True:
+                message = await outbox.get()
+                t0 = time.perf_counter()
+                await codec.send(websocket, message, wire_format)
+                send_seconds.observe(time.perf_counter() - t0)
+
+        # The connection ends when any stage ends: disconnect (receiver) or a failed send (sender)
+        stages = [asyncio.create_task(receive_loop()), asyncio.create_task(process_loop()),
+                  asyncio.create_task(send_loop())]
+        try:
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in stages:
+                task.cancel()
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
 
     except WebSocketDisconnect:
-        print(f"   [Main] Student {student_id} disconnected normally")
+        log_event(ws_log, "ws.disconnect", "Student disconnected normally", student=student_id)
     except Exception as e:
-        print(f"   [Main] Student {student_id} WS error: {e}")
+        log_event(ws_log, "ws.error", "Student WS error: %s", e, level=logging.WARNING, student=student_id)
         traceback.print_exc()
     finally:
         if student_id:
             manager.disconnect_student(student_id)
+            if scheduler:
+                scheduler.forget(student_id)
             try:
-                await manager.broadcast_to_dashboards({
+                await manager.publish_to_room({
                     "type": "student_disconnected",
                     "student_id": student_id,
-                    "student_count": len(manager.student_connections),
+                    "group": group,
+                    "room": room_id,
+                    "student_count": len(manager.rooms[room_id].students) if room_id in manager.rooms else 0,
                     "timestamp": datetime.now(timezone.utc).isoformat(),
-                })
+                }, room_id)
             except Exception:
                 pass  # don't crash cleanup on broadcast failure
 
@@ -662,23 +1570,31 @@ async def ws_student(websocket: WebSocket):
 # ═══════════════════════════════════════════════════════════════════════
 @app.websocket("/ws/dashboard")
 async def ws_dashboard(websocket: WebSocket):
-    await manager.connect_dashboard(websocket)
+    room_id = clean_room_id(websocket.query_params.get("room"))
+    client = await manager.connect_dashboard(websocket, room=room_id)
+    room = manager.rooms[room_id]
     try:
         # Send full state immediately
-        init = {"type": "experiment_loaded", "timestamp": datetime.now(timezone.utc).isoformat()}
+        init = {"type": "experiment_loaded", "room": room_id, "timestamp": datetime.now(timezone.utc).isoformat()}
         if fsm:
             init.update(fsm.get_full_state())
-        await websocket.send_text(json.dumps(init))
-        print(f"   [Main] Dashboard init sent (exp={init.get('experiment_name', '?')})")
+        manager.send_to_dashboard(client, init)
+        if room.aggregator:
+            manager.send_to_dashboard(client, room.aggregator.keyframe(), full_dictionary=True)
+        if manager.cluster:
+            await manager.cluster.publish_control("keyframe", room=room_id)   # students on other workers
+        log_event(ws_log, "ws.welcome", "Dashboard init sent", exp=init.get("experiment_name", "?"))
 
         while True:
             try:
-                raw = await websocket.receive_text()
+                frame = await websocket.receive()
             except Exception:
                 break
+            if frame["type"] == "websocket.disconnect":
+                break
             try:
-                msg = json.loads(raw)
-            except (json.JSONDecodeError, TypeError):
+                msg = codec.decode(frame["text"] if frame.get("text") is not None else frame.get("bytes"))
+            except (ValueError, TypeError):
                 continue
             if not isinstance(msg, dict):
                 continue
@@ -686,23 +1602,41 @@ async def ws_dashboard(websocket: WebSocket):
 
             try:
                 if msg_type == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong", "timestamp": datetime.now(timezone.utc).isoformat()}))
+                    manager.send_to_dashboard(client, {"type": "pong", "timestamp": datetime.now(timezone.utc).isoformat()})
                 elif msg_type == "request_state":
                     state = {"type": "experiment_loaded", "timestamp": datetime.now(timezone.utc).isoformat()}
                     if fsm:
                         state.update(fsm.get_full_state())
-                    await websocket.send_text(json.dumps(state))
+                    manager.send_to_dashboard(client, state)
+                    if room.aggregator:
+                        manager.send_to_dashboard(client, room.aggregator.keyframe(), full_dictionary=True)
+                    if manager.cluster:
+                        await manager.cluster.publish_control("keyframe", room=room_id)
+                elif msg_type == "subscribe":
+                    # Topic subscription: students / groups + detail level; a keyframe re-syncs the view
+                    try:
+                        subscription = Subscription.from_message(msg)
+                    except ValueError as e:
+                        manager.send_to_dashboard(client, {"type": "error", "message": str(e)})
+                        continue
+                    manager.subscribe_dashboard(client, subscription)
+                    manager.send_to_dashboard(client, {"type": "subscribed", **subscription.describe(),
+                                                          "timestamp": datetime.now(timezone.utc).isoformat()})
+                    if room.aggregator:
+                        manager.send_to_dashboard(client, room.aggregator.keyframe(), full_dictionary=True)
+                    if manager.cluster:
+                        await manager.cluster.publish_control("keyframe", room=room_id)
             except WebSocketDisconnect:
                 raise
             except Exception as e:
-                print(f"   [WS] Dashboard message error: {e}")
+                log_event(ws_log, "ws.error", "Dashboard message error: %s", e, level=logging.WARNING)
 
     except WebSocketDisconnect:
-        print("   [Main] Dashboard disconnected normally")
+        log_event(ws_log, "ws.disconnect", "Dashboard disconnected normally")
     except Exception as e:
-        print(f"   [Main] Dashboard WS error: {e}")
+        log_event(ws_log, "ws.error", "Dashboard WS error: %s", e, level=logging.WARNING)
     finally:
-        manager.disconnect_dashboard(websocket)
+        manager.disconnect_dashboard(client)
 
 
 # ═══════════════════════════════════════════════════════════════════════
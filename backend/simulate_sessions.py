@@ -0,0 +1,150 @@
+# backend/simulate_sessions.py
+"""
+Drives thousands of virtual student sessions through ExperimentFSM on a
+VirtualClock with synthetic detection streams — no camera, no model, no
+sleeping. Runs as fast as the CPU allows and reports pure FSM throughput,
+so regressions in the per-frame path show up as a lower frames/s number.
+
+Usage:
+    python simulate_sessions.py --sessions 2000 --minutes 30 --fps 2
+    python simulate_sessions.py --sessions 500 --demo --seed 7
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import contextlib
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    sys.path.insert(0, _HERE)
+
+from engine.clock import VirtualClock
+from engine.fsm import ExperimentFSM
+
+LANGS = ["en", "hi", "te", "ta"]
+
+
+class SyntheticStudent:
+    """
+    Produces one frame of detections per call, loosely imitating a student:
+    brings the required objects into view, holds them, removes them when the
+    FSM asks (transition), and now and then moves a hand towards a beaker.
+    """
+
+    def __init__(self, rng: random.Random, frame_w: int = 640, frame_h: int = 480):
+        self.rng = rng
+        self.w = frame_w
+        self.h = frame_h
+        self.p_present = rng.uniform(0.5, 0.95)   # how reliably objects stay in view
+        self.p_remove = rng.uniform(0.6, 0.95)    # how quickly objects are removed on transition
+        self.p_hand = rng.uniform(0.0, 0.3)       # how often a hand wanders into frame
+        self.hand = None                          # [x, y, vx, vy]
+        self.language = rng.choice(LANGS)
+
+    def _box(self, label: str, cx: float, cy: float, size: float = 80) -> dict:
+        half = size / 2
+        return {
+            "label": label,
+            "confidence": round(self.rng.uniform(0.4, 0.95), 3),
+            "bbox": [int(cx - half), int(cy - half), int(cx + half), int(cy + half)],
+            "center": [round(cx, 1), round(cy, 1)],
+        }
+
+    def next_frame(self, fsm: ExperimentFSM, dt: float) -> list:
+        rng = self.rng
+        step = fsm.get_current_step() or {}
+        required = step.get("required_objects", [])
+        keep = rng.random() < (1 - self.p_remove if fsm.in_transition else self.p_present)
+
+        dets = []
+        if keep:
+            for i, label in enumerate(required):
+                dets.append(self._box(label, self.w * (0.3 + 0.2 * i) + rng.gauss(0, 4), self.h * 0.6 + rng.gauss(0, 4)))
+
+        # hand drifting across the bench
+        if self.hand is None and rng.random() < self.p_hand:
+            self.hand = [rng.uniform(0, self.w), rng.uniform(0, self.h), rng.uniform(-250, 250), rng.uniform(-150, 150)]
+        if self.hand is not None:
+            x, y, vx, vy = self.hand
+            x, y = x + vx * dt, y + vy * dt
+            if not (0 <= x <= self.w and 0 <= y <= self.h):
+                self.hand = None
+            else:
+                self.hand = [x, y, vx, vy]
+                dets.append(self._box("hand", x, y, 60))
+
+        # random clutter
+        if rng.random() < 0.2:
+            dets.append(self._box(rng.choice(["lab_manual", "stopwatch", "spatula"]), rng.uniform(0, self.w), rng.uniform(0, self.h)))
+        return dets
+
+
+def run(sessions: int, minutes: float, fps: float, demo: bool, seed: int, verbose: bool) -> dict:
+    rng = random.Random(seed)
+    clock = VirtualClock(start=1_700_000_000.0)
+    dt = 1.0 / fps
+    ticks = int(minutes * 60 * fps)
+
+    with open(os.devnull, "w") as devnull, \
+            (contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)):
+        fsms = [ExperimentFSM(demo_mode=demo, demo_timeout=3, clock=clock) for _ in range(sessions)]
+        students = [SyntheticStudent(random.Random(rng.random())) for _ in range(sessions)]
+
+        frames = advances = alerts = completed = 0
+        t0 = time.perf_counter()
+        for _ in range(ticks):
+            clock.advance(dt)
+            for fsm, student in zip(fsms, students):
+                if fsm.completed:
+                    continue
+                result = fsm.process_detections(student.next_frame(fsm, dt), student.language)
+                frames += 1
+                if result["step_advance"]:
+                    advances += 1
+                if result["safety_alert"]:
+                    alerts += 1
+                if result["experiment_complete"]:
+                    completed += 1
+        wall = time.perf_counter() - t0
+
+    return {
+        "sessions": sessions,
+        "virtual_seconds": ticks * dt,
+        "wall_seconds": wall,
+        "frames": frames,
+        "frames_per_second": frames / wall if wall > 0 else 0.0,
+        "us_per_frame": wall / frames * 1e6 if frames else 0.0,
+        "speedup": (ticks * dt) / wall if wall > 0 else 0.0,
+        "step_advances": advances,
+        "safety_alerts": alerts,
+        "experiments_completed": completed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="VocalLab FSM throughput simulation")
+    ap.add_argument("--sessions", type=int, default=1000, help="virtual students")
+    ap.add_argument("--minutes", type=float, default=10, help="virtual classroom minutes")
+    ap.add_argument("--fps", type=float, default=2, help="frames per second per student")
+    ap.add_argument("--demo", action="store_true", help="run FSMs in demo mode (auto-advance)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--verbose", action="store_true", help="keep FSM/safety console output")
+    args = ap.parse_args()
+
+    print(f"[sim] {args.sessions} sessions × {args.minutes} virtual min @ {args.fps} FPS (demo={args.demo}, seed={args.seed})")
+    r = run(args.sessions, args.minutes, args.fps, args.demo, args.seed, args.verbose)
+    print("=" * 55)
+    print(f"  Frames processed:      {r['frames']:,}")
+    print(f"  Wall time:             {r['wall_seconds']:.2f}s  ({r['speedup']:,.0f}× real time)")
+    print(f"  FSM throughput:        {r['frames_per_second']:,.0f} frames/s  ({r['us_per_frame']:.1f} µs/frame)")
+    print(f"  Step advances:         {r['step_advances']:,}")
+    print(f"  Safety alerts:         {r['safety_alerts']:,}")
+    print(f"  Experiments completed: {r['experiments_completed']:,} / {r['sessions']:,}")
+    print("=" * 55)
+
+
+if __name__ == "__main__":
+    main()
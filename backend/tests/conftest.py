@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Make backend/ importable (engine.*, config.*), as main.py does
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND_DIR not in sys.path:
+    sys.path.insert(0, _BACKEND_DIR)
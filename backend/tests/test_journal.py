@@ -0,0 +1,40 @@
+from engine import journal as fsm_journal
+from engine.clock import VirtualClock
+from engine.fsm import ExperimentFSM
+
+
+def _write(directory, events):
+    j = fsm_journal.Journal(str(directory))
+    j.start()
+    for kind, sid, ts, data in events:
+        j.append(kind, sid, ts, **data)
+    j.close()
+
+
+def test_replayed_transition_still_sends_its_audio(tmp_path):
+    _write(tmp_path, [
+        (fsm_journal.EV_SESSION_START, "STU-1", 100.0, {"value": "tok"}),
+        (fsm_journal.EV_TRANSITION, "STU-1", 101.0, {"step": 0}),
+    ])
+    sessions, _ = fsm_journal.recover(str(tmp_path))
+    state = sessions["STU-1"]["fsm"]
+    assert state["in_transition"] is True
+    assert state["transition_sent"] is False
+
+    fsm = ExperimentFSM(clock=VirtualClock(start=102.0))
+    fsm.restore_state(state)
+    step = fsm.get_current_step()
+    result = fsm.process_detections([], "en")
+    assert result["audio_to_play"] == step.get("audio_transition")
+
+
+def test_step_advance_leaves_transition(tmp_path):
+    _write(tmp_path, [
+        (fsm_journal.EV_TRANSITION, "STU-1", 101.0, {"step": 0}),
+        (fsm_journal.EV_STEP_ADVANCE, "STU-1", 102.0, {"step": 1, "completed": False}),
+    ])
+    sessions, _ = fsm_journal.recover(str(tmp_path))
+    state = sessions["STU-1"]
+    assert state["fsm"]["current_step_index"] == 1
+    assert state["fsm"]["in_transition"] is False
+    assert state["stats"]["steps_completed"] == 1
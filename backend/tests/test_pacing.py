@@ -0,0 +1,42 @@
+from engine.clock import VirtualClock
+from engine.pacing import FramePacer
+
+
+def _pacer(**kwargs):
+    return FramePacer(max_fps=2, clock=VirtualClock(start=0.0), **kwargs)
+
+
+def test_frame_slightly_early_on_default_advice_is_accepted():
+    pacer = _pacer()
+    assert pacer.current("STU-1") == 500
+    assert pacer.accepts("STU-1", 0.49)         # a few ms of network jitter
+    assert not pacer.accepts("STU-1", 0.3)      # a client ignoring the advice
+
+
+def test_floor_follows_longer_advice():
+    pacer = _pacer()
+    pacer.observe("STU-1", 0.6)                 # slow inference → 800 ms advice for one student
+    assert pacer.current("STU-1") == 800
+    assert pacer.accepts("STU-1", 0.79)
+    assert not pacer.accepts("STU-1", 0.5)
+
+
+def test_unadvised_student_gets_the_same_slack():
+    pacer = _pacer()
+    assert pacer.accepts("STU-2", 0.45)
+    assert not pacer.accepts("STU-2", 0.3)
+
+
+def test_burst_goes_below_max_fps_down_to_the_hard_floor():
+    pacer = _pacer(burst_max_fps=4)
+    burst = {"mode": "burst", "factor": 0.5}
+    assert pacer.current("STU-1", burst) == 250
+    assert pacer.accepts("STU-1", 0.21)
+    assert not pacer.accepts("STU-1", 0.1)
+    assert pacer.interval_ms(0.1) == 250        # never below the hard floor
+    assert pacer.interval_ms() == 500           # normal mode still capped by MAX_FPS
+
+
+def test_burst_without_a_hard_floor_stays_at_max_fps():
+    pacer = _pacer()
+    assert pacer.current("STU-1", {"mode": "burst", "factor": 0.5}) == 500
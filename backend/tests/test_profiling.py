@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from engine import profiling
+from engine.profiling import FrameProfiler, SAMPLING, DETERMINISTIC
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_sampling_stop_does_not_wait_for_sampler(monkeypatch):
+    def slow_frames():
+        time.sleep(0.3)
+        return {}
+
+    monkeypatch.setattr(profiling.sys, "_current_frames", slow_frames)
+
+    async def scenario():
+        profiler = FrameProfiler(sample_interval=0.01)
+        window = profiler.start(SAMPLING, seconds=60)
+        await asyncio.sleep(0.05)                   # the sampler is inside a (slow) sample
+        t0 = time.perf_counter()
+        profiler.stop()
+        took = time.perf_counter() - t0
+        state = window.to_dict()["state"]
+        for _ in range(100):
+            if window.finished:
+                break
+            await asyncio.sleep(0.01)
+        return profiler, window, took, state
+
+    profiler, window, took, state = _run(scenario())
+    assert took < 0.05
+    assert state in ("stopping", "finished")
+    assert window.finished and window.stop_reason == "stopped"
+    body, media_type = profiler.render()
+    assert media_type == "text/plain"
+
+
+def test_render_refuses_sampling_window_until_sampler_exits():
+    async def scenario():
+        profiler = FrameProfiler(sample_interval=0.2)
+        window = profiler.start(SAMPLING, seconds=60)
+        profiler.stop()
+        try:
+            profiler.render()
+        except LookupError:
+            refused = True
+        else:
+            refused = window.finished
+        for _ in range(100):
+            if window.finished:
+                break
+            await asyncio.sleep(0.01)
+        return refused, window
+
+    refused, window = _run(scenario())
+    assert refused
+    assert window.finished
+
+
+def test_deterministic_stop_finishes_immediately():
+    async def scenario():
+        profiler = FrameProfiler()
+        window = profiler.start(DETERMINISTIC, frames=2, seconds=60)
+        profiler.frame_done()
+        profiler.frame_done()
+        return profiler, window
+
+    profiler, window = _run(scenario())
+    assert not profiler.active
+    assert window.finished and window.stop_reason == "frames"
+    assert profiler.render("text")[1] == "text/plain"
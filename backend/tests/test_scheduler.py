@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+from engine.scheduler import FairScheduler
+
+
+class _Runner:
+    async def run(self, fn, *args):
+        return fn(*args), 0.0
+
+
+def _order(setup):
+    """Queue frames via setup(scheduler, submit), then drain with _pick() and return the session order."""
+    async def scenario():
+        scheduler = FairScheduler(_Runner(), quantum=10, max_wait=2.0)
+        tasks = []
+
+        def submit(sid, priority=False):
+            tasks.append(asyncio.ensure_future(scheduler.submit(sid, lambda: sid, cost=1, priority=priority)))
+
+        await setup(scheduler, submit)
+        order = []
+        while (picked := scheduler._pick()) is not None:
+            order.append(picked[0].session_id)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return order, scheduler
+
+    return asyncio.run(scenario())
+
+
+def _backdate(scheduler, sid, seconds):
+    for job in scheduler._sessions[sid].jobs:
+        job.enqueued -= seconds
+
+
+def test_safety_frame_goes_before_a_starved_routine_frame():
+    async def scenario():
+        scheduler = FairScheduler(_Runner(), quantum=10, max_wait=2.0)
+
+        def submit(sid, priority=False):
+            return asyncio.ensure_future(scheduler.submit(sid, lambda: sid, cost=1, priority=priority))
+
+        tasks = [submit("routine-old"), submit("safety-1", priority=True)]
+        await asyncio.sleep(0)
+        _backdate(scheduler, "routine-old", 5.0)
+        order = [scheduler._pick()[0].session_id]          # promotes routine-old, serves safety-1
+        tasks.append(submit("safety-2", priority=True))    # arrives after the promotion
+        await asyncio.sleep(0)
+        while (picked := scheduler._pick()) is not None:
+            order.append(picked[0].session_id)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    assert order == ["safety-1", "safety-2", "routine-old"]
+    assert scheduler.promoted == 1
+
+
+def test_starved_frame_goes_ahead_of_other_routine_frames():
+    async def setup(scheduler, submit):
+        submit("a")
+        submit("b")
+        submit("c")
+        await asyncio.sleep(0)
+        _backdate(scheduler, "c", 5.0)
+
+    order, _ = _order(setup)
+    assert order == ["c", "a", "b"]
+
+
+def test_served_starved_session_returns_to_the_routine_ring():
+    async def setup(scheduler, submit):
+        submit("a")
+        submit("a")
+        submit("b")
+        await asyncio.sleep(0)
+        scheduler._sessions["a"].jobs[0].enqueued = time.monotonic() - 5.0
+
+    order, _ = _order(setup)
+    assert order == ["a", "b", "a"]
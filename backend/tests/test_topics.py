@@ -0,0 +1,37 @@
+from engine.aggregator import DashboardAggregator
+from engine.topics import Subscription, DETAIL_PROGRESS, DETAIL_SUMMARY
+
+
+def _no_group(student_id):
+    return None
+
+
+def _batches():
+    agg = DashboardAggregator(keyframe_every=100)
+    agg.update("STU-1", step_info={"step": 1, "hint": "x"}, student_stats={"frames": 1, "extra": 2},
+               detections=[{"label": "beaker"}])
+    agg.flush()
+    agg.update("STU-1", step_info={"step": 2}, student_stats={"frames": 2}, detections=[])
+    return agg.flush()
+
+
+def test_progress_keeps_unset_for_its_fields():
+    batch = _batches()
+    assert batch["students"]["STU-1"]["unset"] == {"step_info": ["hint"], "student_stats": ["extra"]}
+    entry = Subscription(detail=DETAIL_PROGRESS).filter(batch, _no_group)["students"]["STU-1"]
+    assert "detections" not in entry
+    assert entry["unset"] == {"step_info": ["hint"], "student_stats": ["extra"]}
+
+
+def test_summary_drops_unset_for_fields_it_does_not_carry():
+    batch = _batches()
+    entry = Subscription(detail=DETAIL_SUMMARY).filter(batch, _no_group)["students"]["STU-1"]
+    assert "step_info" not in entry
+    assert entry["unset"] == {"student_stats": ["extra"]}
+
+
+def test_student_filter_skips_other_students():
+    batch = _batches()
+    routed = Subscription(students=["STU-2"], detail=DETAIL_PROGRESS).filter(batch, _no_group)
+    assert routed["students"] == {}
+    assert routed["seq"] == batch["seq"]
@@ -1,7 +1,8 @@
 import React, { useState, useEffect, useRef, useCallback, useMemo } from 'react';
 
 // ─── CONFIG ──────────────────────────────────────────────────────────────────
-const WS_URL = `ws://${window.location.hostname}:8000/ws/dashboard`;
+const ROOM = new URLSearchParams(window.location.search).get('room') || '';  // open /?room=chem-10b to watch one class
+const WS_URL = `ws://${window.location.hostname}:8000/ws/dashboard?detections=columnar${ROOM ? `&room=${encodeURIComponent(ROOM)}` : ''}`;
 const RECONNECT_MS = 3000;
 const MAX_LOG = 50;
 const DEBOUNCE_MS = 250;  // batch student_update renders
@@ -25,6 +26,18 @@ const EXPERIMENTS = [
 
 const STEP_NAMES = ['Setup Equipment', 'Pour Acid (HCl)', 'Add Base & Indicator', 'Record Observations'];
 
+// Columnar detections (`?detections=columnar`): flat arrays + append-only label dictionary
+const applyLabelDictionary = (table, upd) => { if (upd) upd.labels.forEach((l, i) => { table[upd.offset + i] = l; }); };
+const unpackDetections = (p, table) => {
+  if (!p || Array.isArray(p)) return p;
+  const out = [];
+  for (let i = 0; i < p.n; i++) {
+    const [x1, y1, x2, y2] = p.boxes.slice(4 * i, 4 * i + 4);
+    out.push({ label: table[p.labels[i]] || '', confidence: p.conf[i] / 100, bbox: [x1, y1, x2, y2], center: [(x1 + x2) / 2, (y1 + y2) / 2] });
+  }
+  return out;
+};
+
 const fmt = (d) => d.toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit', second: '2-digit', hour12: false });
 const fmtDur = (s) => { if (!s || s < 0) return '0s'; const m = Math.floor(s / 60), sec = Math.floor(s % 60); return m > 0 ? `${m}m ${sec}s` : `${sec}s`; };
 const ago = (d) => {
@@ -70,6 +83,10 @@ export default function App() {
   // Debounce buffer: accumulate student snapshots, flush every DEBOUNCE_MS
   const studentBufRef = useRef({});
   const flushTimerRef = useRef(null);
+  // dashboard_batch delta state: student_id -> merged fields (+ __w: batching worker), last seq per worker
+  const batchStateRef = useRef({});
+  const batchSeqRef = useRef({});
+  const labelTableRef = useRef([]);
 
   useEffect(() => { stepRef.current = step; }, [step]);
 
@@ -106,7 +123,7 @@ export default function App() {
         setSafety(p => [{ id: Date.now(), msg: data.safety_alert.message || 'Safety alert', sev: data.safety_alert.severity || 'high', time: now }, ...p].slice(0, MAX_LOG));
         pushLog('danger', `⚠ ${data.safety_alert.message || 'Safety alert'}`);
       }
-      if (data.experiment_complete) pushLog('success', '🎉 Experiment completed!');
+      if (data.experiment_complete && data.completed_now !== false) pushLog('success', '🎉 Experiment completed!');
       // Buffer per-student snapshot (debounced to reduce re-renders)
       if (data.student_id) {
         studentBufRef.current[data.student_id] = {
@@ -121,6 +138,45 @@ export default function App() {
           flushTimerRef.current = setTimeout(() => { flushTimerRef.current = null; flushStudentBuf(); }, DEBOUNCE_MS);
         }
       }
+    } else if (t === 'dashboard_batch') {
+      // Delta batches: merge changed fields; on a sequence gap ask for a keyframe.
+      // Each backend worker batches its own students, so seq / keyframes are tracked per worker.
+      const w = data.worker || '';
+      const seqs = batchSeqRef.current;
+      if (!data.keyframe && seqs[w] !== undefined && seqs[w] !== null && data.seq !== seqs[w] + 1) {
+        seqs[w] = null;
+        try { wsRef.current?.send(JSON.stringify({ type: 'request_state' })); } catch {}
+        return;
+      }
+      if (!data.keyframe && (seqs[w] === undefined || seqs[w] === null)) return;  // wait for the keyframe
+      seqs[w] = data.seq;
+      const states = batchStateRef.current;
+      if (data.keyframe) Object.keys(states).forEach(sid => { if (states[sid].__w === w) delete states[sid]; });
+      (data.removed || []).forEach(sid => { delete states[sid]; delete studentBufRef.current[sid]; });
+      if (data.removed?.length) setLiveStudents(p => { const n = { ...p }; data.removed.forEach(sid => delete n[sid]); return n; });
+      Object.entries(data.students || {}).forEach(([sid, delta]) => {
+        const prev = states[sid] || {};
+        const next = { ...prev };
+        Object.entries(delta).forEach(([k, v]) => {
+          if (k === 'unset') return;
+          next[k] = (v && typeof v === 'object' && !Array.isArray(v) && prev[k] && typeof prev[k] === 'object') ? { ...prev[k], ...v } : v;
+        });
+        // Keys a dict field no longer has (diffed one level deep, like the merge above)
+        Object.entries(delta.unset || {}).forEach(([k, keys]) => {
+          if (next[k] && typeof next[k] === 'object') { next[k] = { ...next[k] }; keys.forEach(key => delete next[k][key]); }
+        });
+        delete next.safety_alert; delete next.step_advance;
+        next.__w = w;
+        states[sid] = next;
+        onMsg({
+          ...next,
+          type: 'student_update',
+          student_id: sid,
+          safety_alert: delta.safety_alert || null,
+          step_advance: delta.step_advance || false,
+          completed_now: !data.keyframe && !!delta.experiment_complete,
+        });
+      });
     } else if (t === 'step_advance') {
       const s = data.step ?? data.current_step ?? data.step_index;
       setStep(s); pushLog('step', `Step ${(s || 0) + 1}: ${data.step_name || STEP_NAMES[s] || 'Unknown'}`);
@@ -155,7 +211,16 @@ export default function App() {
     try {
       const s = new WebSocket(WS_URL); wsRef.current = s;
       s.onopen = () => { setWs('connected'); if (reconRef.current) { clearTimeout(reconRef.current); reconRef.current = null; } };
-      s.onmessage = (e) => { try { onMsgRef.current(JSON.parse(e.data)); setLastMsg(new Date()); } catch {} };
+      s.onmessage = (e) => {
+        try {
+          const data = JSON.parse(e.data);
+          const table = labelTableRef.current;
+          applyLabelDictionary(table, data.label_dictionary);
+          if (data.detections) data.detections = unpackDetections(data.detections, table);
+          Object.values(data.students || {}).forEach(st => { if (st.detections) st.detections = unpackDetections(st.detections, table); });
+          onMsgRef.current(data); setLastMsg(new Date());
+        } catch {}
+      };
       s.onclose = () => { setWs('disconnected'); wsRef.current = null; reconRef.current = setTimeout(connect, RECONNECT_MS); };
       s.onerror = () => setWs('disconnected');
     } catch { setWs('disconnected'); reconRef.current = setTimeout(connect, RECONNECT_MS); }
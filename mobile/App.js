@@ -61,6 +61,32 @@ const BOX_COLORS = {
   analytical_balance: '#E056A0',
 };
 
+// ── Columnar detections (`?detections=columnar`) ───────────────────
+// Flat arrays + an append-only label dictionary sent with welcome
+const applyLabelDictionary = (table, upd) => { if (upd) upd.labels.forEach((l, i) => { table[upd.offset + i] = l; }); };
+const unpackDetections = (p, table) => {
+  if (!p || Array.isArray(p)) return p;
+  const out = [];
+  for (let i = 0; i < p.n; i++) {
+    const [x1, y1, x2, y2] = p.boxes.slice(4 * i, 4 * i + 4);
+    out.push({ label: table[p.labels[i]] || '', confidence: p.conf[i] / 100, bbox: [x1, y1, x2, y2], center: [(x1 + x2) / 2, (y1 + y2) / 2] });
+  }
+  return out;
+};
+
+// ── Capture profile (welcome / capture_profile) ───────────────────
+// Smallest camera picture size whose long side still covers the server's inference size
+const pickPictureSize = (sizes, longSide) => {
+  let best = null;
+  (sizes || []).forEach(s => {
+    const m = /^(\d+)x(\d+)$/.exec(s);
+    if (!m) return;
+    const long = Math.max(+m[1], +m[2]);
+    if (long >= longSide && (!best || long < best.long)) best = { size: s, long };
+  });
+  return best?.size;
+};
+
 function App() {
   const [screen, setScreen] = useState('home');
   const [serverIP, setServerIP] = useState(DEFAULT_SVR);
@@ -74,6 +100,7 @@ function App() {
   const [boxes, setBoxes] = useState([]);
   const [detCount, setDetCount] = useState(0);
   const [frameSize, setFrameSize] = useState({ w: 640, h: 480 });
+  const [pictureSize, setPictureSize] = useState(undefined);
   const [safetyAlert, setSafetyAlert] = useState(null);
   const [expDone, setExpDone] = useState(false);
 
@@ -89,6 +116,11 @@ function App() {
   const wsReconnectAborted = useRef(false);
   const isProcessingFrameRef = useRef(false);
   const studentIdRef = useRef(null);
+  const resumeTokenRef = useRef(null);
+  const labelTableRef = useRef([]);             // columnar detections label table (refilled by welcome)
+  const captureIntervalRef = useRef(700);       // ms between captures, paced by the server (welcome / frame_pacing)
+  const captureProfileRef = useRef({ long_side: 640, jpeg_quality: 0.3 });  // upload size / quality from the server
+  const reconnectDelayRef = useRef(3000);       // ms before reconnecting; raised by server_at_capacity
 
   const [permission, requestPermission] = useCameraPermissions();
   const lang = LANGS[langIdx];
@@ -167,6 +199,21 @@ function App() {
     safetyTimeout.current = setTimeout(() => setSafetyAlert(null), 5000);
   }, []);
 
+  // ── Capture Profile ───────────────────────────────────────────────
+  // Upload the server's inference size instead of the camera's native resolution
+  const applyCaptureProfile = useCallback(async (profile) => {
+    if (profile) captureProfileRef.current = profile;
+    if (!camRef.current?.getAvailablePictureSizesAsync) return;
+    try {
+      const sizes = await camRef.current.getAvailablePictureSizesAsync();
+      const size = pickPictureSize(sizes, captureProfileRef.current.long_side);
+      console.log('[Camera] Capture profile', captureProfileRef.current, '→ picture size', size || 'native');
+      setPictureSize(size);
+    } catch (e) {
+      console.warn('[Camera] Picture sizes unavailable:', e?.message || e);
+    }
+  }, []);
+
   // ── Step Parsing ──────────────────────────────────────────────────
   const formatStep = useCallback((info, fallback = {}) => ({
     current_step: info?.current_step ?? fallback.current_step ?? 0,
@@ -228,10 +275,18 @@ function App() {
       return;
     }
 
+    applyLabelDictionary(labelTableRef.current, msg.label_dictionary);
+    if (msg.detections) msg.detections = unpackDetections(msg.detections, labelTableRef.current);
     console.log('[WS] Received:', msg.type, msg);
 
     switch (msg.type) {
       case 'welcome':
+        if (msg.student_id) studentIdRef.current = msg.student_id;
+        if (msg.resume_token) resumeTokenRef.current = msg.resume_token;
+        if (msg.resumed) console.log('[WS] Resumed session', msg.student_id, 'at step', msg.current_step);
+        if (msg.capture_interval_ms) captureIntervalRef.current = msg.capture_interval_ms;
+        if (msg.capture_profile) applyCaptureProfile(msg.capture_profile);
+      // falls through
       case 'experiment_loaded': {
         console.log('[WS] Setting initial FSM state from welcome:', msg.step_info);
         setFsmState(formatStep(msg.step_info, { current_step: msg.current_step, total_steps: msg.total_steps }));
@@ -265,11 +320,31 @@ function App() {
         if (msg.experiment_complete) setExpDone(true);
         break;
       }
+      case 'admission': {
+        console.log('[WS] Server busy — waiting in queue, position', msg.position);
+        setFsmState(prev => ({ ...(prev || formatStep(null)), hint: `Lab server is busy — you are #${msg.position} in line` }));
+        break;
+      }
+      case 'server_at_capacity': {
+        console.log('[WS] Server at capacity, retrying in', msg.retry_after, 's');
+        reconnectDelayRef.current = (msg.retry_after || 30) * 1000;
+        setFsmState(prev => ({ ...(prev || formatStep(null)), hint: `Lab server is full — retrying in ${msg.retry_after || 30}s` }));
+        break;
+      }
+      case 'capture_profile': {
+        applyCaptureProfile(msg);
+        break;
+      }
+      case 'frame_pacing': {
+        console.log('[WS] Capture interval →', msg.capture_interval_ms, 'ms (', msg.reason, ')');
+        if (msg.capture_interval_ms) captureIntervalRef.current = msg.capture_interval_ms;
+        break;
+      }
       default:
         console.log('[WS] Unhandled message type:', msg.type);
         break;
     }
-  }, [formatStep, playAudio, showSafetyAlert]);
+  }, [formatStep, playAudio, showSafetyAlert, applyCaptureProfile]);
 
   // ── Navigation ─────────────────────────────────────────────────────
   const startExperiment = useCallback(async () => {
@@ -280,6 +355,7 @@ function App() {
       return;
     }
     setScreen('experiment');
+    resumeTokenRef.current = null;
     setFsmState(null);
     setBoxes([]);
     setDetCount(0);
@@ -308,10 +384,13 @@ function App() {
       const target = cleanIP(serverIPRef.current);
       if (!target) return;
 
-      console.log('[WS] Attempting connection to:', `ws://${target}/ws/student`);
+      // Reconnects present the last resume token so the server restores our FSM state
+      // Columnar detections are several times smaller on the wire; the label table arrives in welcome
+      const query = '?detections=columnar' + (resumeTokenRef.current ? `&resume_token=${encodeURIComponent(resumeTokenRef.current)}` : '');
+      console.log('[WS] Attempting connection to:', `ws://${target}/ws/student`, resumeTokenRef.current ? '(resume)' : '');
 
       try {
-        wsInstance = new WebSocket(`ws://${target}/ws/student`);
+        wsInstance = new WebSocket(`ws://${target}/ws/student${query}`);
         wsRef.current = wsInstance;
 
         wsInstance.onopen = () => {
@@ -332,8 +411,10 @@ function App() {
           setConnected(false);
           // attempt reconnect unless we intentionally aborted
           if (!wsReconnectAborted.current) {
-            console.log('[WS] Scheduling reconnect in 3s...');
-            setTimeout(initWS, 3000);
+            const delay = reconnectDelayRef.current;
+            reconnectDelayRef.current = 3000;
+            console.log(`[WS] Scheduling reconnect in ${delay / 1000}s...`);
+            setTimeout(initWS, delay);
           }
         };
 
@@ -352,11 +433,12 @@ function App() {
 
     const captureFrame = async () => {
       if (wsReconnectAborted.current) return;
+      const startedAt = Date.now();
       const wsOpen = wsRef.current && wsRef.current.readyState === 1;
       if (camRef.current && wsOpen && !isProcessingFrameRef.current) {
         isProcessingFrameRef.current = true;
         try {
-          const photo = await camRef.current.takePictureAsync({ base64: true, quality: 0.3, skipProcessing: true });
+          const photo = await camRef.current.takePictureAsync({ base64: true, quality: captureProfileRef.current.jpeg_quality, skipProcessing: true });
           if (photo?.base64 && wsRef.current?.readyState === 1) {
             console.log('[Camera] Sending frame to server, size:', photo.base64.length, 'chars, connected:', connected);
             wsRef.current.send(JSON.stringify({
@@ -378,7 +460,9 @@ function App() {
         if (!wsOpen) console.log('[Camera] WebSocket not connected, connected state:', connected);
         if (isProcessingFrameRef.current) console.log('[Camera] Already processing frame');
       }
-      if (!wsReconnectAborted.current) loopRef.current = setTimeout(captureFrame, 700);
+      // Next capture on the server's pace, counting the time this capture took
+      const wait = Math.max(100, captureIntervalRef.current - (Date.now() - startedAt));
+      if (!wsReconnectAborted.current) loopRef.current = setTimeout(captureFrame, wait);
     };
 
     loopRef.current = setTimeout(captureFrame, 1200);
@@ -497,7 +581,8 @@ function App() {
 
       {/* Viewport */}
       <View style={styles.viewport}>
-        <CameraView ref={camRef} style={StyleSheet.absoluteFill} facing="back" />
+        <CameraView ref={camRef} style={StyleSheet.absoluteFill} facing="back"
+          pictureSize={pictureSize} onCameraReady={() => applyCaptureProfile()} />
 
         {/* Visual elements */}
         <Animated.View pointerEvents="none" style={[styles.scanLine, { transform: [{ translateY: scanPos }] }]} />